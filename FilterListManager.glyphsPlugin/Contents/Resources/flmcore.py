@@ -0,0 +1,2814 @@
+# encoding: utf-8
+from __future__ import division, print_function, unicode_literals
+
+###########################################################################################################
+#
+#
+#   Filter List Manager
+#   A plugin for the Glyphs font editor
+#   Copyright 2018 Christopher Simpkins
+#   Apache License 2.0
+#
+#   flmcore.py
+#   Filter list definition parsing and CustomFilter.plist build pipeline.
+#   This module does not depend on the Glyphs application and can be
+#   executed as a script to build CustomFilter.plist files:
+#
+#       $ python3 flmcore.py build --defs [definitions directory] --plist [output file]
+#
+#   Use `python3 flmcore.py build --help` for all options.  The watch
+#   command builds the files again when the definition files change and
+#   the restore command lists or restores the plugin backup generations.
+#
+###########################################################################################################
+
+import atexit
+import bisect
+import codecs
+import hashlib
+import importlib
+import itertools
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from array import array
+
+# public API, also the names that plugin.py imports with from flmcore import *.
+# Python 2 requires str names in __all__ (this module uses unicode_literals).
+__all__ = list(
+    map(
+        str,
+        (
+            "GLYPHS_PLIST_FILE", "GLYPHS_GLYPHDATA_FILE", "GLYPHS_CUSTOM_GLYPHDATA_DIR",
+            "FLM_GLYPHSFILTERS_DIR", "FLM_BACKUP_DIR", "FLM_BACKUP_ORIGINAL_FILE",
+            "FLM_BACKUP_OBJECTS_DIR", "FLM_BACKUP_HISTORY_FILE", "FLM_DEFAULT_PLIST",
+            "FLM_LOG_DIR", "FLM_LOG_FILE", "FLM_REMOTE_DEF_FILE", "FLM_DEFINITION_MAX_SIZE",
+            "FLM_CACHE_DIR", "FLM_MANIFEST_FILE", "FLM_REMOTE_CACHE_DIR",
+            "FLM_SETTINGS_FILE", "FLM_DEFAULT_SETTINGS", "TimingSpan", "NamePool",
+            "Filter", "DefinitionSizeError", "DefinitionReferenceError", "UpdateCancelled",
+            "Cancellation", "DefinitionReader", "read_plist", "write_plist",
+            "write_file", "clone_or_copy_file", "get_filter_list_changes",
+            "format_filter_list_change", "summarize_filter_list_changes",
+            "get_backup_store", "BackupStore", "fetch_remote_definitions",
+            "read_settings", "configure_logging", "stop_logging", "RemoteCache",
+            "DefinitionsManifest", "get_local_filter_definitions_list",
+            "read_remote_definitions_urls", "get_remote_filter_definitions_list",
+            "GlyphDataIndex", "GlyphDataFiles", "DIRECTIVES", "DefinitionResolver",
+            "resolve_filter_definitions", "build_plist_data", "DefinitionSources",
+            "BuildTarget", "read_build_targets",
+        ),
+    )
+)
+
+
+class LazyModule(object):
+    """LazyModule imports the first module in names that can be imported on the first
+       attribute access.  Modules that are only needed by some of the pipeline steps are
+       defined as LazyModule objects so that the plugin import in the Glyphs application
+       does not load them."""
+
+    def __init__(self, *names):
+        self._names = names
+        self._module = None
+
+    def __getattr__(self, attribute):
+        if self._module is None:
+            for name in self._names[:-1]:
+                try:
+                    self._module = importlib.import_module(name)
+                    break
+                except ImportError:
+                    pass
+            else:
+                self._module = importlib.import_module(self._names[-1])
+        return getattr(self._module, attribute)
+
+
+# the first module name is the Python 3 module, the second the Python 2 module
+urllibrequest = LazyModule("urllib.request", "urllib2")
+urllibparse = LazyModule("urllib.parse", "urlparse")
+httpclient = LazyModule("http.client", "httplib")
+plistlib = LazyModule("plistlib")
+queue = LazyModule("queue", "Queue")
+logging_handlers = LazyModule("logging.handlers")
+ET = LazyModule("xml.etree.ElementTree")
+select = LazyModule("select")
+struct = LazyModule("struct")
+
+# -----------------
+# Path definitions
+# -----------------
+# Glyphs application paths
+GLYPHS_PLIST_FILE = os.path.join(
+    os.path.expanduser("~"),
+    "Library",
+    "Application Support",
+    "Glyphs",
+    "CustomFilter.plist",
+)
+GLYPHS_GLYPHDATA_FILE = "/Applications/Glyphs.app/Contents/Frameworks/GlyphsCore.framework/Versions/A/Resources/GlyphData.xml"
+GLYPHS_CUSTOM_GLYPHDATA_DIR = os.path.join(
+    os.path.expanduser("~"), "Library", "Application Support", "Glyphs", "Info"
+)
+
+
+# FLM plugin paths
+FLM_GLYPHSFILTERS_DIR = os.path.join(os.path.expanduser("~"), "GlyphsFilters")
+FLM_BACKUP_DIR = os.path.join(os.path.expanduser("~"), "GlyphsFilters", "backup")
+FLM_BACKUP_ORIGINAL_FILE = os.path.join(FLM_BACKUP_DIR, "CustomFilters.plist.original")
+FLM_BACKUP_OBJECTS_DIR = os.path.join(FLM_BACKUP_DIR, "objects")
+FLM_BACKUP_HISTORY_FILE = os.path.join(FLM_BACKUP_DIR, "history.json")
+FLM_DEFAULT_PLIST = os.path.join(
+    os.path.expanduser("~"),
+    "Library",
+    "Application Support",
+    "Glyphs",
+    "Plugins",
+    "FilterListManager.glyphsPlugin",
+    "Contents",
+    "Resources",
+    "CustomFilter.plist",
+)
+FLM_LOG_DIR = os.path.join(os.path.expanduser("~"), "GlyphsFilters", "logs")
+FLM_LOG_FILE = os.path.join(FLM_LOG_DIR, "flm.log")
+FLM_LOG_FORMAT = "%(asctime)s %(levelname)s  %(message)s"
+FLM_LOG_DATE_FORMAT = "%m/%d/%Y %I:%M:%S %p"
+FLM_REMOTE_DEF_FILE = os.path.join(
+    os.path.expanduser("~"), "GlyphsFilters", "remote", "defs.txt"
+)
+# Remote definition file requests
+FLM_REMOTE_MAX_CONNECTIONS = 8  # maximum number of concurrent requests
+FLM_REMOTE_TIMEOUT = 10  # seconds, per request
+FLM_REMOTE_TOTAL_TIMEOUT = 60  # seconds, all requests
+FLM_REMOTE_MAX_REDIRECTS = 5
+FLM_CANCELLATION_INTERVAL = 0.1  # seconds between cancellation checks during requests
+# Definition files
+FLM_DEFINITION_MAX_SIZE = 16 * 1024 * 1024  # bytes, per definition file
+FLM_DEFINITION_CHUNK_SIZE = 64 * 1024  # bytes
+# Watch mode
+FLM_WATCH_DEBOUNCE = 0.5  # seconds without file changes before a rebuild
+FLM_WATCH_POLL_INTERVAL = 1.0  # seconds between modification time scans
+FLM_CACHE_DIR = os.path.join(os.path.expanduser("~"), "GlyphsFilters", ".cache")
+FLM_MANIFEST_FILE = os.path.join(FLM_CACHE_DIR, "manifest.json")
+FLM_REMOTE_CACHE_DIR = os.path.join(FLM_CACHE_DIR, "remote")
+FLM_SETTINGS_FILE = os.path.join(
+    os.path.expanduser("~"), "GlyphsFilters", "settings", "settings.json"
+)
+
+# ------------------
+# Default settings
+# ------------------
+# Override in the FLM_SETTINGS_FILE JSON file
+FLM_DEFAULT_SETTINGS = {
+    # seconds that a cached remote definition file is used without a request
+    "remote_max_age": 0,
+    # maximum size of a local or remote definition file in bytes
+    "definition_max_size": FLM_DEFINITION_MAX_SIZE,
+    # CustomFilter.plist backup history retention
+    "backup_generations": 20,
+    "backup_max_age_days": 180,
+    "backup_max_size": 50 * 1024 * 1024,  # bytes
+    # log file level (DEBUG, INFO, WARNING, ERROR) and size-based rotation
+    "log_level": "INFO",
+    "log_max_size": 1024 * 1024,  # bytes, per log file
+    "log_backup_count": 3,  # rotated log files flm.log.1 ... flm.log.N
+}
+
+
+# the module and the plugin log on the flm logger and its child loggers.  The
+# Glyphs application runs all plugins in one Python interpreter, the root logger
+# is left to the application.
+logger = logging.getLogger("flm")
+
+# monotonic timer for timing spans, time.perf_counter is not defined in Python 2
+TIMER = getattr(time, "perf_counter", time.time)
+
+
+class TimingSpan(object):
+    """TimingSpan is a context manager that logs the duration of a pipeline phase as a
+       JSON line on the flm.timing logger, e.g.:
+
+           {"seconds": 0.0123, "span": "local_parse", "filters": 12}
+
+       Keyword arguments and values that are set in the fields dictionary inside of the
+       with block are included in the line.  An "error" field with the exception type
+       name is included when the block raises an exception."""
+
+    logger = logging.getLogger("flm.timing")
+
+    def __init__(self, name, **fields):
+        self.name = name
+        self.fields = fields
+        self.start = None
+
+    def __enter__(self):
+        self.start = TIMER()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        record = dict(self.fields)
+        record["span"] = self.name
+        record["seconds"] = round(TIMER() - self.start, 6)
+        if exc_type is not None:
+            record["error"] = exc_type.__name__
+        self.logger.info(json.dumps(record, sort_keys=True))
+        return False
+
+
+class NamePool(object):
+    """NamePool maps glyph names to a single shared string object per name so that the
+       glyph names that are defined in many filter lists are only stored once.  A pool
+       is created for each update and released with it so that the glyph names of
+       removed definitions are not held for the lifetime of the process."""
+
+    __slots__ = ("names",)
+
+    def __init__(self):
+        self.names = {}
+
+    def intern(self, name):
+        return self.names.setdefault(name, name)
+
+    def intern_tuple(self, names):
+        """Returns a tuple of the shared string objects for the names in an iterable"""
+        setdefault = self.names.setdefault
+        return tuple([setdefault(name, name) for name in names])
+
+    def __len__(self):
+        return len(self.names)
+
+
+class Filter(object):
+    """Filter is an object that maintains data elements for Glyphs application filter lists.
+       It is instantiated with a new filter list name and list elements are defined with
+       a class method.  The list elements are stored as an immutable tuple of glyph names.
+       Intern the glyph names in a NamePool to share them across Filter objects."""
+
+    __slots__ = ("name", "_list")
+
+    comment_delimiters = ("#", "/")
+
+    def __init__(self, name):
+        self.name = name
+        self._list = ()
+
+    @property
+    def list(self):
+        return self._list
+
+    @list.setter
+    def list(self, glyph_names):
+        self._list = tuple(glyph_names)
+
+    def define_list_with_newline_delimited_text(self, text):
+        """Filter class method that defines a Filter object with parsed data from newline-
+           delimited text files of list elements"""
+        self.define_list_with_lines(text.splitlines())
+
+    def define_list_with_lines(self, lines):
+        """Filter class method that defines a Filter object with parsed data from an
+           iterable of definition file lines, e.g. an open text file or a DefinitionReader"""
+        self.list = parse_definition_lines(lines, self.comment_delimiters)
+
+
+def parse_definition_lines(lines, comment_delimiters=("#", "/")):
+    """Returns the list of list elements in an iterable of definition file lines"""
+    # discard blank lines and comment lines in definition file
+    return [
+        test_item
+        for test_item in [item.strip() for item in lines]
+        if test_item and test_item[0] not in comment_delimiters
+    ]
+
+
+class DefinitionSizeError(ValueError):
+    pass
+
+
+class DefinitionReferenceError(ValueError):
+    pass
+
+
+class UpdateCancelled(Exception):
+    pass
+
+
+class Cancellation(object):
+    """Cancellation is a cooperative cancellation flag for updates that run on another
+       thread.  The update calls check() between steps and stops with UpdateCancelled
+       after cancel() was called."""
+
+    def __init__(self):
+        self.event = threading.Event()
+
+    def cancel(self):
+        self.event.set()
+
+    @property
+    def cancelled(self):
+        return self.event.is_set()
+
+    def check(self):
+        if self.event.is_set():
+            raise UpdateCancelled("the update was cancelled")
+
+
+# byte order marks in detection order, the UTF-32 LE mark begins with the UTF-16 LE mark
+BYTE_ORDER_MARKS = (
+    (codecs.BOM_UTF32_LE, "utf-32-le"),
+    (codecs.BOM_UTF32_BE, "utf-32-be"),
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+)
+
+
+def detect_encoding(head, default_encoding=None):
+    """Returns an (encoding, byte order mark length) tuple for the first bytes of a file.
+       default_encoding (or UTF-8) is used when the bytes do not begin with a byte order
+       mark."""
+    for byte_order_mark, encoding in BYTE_ORDER_MARKS:
+        if head.startswith(byte_order_mark):
+            return encoding, len(byte_order_mark)
+    return default_encoding or "utf-8", 0
+
+
+class DefinitionReader(object):
+    """DefinitionReader iterates over the decoded lines of a definition file in a binary
+       stream (e.g. a file that is opened in binary mode or an HTTP response body).  The
+       stream is read in chunks and decoded incrementally so that the file is never held
+       in memory.  The encoding is detected from a byte order mark and is encoding (or
+       UTF-8) otherwise.  DefinitionSizeError is raised when the stream exceeds max_size
+       bytes.  The bytes that are read are written to copy_file when it is defined.  The
+       size and SHA-1 digest of the stream are defined after the iteration."""
+
+    def __init__(self, stream, max_size=FLM_DEFINITION_MAX_SIZE, encoding=None, copy_file=None):
+        self.stream = stream
+        self.max_size = max_size
+        self.encoding = encoding
+        self.copy_file = copy_file
+        self.size = 0
+        self.digest = None
+
+    def read_chunks(self):
+        sha1 = hashlib.sha1()
+        while True:
+            chunk = self.stream.read(FLM_DEFINITION_CHUNK_SIZE)
+            if not chunk:
+                break
+            self.size += len(chunk)
+            if self.max_size is not None and self.size > self.max_size:
+                raise DefinitionSizeError(
+                    "the definition file exceeds the maximum size of "
+                    + str(self.max_size)
+                    + " bytes"
+                )
+            sha1.update(chunk)
+            if self.copy_file is not None:
+                self.copy_file.write(chunk)
+            yield chunk
+        self.digest = sha1.hexdigest()
+
+    def __iter__(self):
+        return itertools.chain.from_iterable(self.read_line_blocks())
+
+    def read_definitions(self, comment_delimiters=("#", "/")):
+        """Returns the list of list elements in the definition file"""
+        definition_list = []
+        for lines in self.read_line_blocks():
+            definition_list.extend(parse_definition_lines(lines, comment_delimiters))
+        return definition_list
+
+    def read_line_blocks(self):
+        """Yields the lists of complete lines that are decoded from each chunk"""
+        decoder = None
+        head = b""
+        pending = ""
+        chunks = self.read_chunks()
+        while True:
+            chunk = next(chunks, None)
+            final = chunk is None
+            if final:
+                chunk = b""
+            if decoder is None:
+                # the byte order mark is detected in the first four bytes
+                head += chunk
+                if len(head) < 4 and not final:
+                    continue
+                encoding, byte_order_mark_length = detect_encoding(head, self.encoding)
+                decoder = codecs.getincrementaldecoder(encoding)()
+                chunk = head[byte_order_mark_length:]
+            lines = (pending + decoder.decode(chunk, final)).splitlines(True)
+            pending = ""
+            # the last line is incomplete if it does not end with a line break, a
+            # carriage return may be followed by a line feed in the next chunk
+            if not final and len(lines) > 0:
+                if lines[-1].endswith("\r") or lines[-1].splitlines()[0] == lines[-1]:
+                    pending = lines.pop()
+            yield lines
+            if final:
+                return
+
+
+def read_plist(path):
+    """Returns the deserialized data in the plist file on path"""
+    with open(path, "rb") as f:
+        if hasattr(plistlib, "load"):
+            return plistlib.load(f)
+        return plistlib.readPlist(f)
+
+
+def write_plist(data, path):
+    """Atomically replaces the plist file on path with the serialized data"""
+    if hasattr(plistlib, "dumps"):
+        plist_bytes = plistlib.dumps(data)
+    else:
+        plist_bytes = plistlib.writePlistToString(data)
+    write_file(plist_bytes, path)
+
+
+def write_file(file_bytes, path):
+    """Atomically replaces the file on path with file_bytes.  The data are written to a
+       temporary file in the same directory that is renamed to path so that the file on
+       path is never missing or incomplete."""
+    plist_dir = os.path.dirname(path)
+    fd, temp_path = tempfile.mkstemp(
+        dir=plist_dir, prefix="." + os.path.basename(path) + "."
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(file_bytes)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp files are only readable by the owner, keep the file mode of
+        # the file that is replaced
+        if os.path.exists(path):
+            os.chmod(temp_path, os.stat(path).st_mode & 0o7777)
+        else:
+            os.chmod(temp_path, 0o644)
+        os.rename(temp_path, path)
+    except Exception:
+        os.remove(temp_path)
+        raise
+
+
+def clone_or_copy_file(source_path, destination_path):
+    """Replaces destination_path with a copy of source_path.  A copy-on-write clone is
+       made when the file system supports it, otherwise the file is copied.  The copy
+       never shares its data with source_path (unlike a hard link), so a backup is not
+       modified when the Glyphs application writes source_path in place."""
+    temp_path = destination_path + ".tmp"
+    if os.path.lexists(temp_path):
+        os.remove(temp_path)
+    if not clone_file(source_path, temp_path):
+        shutil.copy2(source_path, temp_path)
+    os.rename(temp_path, destination_path)
+
+
+def clone_file(source_path, destination_path):
+    """Makes a copy-on-write clone of a file with the macOS clonefile system call or the
+       Linux FICLONE ioctl.  Returns False when a clone cannot be made."""
+    if sys.platform.startswith("linux"):
+        return reflink_file(source_path, destination_path)
+    try:
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        clonefile = libc.clonefile
+    except (AttributeError, OSError, TypeError):
+        return False
+    clonefile.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_int]
+    result = clonefile(
+        source_path.encode("utf-8"), destination_path.encode("utf-8"), 0
+    )
+    return result == 0
+
+
+def reflink_file(source_path, destination_path):
+    """Makes a copy-on-write clone of a file with the Linux FICLONE ioctl (Btrfs, XFS).
+       Returns False when a clone cannot be made."""
+    import fcntl
+
+    FICLONE = 0x40049409
+    try:
+        with open(source_path, "rb") as source_file:
+            with open(destination_path, "wb") as destination_file:
+                fcntl.ioctl(destination_file.fileno(), FICLONE, source_file.fileno())
+        shutil.copystat(source_path, destination_path)
+    except (IOError, OSError):
+        if os.path.exists(destination_path):
+            os.remove(destination_path)
+        return False
+    return True
+
+
+def get_filter_list_changes(previous_plist_data, new_plist_data):
+    """Compares the filter lists in two CustomFilter.plist data lists by filter name.
+       Returns a list of (change, name, added glyph count, removed glyph count) tuples
+       in new list order followed by the removed filter lists, where change is one of
+       "added", "removed", or "changed"."""
+
+    def get_filter_lists(plist_data):
+        filter_lists = {}
+        for definition in plist_data:
+            if "list" in definition and "name" in definition:
+                filter_lists[definition["name"]] = definition["list"]
+        return filter_lists
+
+    previous_filter_lists = get_filter_lists(previous_plist_data)
+    new_filter_lists = get_filter_lists(new_plist_data)
+    changes = []
+    names = set()
+    for definition in new_plist_data:
+        if "list" not in definition or "name" not in definition:
+            continue
+        name = definition["name"]
+        if name in names:
+            continue
+        names.add(name)
+        new_list = new_filter_lists[name]
+        if name not in previous_filter_lists:
+            changes.append(("added", name, len(new_list), 0))
+        elif new_list != previous_filter_lists[name]:
+            previous_set = set(previous_filter_lists[name])
+            new_set = set(new_list)
+            changes.append(
+                (
+                    "changed",
+                    name,
+                    len(new_set - previous_set),
+                    len(previous_set - new_set),
+                )
+            )
+    for definition in previous_plist_data:
+        if "list" not in definition or "name" not in definition:
+            continue
+        name = definition["name"]
+        if name not in new_filter_lists and name not in names:
+            names.add(name)
+            changes.append(("removed", name, 0, len(previous_filter_lists[name])))
+    return changes
+
+
+def format_filter_list_change(change):
+    change_type, name, added_count, removed_count = change
+    change_string = change_type + " '" + name + "'"
+    if change_type == "added":
+        return change_string + " (" + str(added_count) + " glyphs)"
+    elif change_type == "removed":
+        return change_string + " (" + str(removed_count) + " glyphs)"
+    else:
+        # a list that only changed glyph order has no added or removed glyphs
+        return (
+            change_string
+            + " (+"
+            + str(added_count)
+            + " -"
+            + str(removed_count)
+            + " glyphs)"
+        )
+
+
+def summarize_filter_list_changes(changes):
+    """Returns a compact summary string of the changes in a filter list change list"""
+    counts = []
+    for change_type in ("added", "removed", "changed"):
+        count = len([change for change in changes if change[0] == change_type])
+        if count > 0:
+            counts.append(str(count) + " " + change_type)
+    if len(counts) == 0:
+        return "filter list order changed"
+    return ", ".join(counts)
+
+
+def file_digest(path):
+    sha1 = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def get_backup_store(settings):
+    return BackupStore(
+        FLM_BACKUP_OBJECTS_DIR,
+        FLM_BACKUP_HISTORY_FILE,
+        max_generations=settings["backup_generations"],
+        max_age_days=settings["backup_max_age_days"],
+        max_size=settings["backup_max_size"],
+    )
+
+
+class BackupStore(object):
+    """BackupStore keeps a history of CustomFilters.plist backup generations.  Each unique
+       file is stored once in objects_dir with its content hash as the file name and the
+       generations are recorded in the history_file, most recent first.  The prune method
+       removes generations beyond max_generations, generations older than max_age_days,
+       and the oldest generations while the stored files exceed max_size bytes.  The most
+       recent generation is always kept.  Stored files are hashed again before they are
+       used, files that do not match their content hash are removed."""
+
+    def __init__(
+        self, objects_dir, history_file, max_generations, max_age_days, max_size
+    ):
+        self.objects_dir = objects_dir
+        self.history_file = history_file
+        self.max_generations = max_generations
+        self.max_age_days = max_age_days
+        self.max_size = max_size
+
+    def get_object_path(self, digest):
+        return os.path.join(self.objects_dir, digest + ".plist")
+
+    def verify_object(self, digest):
+        """Returns True if the stored file of digest exists and matches the content
+           hash.  A file that does not match is removed.  Earlier versions stored hard
+           links to the CustomFilters.plist file that change when the file is modified
+           in place."""
+        object_path = self.get_object_path(digest)
+        if not os.path.isfile(object_path):
+            return False
+        if file_digest(object_path) == digest:
+            return True
+        logger.warning("Removing the modified backup file " + object_path)
+        os.remove(object_path)
+        return False
+
+    def read_history(self):
+        if not os.path.isfile(self.history_file):
+            return []
+        with open(self.history_file) as f:
+            return json.load(f)["generations"]
+
+    def write_history(self, generations):
+        write_file(
+            json.dumps({"generations": generations}, indent=1).encode("utf-8"),
+            self.history_file,
+        )
+
+    def add(self, path):
+        """Adds the file on path as the most recent generation and returns its content
+           hash.  The file is only stored if the content hash is new, and a generation
+           is not added if it is identical to the most recent generation."""
+        digest = file_digest(path)
+        if not os.path.isdir(self.objects_dir):
+            os.makedirs(self.objects_dir)
+        object_path = self.get_object_path(digest)
+        # hard links of earlier versions are replaced with copies
+        if not self.verify_object(digest) or os.stat(object_path).st_nlink > 1:
+            clone_or_copy_file(path, object_path)
+
+        generations = self.read_history()
+        if len(generations) > 0 and generations[0]["digest"] == digest:
+            generations[0]["time"] = time.time()
+        else:
+            generations.insert(0, {"digest": digest, "time": time.time()})
+        self.write_history(generations)
+        return digest
+
+    def get_generation_path(self, generation):
+        """Returns the path to the stored file of a generation (0 = most recent)"""
+        generations = self.read_history()
+        if generation < 0 or generation >= len(generations):
+            raise IndexError(
+                "backup generation "
+                + str(generation)
+                + " is not available ("
+                + str(len(generations))
+                + " backup generations)"
+            )
+        digest = generations[generation]["digest"]
+        if not self.verify_object(digest):
+            raise IOError(
+                "the file of backup generation " + str(generation) + " is missing or modified"
+            )
+        return self.get_object_path(digest)
+
+    def list_generations(self):
+        """Returns a list of (generation, time, path) tuples, most recent first.  The path
+           is None for generations without an intact stored file."""
+        generations = []
+        for generation, entry in enumerate(self.read_history()):
+            object_path = None
+            if self.verify_object(entry["digest"]):
+                object_path = self.get_object_path(entry["digest"])
+            generations.append((generation, entry["time"], object_path))
+        return generations
+
+    def restore(self, generation, path):
+        """Replaces the file on path with the stored file of a generation and returns the
+           path to the stored file.  The file on path is added as the most recent
+           generation first so that the restore can be reverted."""
+        backup_path = self.get_generation_path(generation)
+        with open(backup_path, "rb") as f:
+            backup_bytes = f.read()
+        if os.path.isfile(path):
+            self.add(path)
+        write_file(backup_bytes, path)
+        self.prune()
+        return backup_path
+
+    def get_previous_generation(self, path):
+        """Returns the most recent generation that differs from the file on path and
+           has an intact stored file"""
+        digest = file_digest(path) if os.path.isfile(path) else None
+        for generation, entry in enumerate(self.read_history()):
+            if entry["digest"] != digest and self.verify_object(entry["digest"]):
+                return generation
+        raise IndexError("a previous backup generation is not available")
+
+    def prune(self):
+        """Removes generations and stored files with the retention policy"""
+        generations = self.read_history()
+        oldest_time = time.time() - self.max_age_days * 86400
+        kept_generations = generations[:1]
+        stored_size = 0
+        stored_digests = set()
+        for generation in generations:
+            if generation["digest"] not in stored_digests:
+                object_path = self.get_object_path(generation["digest"])
+                if os.path.isfile(object_path):
+                    stored_size += os.path.getsize(object_path)
+                stored_digests.add(generation["digest"])
+            if generation is kept_generations[0]:
+                continue
+            if (
+                len(kept_generations) >= self.max_generations
+                or generation["time"] < oldest_time
+                or stored_size > self.max_size
+            ):
+                break
+            kept_generations.append(generation)
+        if len(kept_generations) < len(generations):
+            self.write_history(kept_generations)
+
+        kept_digests = set(generation["digest"] for generation in kept_generations)
+        if os.path.isdir(self.objects_dir):
+            for object_file in os.listdir(self.objects_dir):
+                if object_file.split(".")[0] not in kept_digests:
+                    os.remove(os.path.join(self.objects_dir, object_file))
+
+
+def fetch_remote_definitions(
+    url_list,
+    max_connections=FLM_REMOTE_MAX_CONNECTIONS,
+    timeout=FLM_REMOTE_TIMEOUT,
+    total_timeout=FLM_REMOTE_TOTAL_TIMEOUT,
+    cache=None,
+    connection_pool=None,
+    max_size=FLM_DEFINITION_MAX_SIZE,
+    progress=None,
+    cancellation=None,
+    manifest=None,
+):
+    """Pulls remote definition files with a bounded pool of concurrent requests and returns
+       a list of (url, definition list, digest, error) tuples in the order of url_list.
+       The definition list and digest are None and error is the exception when a request
+       fails, the file exceeds max_size bytes, or the request does not complete within
+       total_timeout seconds.  A failed request does not stop the other requests.
+       Requests to the same host share keep-alive connections from connection_pool.
+       Unchanged cached responses use the filter lists of the previous update in the
+       manifest when it is defined.  progress is called with ("remote", N, M, url) as requests complete.  The
+       cancellation is checked while requests are in progress, UpdateCancelled is raised
+       and the requests that have not started are cancelled after it is cancelled."""
+    if len(url_list) == 0:
+        return []
+
+    if connection_pool is None:
+        connection_pool = ConnectionPool(max_idle_connections=max_connections)
+
+    # the requests are made by threading.Thread workers, concurrent.futures is not
+    # defined in Python 2.  The workers take the URL indices from the tasks queue
+    # and put the (index, result, error) tuples in the completed queue.
+    tasks = queue.Queue()
+    for index in range(len(url_list)):
+        tasks.put(index)
+    completed = queue.Queue()
+    stopped = threading.Event()
+
+    def fetch_worker():
+        while not stopped.is_set():
+            try:
+                index = tasks.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                result = fetch_url(
+                    url_list[index], timeout, cache, connection_pool, max_size, manifest
+                )
+                completed.put((index, result, None))
+            except Exception as e:
+                completed.put((index, None, e))
+
+    for _ in range(min(max_connections, len(url_list))):
+        # requests that are in progress after the total timeout or a cancellation
+        # end at their own timeout and do not keep the process alive
+        worker = threading.Thread(target=fetch_worker)
+        worker.daemon = True
+        worker.start()
+
+    deadline = TIMER() + total_timeout
+    completed_results = {}
+    while len(completed_results) < len(url_list):
+        remaining = deadline - TIMER()
+        if remaining <= 0:
+            break
+        try:
+            index, result, error = completed.get(
+                timeout=min(remaining, FLM_CANCELLATION_INTERVAL)
+            )
+        except queue.Empty:
+            pass
+        else:
+            completed_results[index] = (result, error)
+            if progress is not None:
+                progress(
+                    "remote", len(completed_results), len(url_list), url_list[index]
+                )
+        if cancellation is not None and cancellation.cancelled:
+            # the requests that have not started are not made
+            stopped.set()
+            connection_pool.close()
+            cancellation.check()
+    stopped.set()
+    results = []
+    for index, url in enumerate(url_list):
+        if index not in completed_results:
+            error = RuntimeError(
+                "request did not complete in " + str(total_timeout) + " seconds"
+            )
+            results.append((url, None, None, error))
+        elif completed_results[index][1] is not None:
+            results.append((url, None, None, completed_results[index][1]))
+        else:
+            definition_list, digest = completed_results[index][0]
+            results.append((url, definition_list, digest, None))
+    connection_pool.close()
+    return results
+
+
+def fetch_url(
+    url,
+    timeout,
+    cache=None,
+    connection_pool=None,
+    max_size=FLM_DEFINITION_MAX_SIZE,
+    manifest=None,
+):
+    """Pulls a remote definition file and returns a (definition list, digest) tuple.  The
+       response body is parsed while it is read.  When a cache is defined, fresh cached
+       responses are read without a request, stale cached responses are revalidated with
+       a conditional GET request, and cached responses are read when the server cannot
+       be reached.  The cached responses are not read again when the manifest has the
+       filter list of the same response body.  The request is logged as a
+       remote_fetch_url timing span."""
+    with TimingSpan("remote_fetch_url", url=url) as span:
+        definition_list, digest = _fetch_url(
+            url, timeout, cache, connection_pool, max_size, manifest
+        )
+        span.fields["names"] = len(definition_list)
+        return definition_list, digest
+
+
+def _fetch_url(url, timeout, cache, connection_pool, max_size, manifest):
+    if connection_pool is None:
+        connection_pool = ConnectionPool(max_idle_connections=0)
+    cached_response = None
+    if cache is not None:
+        cached_response = cache.get(url)
+    if cached_response is not None and cache.is_fresh(cached_response):
+        return read_cached_definitions(cache, url, cached_response, max_size, manifest)
+
+    request_headers = {}
+    if cached_response is not None:
+        if cached_response.get("etag"):
+            request_headers["If-None-Match"] = cached_response["etag"]
+        if cached_response.get("last_modified"):
+            request_headers["If-Modified-Since"] = cached_response["last_modified"]
+
+    try:
+        status, reason, response_headers, body = connection_pool.request(
+            url, request_headers, timeout
+        )
+    except (httpclient.HTTPException, urllibrequest.URLError, IOError) as e:
+        # the server cannot be reached
+        if cached_response is None:
+            raise
+        logger.warning(
+            "Using the cached copy of unreachable URL '" + url + "'. Error: " + str(e)
+        )
+        return read_cached_definitions(cache, url, cached_response, max_size, manifest)
+
+    if status != 200:
+        body.close()
+    if status == 304 and cached_response is not None:
+        cache.refresh(url, cached_response)
+        return read_cached_definitions(cache, url, cached_response, max_size, manifest)
+    elif status >= 500 and cached_response is not None:
+        logger.warning(
+            "Using the cached copy of '"
+            + url
+            + "' after a server error: "
+            + str(status)
+            + " "
+            + reason
+        )
+        return read_cached_definitions(cache, url, cached_response, max_size, manifest)
+    elif status != 200:
+        raise urllibrequest.HTTPError(url, status, reason, response_headers, None)
+
+    charset = get_content_charset(response_headers)
+    cache_file = None
+    if cache is not None:
+        cache_file = cache.open_body_file(url)
+    try:
+        reader = DefinitionReader(body, max_size, encoding=charset, copy_file=cache_file)
+        definition_list = reader.read_definitions()
+    except Exception:
+        if cache_file is not None:
+            cache.discard_body_file(cache_file)
+        raise
+    finally:
+        body.close()
+
+    if cache_file is not None:
+        cache.set_body_file(
+            url,
+            cache_file,
+            etag=response_headers.get("ETag"),
+            last_modified=response_headers.get("Last-Modified"),
+            charset=charset,
+            digest=reader.digest,
+            size=reader.size,
+        )
+    return definition_list, reader.digest
+
+
+def get_content_charset(headers):
+    """Returns the lowercase charset parameter of the Content-Type response header or
+       None.  Python 2 response headers are mimetools.Message objects."""
+    if hasattr(headers, "get_content_charset"):
+        return headers.get_content_charset()
+    charset = headers.getparam("charset")
+    if charset is not None:
+        charset = charset.lower()
+    return charset
+
+
+def read_cached_definitions(cache, url, cached_response, max_size, manifest=None):
+    """Returns a (definition list, digest) tuple for a cached remote definition file.  The
+       filter list of the previous update in the manifest is returned without reading the
+       file when it was parsed from the same response body."""
+    digest = cached_response.get("digest")
+    if manifest is not None and digest is not None:
+        if max_size is None or cached_response["size"] <= max_size:
+            filter_list = manifest.get_filter_list_by_digest("remote:" + url, digest)
+            if filter_list is not None:
+                return filter_list, digest
+    with cache.open_body(url) as f:
+        reader = DefinitionReader(f, max_size, encoding=cached_response.get("charset"))
+        return reader.read_definitions(), reader.digest
+
+
+class ResponseBody(object):
+    """ResponseBody is a file-like object that reads an HTTP response body.  gzip and
+       deflate encoded bodies are decompressed incrementally and each read returns at
+       most size decompressed bytes.  The release callable is called with True when
+       the body was read completely and the connection can be reused, and with False
+       when the body is closed before it was read completely."""
+
+    def __init__(self, response, content_encoding=None, release=None):
+        self.response = response
+        self.release = release
+        self.content_encoding = content_encoding
+        self.decompressor = None
+        if content_encoding == "gzip":
+            self.decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif content_encoding == "deflate":
+            self.decompressor = zlib.decompressobj()
+        self.raw_deflate = False
+        self.finished = False
+        self.closed = False
+
+    def read(self, size=FLM_DEFINITION_CHUNK_SIZE):
+        while True:
+            if self.decompressor is not None and self.decompressor.unconsumed_tail:
+                data = self.decompressor.decompress(
+                    self.decompressor.unconsumed_tail, size
+                )
+                if data:
+                    return data
+            if self.finished:
+                return b""
+            chunk = self.response.read(size)
+            if not chunk:
+                self.finished = True
+                self.close()
+                if self.decompressor is not None:
+                    return self.decompressor.flush()
+                return b""
+            if self.decompressor is None:
+                return chunk
+            data = self.decompress(chunk, size)
+            if data:
+                return data
+
+    def decompress(self, chunk, size):
+        try:
+            return self.decompressor.decompress(chunk, size)
+        except zlib.error:
+            if self.content_encoding != "deflate" or self.raw_deflate:
+                raise
+            # raw deflate data without the zlib header
+            self.raw_deflate = True
+            self.decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+            return self.decompressor.decompress(chunk, size)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        reusable = self.finished
+        if not reusable:
+            # read the rest of short bodies (e.g. redirect and error
+            # responses) so that the connection can be reused
+            try:
+                for _ in range(8):
+                    if not self.response.read(FLM_DEFINITION_CHUNK_SIZE):
+                        reusable = True
+                        break
+            except (httpclient.HTTPException, IOError):
+                pass
+        if self.release is not None:
+            self.release(reusable)
+        else:
+            self.response.close()
+
+
+class ConnectionPool(object):
+    """ConnectionPool keeps idle HTTP keep-alive connections for reuse in later requests
+       to the same host.  Up to max_idle_connections idle connections are kept per host.
+       Requests are made with urllib for URLs that are not HTTP(S) URLs and when a proxy
+       is defined for the URL."""
+
+    def __init__(self, max_idle_connections=FLM_REMOTE_MAX_CONNECTIONS):
+        self.max_idle_connections = max_idle_connections
+        self.idle_connections = {}
+        self.connections_opened = 0
+        self.lock = threading.Lock()
+
+    def request(self, url, headers, timeout):
+        """Makes an HTTP GET request and returns a (status, reason, headers, body) tuple.
+           The body is a ResponseBody object that must be closed.  Redirects are followed
+           and gzip or deflate encoded bodies are decoded."""
+        for redirect_count in range(FLM_REMOTE_MAX_REDIRECTS + 1):
+            if self.requires_urllib(url):
+                response = self._urlopen_request(url, headers, timeout)
+            else:
+                response = self._request(url, headers, timeout)
+            status, reason, response_headers, body = response
+            location = response_headers.get("Location")
+            if status in (301, 302, 303, 307, 308) and location:
+                body.close()
+                url = urllibparse.urljoin(url, location)
+            else:
+                return response
+        raise urllibrequest.HTTPError(
+            url, status, "Too many redirects", response_headers, None
+        )
+
+    def requires_urllib(self, url):
+        parsed_url = urllibparse.urlsplit(url)
+        if parsed_url.scheme not in ("http", "https"):
+            return True
+        return parsed_url.scheme in urllibrequest.getproxies() and not (
+            urllibrequest.proxy_bypass(parsed_url.hostname or "")
+        )
+
+    def _request(self, url, headers, timeout):
+        parsed_url = urllibparse.urlsplit(url)
+        host_key = (parsed_url.scheme, parsed_url.netloc)
+        path = parsed_url.path or "/"
+        if parsed_url.query:
+            path += "?" + parsed_url.query
+        request_headers = {"Accept-Encoding": "gzip, deflate"}
+        request_headers.update(headers)
+
+        for attempt in range(2):
+            connection, reused = self._get_connection(host_key, timeout)
+            try:
+                connection.request("GET", path, headers=request_headers)
+                response = connection.getresponse()
+            except (httpclient.HTTPException, IOError):
+                connection.close()
+                # the server may close an idle keep-alive connection at any
+                # time, retry once on a new connection when that happens
+                if reused and attempt == 0:
+                    continue
+                raise
+
+            def release(reusable, connection=connection, response=response):
+                if reusable and not response.will_close:
+                    self._put_connection(host_key, connection)
+                else:
+                    connection.close()
+
+            body = ResponseBody(response, response.getheader("Content-Encoding"), release)
+            return response.status, response.reason, response.msg, body
+
+    def _urlopen_request(self, url, headers, timeout):
+        request = urllibrequest.Request(url, headers=headers)
+        request.add_header("Accept-Encoding", "gzip, deflate")
+        try:
+            response = urllibrequest.urlopen(request, timeout=timeout)
+        except urllibrequest.HTTPError as e:
+            return e.code, str(e.reason), e.headers, ResponseBody(e)
+        body = ResponseBody(response, response.headers.get("Content-Encoding"))
+        # non-HTTP responses do not define a status code
+        return response.getcode() or 200, "OK", response.headers, body
+
+    def _get_connection(self, host_key, timeout):
+        """Returns a (connection, reused) tuple with an idle connection to the host when
+           one is available and a new connection otherwise"""
+        with self.lock:
+            idle_connections = self.idle_connections.get(host_key)
+            if idle_connections:
+                connection = idle_connections.pop()
+                connection.timeout = timeout
+                if connection.sock is not None:
+                    connection.sock.settimeout(timeout)
+                return connection, True
+            self.connections_opened += 1
+        scheme, netloc = host_key
+        if scheme == "https":
+            connection = httpclient.HTTPSConnection(netloc, timeout=timeout)
+        else:
+            connection = httpclient.HTTPConnection(netloc, timeout=timeout)
+        return connection, False
+
+    def _put_connection(self, host_key, connection):
+        with self.lock:
+            idle_connections = self.idle_connections.setdefault(host_key, [])
+            if len(idle_connections) < self.max_idle_connections:
+                idle_connections.append(connection)
+                return
+        connection.close()
+
+    def close(self):
+        """Closes all idle connections"""
+        with self.lock:
+            for idle_connections in self.idle_connections.values():
+                for connection in idle_connections:
+                    connection.close()
+            self.idle_connections = {}
+
+
+def read_settings():
+    """Returns the settings dictionary that is defined in the FLM_SETTINGS_FILE JSON file
+       with default values for settings that are not defined in the file"""
+    settings = dict(FLM_DEFAULT_SETTINGS)
+    if os.path.isfile(FLM_SETTINGS_FILE):
+        try:
+            with open(FLM_SETTINGS_FILE) as f:
+                settings.update(json.load(f))
+        except Exception as e:
+            logger.error(
+                "Unable to read the settings file. Default settings were used.  Error: "
+                + str(e)
+            )
+    return settings
+
+
+# QueueListener and flm logger handler of the current configure_logging call
+_log_listener = None
+_log_handler = None
+
+
+def configure_logging(
+    log_file=FLM_LOG_FILE,
+    level=FLM_DEFAULT_SETTINGS["log_level"],
+    max_size=FLM_DEFAULT_SETTINGS["log_max_size"],
+    backup_count=FLM_DEFAULT_SETTINGS["log_backup_count"],
+):
+    """Configures the flm logger to write to log_file with a size-based rotation after
+       max_size bytes.  Records are passed to a QueueListener thread through a
+       QueueHandler so that the file writes do not take place on the logging thread.
+       Records are written directly where the queue handlers are not available (Python
+       2).  The records are not propagated to the root logger and the handlers of other
+       loggers are not modified.  A previous configuration is replaced."""
+    global _log_listener, _log_handler
+    log_dir = os.path.dirname(log_file)
+    if not os.path.isdir(log_dir):
+        os.makedirs(log_dir)
+    file_handler = logging_handlers.RotatingFileHandler(
+        log_file, maxBytes=max_size, backupCount=backup_count
+    )
+    file_handler.setFormatter(logging.Formatter(FLM_LOG_FORMAT, FLM_LOG_DATE_FORMAT))
+
+    if _log_handler is not None:
+        logger.removeHandler(_log_handler)
+        _log_handler = None
+    if _log_listener is not None:
+        # writes the queued records and closes the previous log file
+        _log_listener.stop()
+        for handler in _log_listener.handlers:
+            handler.close()
+        _log_listener = None
+
+    if hasattr(logging_handlers, "QueueListener"):
+        log_queue = queue.Queue(-1)
+        _log_listener = logging_handlers.QueueListener(log_queue, file_handler)
+        _log_listener.start()
+        _log_handler = logging_handlers.QueueHandler(log_queue)
+    else:
+        _log_handler = file_handler
+    logger.addHandler(_log_handler)
+    logger.propagate = False
+    logger.setLevel(get_log_level(level))
+    if get_log_level(level) == logging.INFO and str(level).upper() != "INFO":
+        logger.warning("Unknown log level '" + str(level) + "'. INFO was used.")
+
+
+def get_log_level(level):
+    """Returns the logging level number for a level name or number.  Unknown values
+       return logging.INFO."""
+    if isinstance(level, int):
+        return level
+    level_number = logging.getLevelName(str(level).upper())
+    if isinstance(level_number, int):
+        return level_number
+    return logging.INFO
+
+
+def stop_logging():
+    """Writes the queued log records and stops the QueueListener thread"""
+    global _log_listener
+    if _log_listener is not None:
+        _log_listener.stop()
+        _log_listener = None
+
+
+atexit.register(stop_logging)
+
+
+class RemoteCache(object):
+    """RemoteCache stores remote definition file responses with the ETag and Last-Modified
+       response header values that are used to revalidate them.  Responses that were
+       pulled or revalidated less than max_age seconds ago are fresh."""
+
+    def __init__(self, cache_dir, max_age=0):
+        self.cache_dir = cache_dir
+        self.max_age = max_age
+
+    def get_path(self, url, extension):
+        return os.path.join(
+            self.cache_dir, hashlib.sha1(url.encode("utf-8")).hexdigest() + extension
+        )
+
+    def get(self, url):
+        """Returns the cached response metadata dictionary for url or None"""
+        try:
+            with open(self.get_path(url, ".json")) as f:
+                cached_response = json.load(f)
+        except Exception:
+            return None
+        if cached_response.get("url") != url or not os.path.isfile(
+            self.get_path(url, ".body")
+        ):
+            return None
+        return cached_response
+
+    def is_fresh(self, cached_response):
+        return time.time() - cached_response["fetched"] < self.max_age
+
+    def open_body(self, url):
+        return open(self.get_path(url, ".body"), "rb")
+
+    def open_body_file(self, url):
+        """Returns a temporary file for a new response body of url or None if the cache
+           directory is not writable.  Record the file with set_body_file or remove it
+           with discard_body_file."""
+        try:
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            fd, temp_path = tempfile.mkstemp(
+                dir=self.cache_dir, prefix=os.path.basename(self.get_path(url, "")), suffix=".tmp"
+            )
+            os.close(fd)
+            return open(temp_path, "wb")
+        except Exception as e:
+            logger.warning("Unable to cache '" + url + "'. Error: " + str(e))
+            return None
+
+    def discard_body_file(self, body_file):
+        body_file.close()
+        try:
+            os.remove(body_file.name)
+        except OSError:
+            pass
+
+    def set_body_file(
+        self,
+        url,
+        body_file,
+        etag=None,
+        last_modified=None,
+        charset=None,
+        digest=None,
+        size=None,
+    ):
+        """Records the response body in body_file as the cached response of url with the
+           SHA-1 digest and size of the body"""
+        try:
+            body_file.close()
+            os.rename(body_file.name, self.get_path(url, ".body"))
+            cached_response = {
+                "url": url,
+                "etag": etag,
+                "last_modified": last_modified,
+                "charset": charset,
+                "digest": digest,
+                "size": size,
+                "fetched": time.time(),
+            }
+            self._write(
+                self.get_path(url, ".json"), json.dumps(cached_response).encode("utf-8")
+            )
+        except Exception as e:
+            logger.warning("Unable to cache '" + url + "'. Error: " + str(e))
+
+    def refresh(self, url, cached_response):
+        """Records the revalidation of a cached response"""
+        cached_response["fetched"] = time.time()
+        try:
+            self._write(
+                self.get_path(url, ".json"), json.dumps(cached_response).encode("utf-8")
+            )
+        except Exception as e:
+            logger.warning("Unable to cache '" + url + "'. Error: " + str(e))
+
+    def _write(self, path, data):
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.rename(temp_path, path)
+
+
+class DefinitionsManifest(object):
+    """DefinitionsManifest records the modification time, size, and content hash of each
+       definition source with the filter list that was parsed from it.  The sources of
+       the previous update are read with the load method and the sources of the current
+       update are recorded with the add method.  Sources that are not added in the current
+       update are removed from the manifest when it is saved."""
+
+    def __init__(self, path):
+        self.path = path
+        self.previous_sources = {}
+        self.sources = {}
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                self.previous_sources = json.load(f)["sources"]
+        except Exception:
+            # missing or unreadable manifest, all sources are parsed
+            self.previous_sources = {}
+
+    def get_filter_list(self, source_key, stat):
+        """Returns the filter list of an unchanged source or None if the source is new or
+           modified.  A source is unchanged if the modification time and size in the stat
+           result match the previous update.  Sources that match are added to the current
+           update."""
+        source = self.previous_sources.get(source_key)
+        if source is None or "mtime" not in source:
+            return None
+        if source["mtime"] != stat.st_mtime or source["size"] != stat.st_size:
+            return None
+        self.sources[source_key] = source
+        return source["list"]
+
+    def get_filter_list_by_digest(self, source_key, digest):
+        """Returns the filter list of a source with the content hash digest in the
+           previous update or None.  Sources that match are added to the current update."""
+        source = self.previous_sources.get(source_key)
+        if source is None or source["digest"] != digest:
+            return None
+        self.sources[source_key] = source
+        return source["list"]
+
+    def get_previous_filter_list(self, source_key):
+        """Returns a (filter list, digest) tuple with the filter list of a source in the
+           previous update or (None, None) if the source is new.  Sources that are found
+           are added to the current update."""
+        source = self.previous_sources.get(source_key)
+        if source is None:
+            return None, None
+        self.sources[source_key] = source
+        return source["list"], source["digest"]
+
+    def add(self, source_key, filter_list, digest, stat=None):
+        source = {"digest": digest, "list": filter_list}
+        if stat is not None:
+            source["mtime"] = stat.st_mtime
+            source["size"] = stat.st_size
+        self.sources[source_key] = source
+
+    def remove(self, source_key):
+        self.sources.pop(source_key, None)
+
+    def save(self):
+        manifest_dir = os.path.dirname(self.path)
+        if not os.path.isdir(manifest_dir):
+            os.makedirs(manifest_dir)
+        # an interrupted save must not leave a truncated manifest that discards the
+        # cached state of every definition file on the next update
+        write_file(json.dumps({"sources": self.sources}).encode("utf-8"), self.path)
+
+
+def get_local_filter_definitions_list(
+    definitions_dir=FLM_GLYPHSFILTERS_DIR,
+    manifest=None,
+    max_size=FLM_DEFINITION_MAX_SIZE,
+    progress=None,
+    cancellation=None,
+    parsed_filters=None,
+    name_pool=None,
+):
+    """Reads and launches parsing of the local definition files in the top level of
+       definitions_dir, returns a Python list of Filter objects that are created from
+       the parse.  Filter lists for files that are unchanged since the last update are
+       reused from the manifest.  DefinitionSizeError is raised for files that exceed
+       max_size bytes.  progress is called with ("local", N, M, file path) after each
+       file and the cancellation is checked before each file.
+
+       parsed_filters is an optional dictionary of definition file paths to the Filter
+       objects of a previous call.  The files in it are not read again and it is updated
+       with the Filter objects of this call.  Set the Filter objects of changed files to
+       None before the next call.  The glyph names are interned in name_pool, a new
+       NamePool is used when it is not defined."""
+    local_definitions_list = []
+    if name_pool is None:
+        name_pool = NamePool()
+
+    if not os.path.isdir(definitions_dir):
+        # return an empty list if the directory is not found
+        return []
+
+    raw_definitions_file_list = [
+        f
+        for f in sorted(os.listdir(definitions_dir))
+        if os.path.isfile(os.path.join(definitions_dir, f))
+    ]
+    definitions_file_list = []
+    # filter list for dotfiles.  This eliminates macOS .DS_Store files that lead to errors during processing
+    for definition_file in raw_definitions_file_list:
+        if definition_file[0] == ".":
+            pass
+        else:
+            definitions_file_list.append(definition_file)
+    definition_paths = []
+    for file_number, definition_file in enumerate(definitions_file_list, 1):
+        if cancellation is not None:
+            cancellation.check()
+        definition_path = os.path.join(definitions_dir, definition_file)
+        new_filter = None
+        if parsed_filters is not None:
+            new_filter = parsed_filters.get(definition_path)
+        if new_filter is None:
+            new_filter = read_local_filter_definition(
+                definition_path, manifest, max_size, name_pool
+            )
+        definition_paths.append(definition_path)
+        local_definitions_list.append(new_filter)
+        if progress is not None:
+            progress("local", file_number, len(definitions_file_list), definition_path)
+
+    if parsed_filters is not None:
+        for definition_path in set(parsed_filters) - set(definition_paths):
+            # the file was removed
+            if manifest is not None:
+                manifest.remove("local:" + definition_path)
+        parsed_filters.clear()
+        parsed_filters.update(zip(definition_paths, local_definitions_list))
+    return local_definitions_list
+
+
+def read_local_filter_definition(definition_path, manifest, max_size, name_pool):
+    """Returns a Filter object for the local definition file on definition_path with the
+       glyph names interned in name_pool"""
+    source_key = "local:" + definition_path
+    # define the filter list name as the file name
+    new_filter = Filter(os.path.basename(definition_path).split(".")[0])
+    definition_stat = os.stat(definition_path)
+    if manifest is not None:
+        filter_list = manifest.get_filter_list(source_key, stat=definition_stat)
+        if filter_list is not None:
+            new_filter.list = name_pool.intern_tuple(filter_list)
+            return new_filter
+
+    with open(definition_path, "rb") as f:
+        # define the filter object with the definitions in the file
+        reader = DefinitionReader(f, max_size)
+        try:
+            new_filter.list = name_pool.intern_tuple(
+                reader.read_definitions(new_filter.comment_delimiters)
+            )
+        except DefinitionSizeError as e:
+            raise DefinitionSizeError(definition_path + ": " + str(e))
+    if manifest is not None:
+        manifest.add(source_key, new_filter.list, reader.digest, stat=definition_stat)
+    return new_filter
+
+
+def read_remote_definitions_urls(remote_definitions_file=FLM_REMOTE_DEF_FILE):
+    """Returns the list of URLs in a remote definitions file"""
+    url_list = []
+    if not os.path.isfile(remote_definitions_file):
+        return url_list
+    with open(remote_definitions_file) as f:
+        for line in f:
+            url = line.strip()
+            if len(url) == 0:
+                pass
+            elif url[0] in ("#", "/"):
+                pass
+            else:
+                url_list.append(url)
+    return url_list
+
+
+def get_remote_filter_definitions_list(
+    remote_definitions_file=FLM_REMOTE_DEF_FILE,
+    manifest=None,
+    fetch_errors=None,
+    remote_cache=None,
+    max_size=FLM_DEFINITION_MAX_SIZE,
+    progress=None,
+    cancellation=None,
+    name_pool=None,
+    unavailable_filter_names=None,
+):
+    """Pulls, reads, and launches parsing of remote definition files, returns a Python list of
+       Filter objects that are created from the parse.  The remote sources are recorded in
+       the manifest.  URLs that cannot be pulled or that exceed max_size bytes are logged
+       and appended to the fetch_errors list.  The filter lists of these URLs are read from
+       the remote_cache copy or the previous update in the manifest instead, the names of
+       the filter lists that are not found in either are appended to the
+       unavailable_filter_names list.  Responses are revalidated against the remote_cache
+       when it is defined.  See fetch_remote_definitions for progress and cancellation.
+       The glyph names are interned in name_pool, a new NamePool is used when it is not
+       defined."""
+    remote_definitions_list = []
+    if name_pool is None:
+        name_pool = NamePool()
+
+    url_list = read_remote_definitions_urls(remote_definitions_file)
+    if len(url_list) == 0:
+        return []
+
+    # pull the remote definition files concurrently, the responses
+    # are returned in the order of the URL definitions file
+    for url, definition_list, digest, error in fetch_remote_definitions(
+        url_list,
+        cache=remote_cache,
+        max_size=max_size,
+        progress=progress,
+        cancellation=cancellation,
+        manifest=manifest,
+    ):
+        if error is not None:
+            logger.error(
+                "Unable to pull the remote definition file '"
+                + url
+                + "'. Error: "
+                + str(error)
+            )
+            if fetch_errors is not None:
+                fetch_errors.append(url)
+            # a request that fails, e.g. on a slow server, does not remove the filter list
+            definition_list, digest = read_previous_remote_definitions(
+                url, manifest, remote_cache, max_size
+            )
+            if definition_list is None:
+                if unavailable_filter_names is not None:
+                    unavailable_filter_names.append(get_remote_filter_name(url))
+                continue
+
+        new_filter = Filter(get_remote_filter_name(url))
+        new_filter.list = name_pool.intern_tuple(definition_list)
+        if manifest is not None:
+            manifest.add("remote:" + url, new_filter.list, digest)
+        remote_definitions_list.append(new_filter)
+
+    return remote_definitions_list
+
+
+def get_remote_filter_name(url):
+    """Returns the filter list name of a remote definition file URL, the file name in the
+       URL path"""
+    # unquote URL defined in list to define file name
+    # (in case the user pasted a urlencoded string)
+    decoded_url = urllibparse.unquote(url)
+    parsed_url = urllibparse.urlparse(decoded_url).path
+    return os.path.split(parsed_url)[1]
+
+
+def read_previous_remote_definitions(url, manifest, remote_cache, max_size):
+    """Returns a (definition list, digest) tuple for a remote definition file that cannot
+       be pulled.  The definitions are read from the cached copy in the remote_cache or
+       the filter list of the previous update in the manifest.  Returns (None, None) when
+       neither is available."""
+    if remote_cache is not None:
+        cached_response = remote_cache.get(url)
+        if cached_response is not None:
+            try:
+                definitions = read_cached_definitions(
+                    remote_cache, url, cached_response, max_size, manifest
+                )
+                logger.warning("Using the cached copy of '" + url + "'")
+                return definitions
+            except Exception as e:
+                logger.warning(
+                    "Unable to read the cached copy of '" + url + "'. Error: " + str(e)
+                )
+    if manifest is not None:
+        filter_list, digest = manifest.get_previous_filter_list("remote:" + url)
+        if filter_list is not None:
+            logger.warning("Using the filter list of the previous update for '" + url + "'")
+            return filter_list, digest
+    return None, None
+
+
+def get_default_glyphdata_paths():
+    """Returns the Glyphs application GlyphData.xml file path followed by the paths to
+       custom GlyphData.xml and GlyphData-*.xml files in the Glyphs Info directory"""
+    custom_paths = []
+    if os.path.isdir(GLYPHS_CUSTOM_GLYPHDATA_DIR):
+        custom_paths = [
+            os.path.join(GLYPHS_CUSTOM_GLYPHDATA_DIR, filename)
+            for filename in os.listdir(GLYPHS_CUSTOM_GLYPHDATA_DIR)
+            if filename.startswith("GlyphData") and filename.endswith(".xml")
+        ]
+    return [GLYPHS_GLYPHDATA_FILE] + sorted(custom_paths)
+
+
+class GlyphDataIndex(object):
+    """GlyphDataIndex answers glyph name queries over the glyph records of GlyphData.xml
+       files.  The records are stored as columns that are indexed by record position.
+       Code point queries use a sorted array of code points, production name prefix
+       queries use a sorted array of production names, and script queries use an
+       inverted index of script names to record positions.  Query results are memoized."""
+
+    def __init__(self, names, unicodes, productions, scripts):
+        self.names = names
+        self.unicodes = unicodes
+        self.productions = productions
+        self.scripts = scripts
+        self.results = {}
+        self._code_points = None
+        self._production_names = None
+        self._script_index = None
+
+    @classmethod
+    def from_files(cls, paths):
+        """Parses the GlyphData XML files on paths incrementally and returns a
+           GlyphDataIndex with the glyph records of all files in path order"""
+        name_pool = NamePool()
+        names = []
+        unicodes = []
+        productions = []
+        scripts = []
+        for path in paths:
+            root = None
+            for event, element in ET.iterparse(path, events=("start", "end")):
+                if event == "start":
+                    if root is None:
+                        root = element
+                    continue
+                if element is root:
+                    break
+                attrib = element.attrib
+                name = attrib.get("name", "")
+                if len(name) > 0:
+                    names.append(name_pool.intern(name))
+                    unicodes.append(attrib.get("unicode", ""))
+                    productions.append(attrib.get("production", ""))
+                    scripts.append(attrib.get("script", "").lower())
+                # release the element and drop the reference that the root element holds
+                element.clear()
+                root.clear()
+        return cls(names, unicodes, productions, scripts)
+
+    def __len__(self):
+        return len(self.names)
+
+    def get_code_points(self):
+        """Returns a (code points, record positions) tuple of arrays in code point order"""
+        # the array typecodes are str, Python 2 releases before 2.7.11 raise TypeError for
+        # the unicode strings of this module
+        if self._code_points is None:
+            records = []
+            for position, unicode_value in enumerate(self.unicodes):
+                if len(unicode_value) > 0:
+                    try:
+                        records.append((int(unicode_value, 16), position))
+                    except ValueError:
+                        pass
+            records.sort()
+            self._code_points = (
+                array(str("l"), [record[0] for record in records]),
+                array(str("l"), [record[1] for record in records]),
+            )
+        return self._code_points
+
+    def get_production_names(self):
+        """Returns a (production names, record positions) tuple in production name order"""
+        if self._production_names is None:
+            records = sorted(
+                (production, position)
+                for position, production in enumerate(self.productions)
+                if len(production) > 0
+            )
+            self._production_names = (
+                [record[0] for record in records],
+                array(str("l"), [record[1] for record in records]),
+            )
+        return self._production_names
+
+    def get_script_index(self):
+        """Returns a dictionary of lower case script names to record position lists"""
+        if self._script_index is None:
+            script_index = {}
+            for position, script in enumerate(self.scripts):
+                if len(script) > 0:
+                    script_index.setdefault(script, []).append(position)
+            self._script_index = script_index
+        return self._script_index
+
+    def find_range(self, first_code_point, last_code_point):
+        """Returns the glyph names with a code point in the inclusive range in code
+           point order"""
+        code_points, positions = self.get_code_points()
+        start = bisect.bisect_left(code_points, first_code_point)
+        end = bisect.bisect_right(code_points, last_code_point)
+        return tuple([self.names[position] for position in positions[start:end]])
+
+    def find_script(self, script):
+        """Returns the glyph names of the script in GlyphData record order"""
+        positions = self.get_script_index().get(script.lower(), ())
+        return tuple([self.names[position] for position in positions])
+
+    def find_production_prefix(self, prefix):
+        """Returns the glyph names with a production name that begins with prefix in
+           GlyphData record order"""
+        production_names, positions = self.get_production_names()
+        start = bisect.bisect_left(production_names, prefix)
+        end = start
+        while end < len(production_names) and production_names[end].startswith(prefix):
+            end += 1
+        return tuple([self.names[position] for position in sorted(positions[start:end])])
+
+    def query(self, directive, argument):
+        """Returns the glyph names for a query directive and its argument"""
+        key = (directive, argument)
+        if key not in self.results:
+            if directive == "@range":
+                self.results[key] = self.find_range(*parse_code_point_range(argument))
+            elif directive == "@script":
+                self.results[key] = self.find_script(argument)
+            else:
+                self.results[key] = self.find_production_prefix(argument)
+        return self.results[key]
+
+
+class GlyphDataFiles(object):
+    """GlyphDataFiles loads a GlyphDataIndex from the GlyphData XML files on paths on
+       first use and loads it again when one of the files is modified.  Paths to files
+       that do not exist are ignored."""
+
+    def __init__(self, paths=None):
+        if paths is None:
+            paths = get_default_glyphdata_paths()
+        self.paths = list(paths)
+        self.stats = None
+        self.index = None
+
+    def get_index(self):
+        """Returns the current GlyphDataIndex or None when there are no GlyphData files"""
+        stats = []
+        for path in self.paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            stats.append((path, stat.st_mtime, stat.st_size))
+        if stats != self.stats:
+            self.stats = stats
+            if len(stats) == 0:
+                self.index = None
+            else:
+                self.index = GlyphDataIndex.from_files([stat[0] for stat in stats])
+                logger.info(
+                    "Loaded " + str(len(self.index)) + " GlyphData glyph records"
+                )
+        return self.index
+
+
+def parse_code_point_range(argument):
+    """Returns a (first code point, last code point) tuple for a U+XXXX..U+YYYY range or
+       a single U+XXXX code point"""
+    bounds = argument.split("..")
+    if len(bounds) > 2:
+        raise DefinitionReferenceError("'" + argument + "' is not a valid code point range")
+    code_points = []
+    for bound in bounds:
+        bound = bound.strip()
+        if bound[:2] in ("U+", "u+"):
+            bound = bound[2:]
+        try:
+            code_points.append(int(bound, 16))
+        except ValueError:
+            raise DefinitionReferenceError(
+                "'" + argument + "' is not a valid code point range"
+            )
+    if code_points[0] > code_points[-1]:
+        raise DefinitionReferenceError(
+            "'" + argument + "' is not a valid code point range"
+        )
+    return code_points[0], code_points[-1]
+
+
+# Directive lines begin with the directive prefix and are followed by a filter list name:
+#   @include Basic Latin     adds the glyph names of the filter list (union)
+#   @exclude Basic Latin     removes the glyph names of the filter list
+#   @intersect Basic Latin   keeps the glyph names that are in the filter list
+# or by a GlyphData query:
+#   @range U+0100..U+017F    adds the glyph names with a code point in the range
+#   @script cyrillic         adds the glyph names of the script
+#   @production uni04        adds the glyph names with a production name prefix
+DIRECTIVE_PREFIX = "@"
+LIST_DIRECTIVES = ("@include", "@exclude", "@intersect")
+QUERY_DIRECTIVES = ("@range", "@script", "@production")
+DIRECTIVES = LIST_DIRECTIVES + QUERY_DIRECTIVES
+
+
+def parse_directive(line):
+    """Returns a (directive, filter list name or query) tuple for a directive line"""
+    parts = line.split(None, 1)
+    if parts[0] not in DIRECTIVES:
+        raise DefinitionReferenceError("'" + line + "' is not a valid directive")
+    if len(parts) == 1:
+        if parts[0] in QUERY_DIRECTIVES:
+            raise DefinitionReferenceError("'" + line + "' does not define a query")
+        raise DefinitionReferenceError("'" + line + "' does not define a filter list name")
+    return parts[0], parts[1].strip()
+
+
+def has_directives(definition_list):
+    for entry in definition_list:
+        if entry[0] == DIRECTIVE_PREFIX:
+            return True
+    return False
+
+
+class DefinitionResolver(object):
+    """DefinitionResolver expands the directives in filter list definitions.  The filter
+       lists that a definition references are its dependencies.  Resolved filter lists
+       are memoized and when a definition changes, only the memoized filter lists of the
+       definition and of the definitions that depend on it are resolved again.  Query
+       directives are evaluated with the GlyphDataIndex of glyphdata_files and the
+       definitions with queries are resolved again when the GlyphData files change.
+       DefinitionReferenceError is raised for invalid directives, references to undefined
+       filter lists, and dependency cycles."""
+
+    def __init__(self, glyphdata_files=None):
+        self.definitions = {}
+        self.dependencies = {}
+        self.resolved = {}
+        self.query_definitions = set()
+        self.glyphdata_files = glyphdata_files
+        self.glyphdata_index = None
+
+    def update(self, definitions):
+        """Replaces the definitions with a dictionary of filter list names to definition
+           lists.  Memoized filter lists that are affected by the changes are removed."""
+        for name in list(self.definitions):
+            if name not in definitions:
+                self.remove_definition(name)
+        for name, definition_list in definitions.items():
+            self.set_definition(name, definition_list)
+        self.refresh_glyphdata()
+
+    def refresh_glyphdata(self):
+        """Loads the GlyphData index for query directives when it is modified"""
+        if self.glyphdata_files is None or len(self.query_definitions) == 0:
+            return
+        index = self.glyphdata_files.get_index()
+        if index is not self.glyphdata_index:
+            self.glyphdata_index = index
+            for name in self.query_definitions:
+                self.invalidate(name)
+
+    def set_definition(self, name, definition_list):
+        definition_list = tuple(definition_list)
+        if self.definitions.get(name) == definition_list:
+            return
+        self.invalidate(name)
+        self.definitions[name] = definition_list
+        dependencies = set()
+        self.query_definitions.discard(name)
+        for entry in definition_list:
+            if entry[0] == DIRECTIVE_PREFIX:
+                try:
+                    directive, argument = parse_directive(entry)
+                except DefinitionReferenceError:
+                    # reported when the definition is resolved
+                    continue
+                if directive in QUERY_DIRECTIVES:
+                    self.query_definitions.add(name)
+                else:
+                    dependencies.add(argument)
+        self.dependencies[name] = dependencies
+
+    def remove_definition(self, name):
+        self.invalidate(name)
+        self.definitions.pop(name, None)
+        self.dependencies.pop(name, None)
+        self.query_definitions.discard(name)
+
+    def get_dependents(self, name):
+        """Returns the set of names of the definitions that depend on name directly or
+           through other definitions"""
+        dependents = set()
+        pending = [name]
+        while len(pending) > 0:
+            dependency = pending.pop()
+            for dependent, dependencies in self.dependencies.items():
+                if dependency in dependencies and dependent not in dependents:
+                    dependents.add(dependent)
+                    pending.append(dependent)
+        return dependents
+
+    def invalidate(self, name):
+        self.resolved.pop(name, None)
+        for dependent in self.get_dependents(name):
+            self.resolved.pop(dependent, None)
+
+    def resolve(self, name, path=()):
+        """Returns the resolved tuple of glyph names of the filter list name"""
+        if name in self.resolved:
+            return self.resolved[name]
+        if name in path:
+            cycle = path[path.index(name):] + (name,)
+            raise DefinitionReferenceError(
+                "the filter list definitions include a cycle: " + " -> ".join(cycle)
+            )
+        if name not in self.definitions:
+            raise DefinitionReferenceError(
+                "'" + path[-1] + "' references the undefined filter list '" + name + "'"
+            )
+        definition_list = self.definitions[name]
+        if not has_directives(definition_list):
+            # definitions without directives are used unchanged
+            self.resolved[name] = definition_list
+            return definition_list
+
+        path = path + (name,)
+        glyph_names = []
+        glyph_name_set = set()
+        excluded_set = set()
+        intersection_sets = []
+        for entry in definition_list:
+            if entry[0] == DIRECTIVE_PREFIX:
+                try:
+                    directive, argument = parse_directive(entry)
+                    if directive in QUERY_DIRECTIVES:
+                        new_glyph_names = self.query(directive, argument)
+                except DefinitionReferenceError as e:
+                    raise DefinitionReferenceError("'" + name + "': " + str(e))
+                if directive in QUERY_DIRECTIVES:
+                    pass
+                elif directive == "@include":
+                    new_glyph_names = self.resolve(argument, path)
+                elif directive == "@exclude":
+                    excluded_set.update(self.resolve(argument, path))
+                    continue
+                else:
+                    intersection_sets.append(set(self.resolve(argument, path)))
+                    continue
+            else:
+                new_glyph_names = (entry,)
+            for glyph_name in new_glyph_names:
+                if glyph_name not in glyph_name_set:
+                    glyph_name_set.add(glyph_name)
+                    glyph_names.append(glyph_name)
+
+        if len(excluded_set) > 0:
+            glyph_names = [
+                glyph_name for glyph_name in glyph_names if glyph_name not in excluded_set
+            ]
+        for intersection_set in intersection_sets:
+            glyph_names = [
+                glyph_name for glyph_name in glyph_names if glyph_name in intersection_set
+            ]
+        resolved = tuple(glyph_names)
+        self.resolved[name] = resolved
+        return resolved
+
+    def query(self, directive, argument):
+        if self.glyphdata_index is None:
+            raise DefinitionReferenceError(
+                "'" + directive + " " + argument + "' requires a GlyphData.xml file"
+            )
+        return self.glyphdata_index.query(directive, argument)
+
+
+def resolve_filter_definitions(filter_definitions_list, resolver=None, errors=None):
+    """Returns a list of Filter objects with the directives in the filter lists of
+       filter_definitions_list expanded.  Directives reference the other filter lists in
+       filter_definitions_list by name.  Filter lists that cannot be resolved are logged,
+       appended to the errors list, and are not included in the returned list.  Use the
+       same resolver across updates to reuse the unchanged resolved filter lists."""
+    if resolver is None:
+        resolver = DefinitionResolver()
+    resolver.update(
+        dict((a_filter.name, a_filter.list) for a_filter in filter_definitions_list)
+    )
+    resolved_definitions_list = []
+    for a_filter in filter_definitions_list:
+        if not has_directives(a_filter.list):
+            resolved_definitions_list.append(a_filter)
+            continue
+        try:
+            resolved_list = resolver.resolve(a_filter.name)
+        except DefinitionReferenceError as e:
+            logger.error(
+                "Unable to resolve the filter list '" + a_filter.name + "'. Error: " + str(e)
+            )
+            if errors is not None:
+                errors.append(a_filter.name)
+            continue
+        resolved_filter = Filter(a_filter.name)
+        # the resolved glyph names are the interned definition and GlyphData names
+        resolved_filter._list = resolved_list
+        resolved_definitions_list.append(resolved_filter)
+    return resolved_definitions_list
+
+
+def build_plist_data(previous_plist_data, filter_definitions_list, kept_filter_names=()):
+    """Returns new CustomFilter.plist data with the filter lists in previous_plist_data
+       replaced by the Filter objects in filter_definitions_list.  Previous non-filter
+       list contents are kept.  The previous filter lists with a name in kept_filter_names
+       that is not defined in filter_definitions_list, e.g. the filter lists of remote
+       definition files that cannot be pulled, are kept unchanged in their position."""
+    new_plist_list = []
+    new_filter_names = set(new_filter.name for new_filter in filter_definitions_list)
+    kept_filter_names = set(kept_filter_names) - new_filter_names
+    # kept filter lists by the name of the preceding new filter list in the previous data
+    kept_definitions = {}
+    preceding_name = None
+
+    # filter out previous filter list contents in the CustomFilter.plist
+    # file and keep previous non-filter list contents
+    for previous_definition in previous_plist_data:
+        if "list" in previous_definition:
+            name = previous_definition.get("name")
+            if name in kept_filter_names:
+                kept_definitions.setdefault(preceding_name, []).append(previous_definition)
+                logger.debug("Keeping previously defined filter list '%s'", name)
+                continue
+            if name in new_filter_names:
+                preceding_name = name
+            if "name" in previous_definition:
+                logger.debug(
+                    "Removing previously defined filter list '%s'",
+                    previous_definition["name"],
+                )
+        else:
+            new_plist_list.append(previous_definition)
+            if "name" in previous_definition:
+                logger.debug(
+                    "Saving previously defined CustomFilters.plist data with name '%s'",
+                    previous_definition["name"],
+                )
+
+    # add new data that was read from local and remote
+    # definition files to a data format that translates
+    # to a plist file
+    new_plist_list.extend(kept_definitions.pop(None, []))
+    for new_filter in filter_definitions_list:
+        new_definition = {"name": new_filter.name, "list": list(new_filter.list)}
+        new_plist_list.append(new_definition)
+        logger.debug("Adding new filter list '%s'", new_definition["name"])
+        new_plist_list.extend(kept_definitions.pop(new_filter.name, []))
+
+    return new_plist_list
+
+
+class DefinitionSources(object):
+    """DefinitionSources parses local definition directories and remote definitions
+       files once and returns the parsed Filter objects to all build targets that use
+       them.  The optional manifest and the GlyphData files for query directives are
+       shared by all sources.  Changed files are read again after the update method
+       discards them.  The glyph names of the files that are read between two updates
+       share a NamePool."""
+
+    def __init__(
+        self,
+        manifest=None,
+        remote_cache=None,
+        max_size=FLM_DEFINITION_MAX_SIZE,
+        glyphdata_files=None,
+    ):
+        self.manifest = manifest
+        self.remote_cache = remote_cache
+        self.max_size = max_size
+        self.glyphdata_files = glyphdata_files
+        self.fetch_errors = []
+        self.resolve_errors = []
+        self.name_pool = NamePool()
+        self._local = {}
+        self._local_files = {}
+        self._remote = {}
+        self._remote_unavailable_filter_names = {}
+
+    def get_local(self, definitions_dir):
+        key = os.path.abspath(definitions_dir)
+        if key not in self._local:
+            self._local[key] = get_local_filter_definitions_list(
+                key,
+                self.manifest,
+                self.max_size,
+                parsed_filters=self._local_files.setdefault(key, {}),
+                name_pool=self.name_pool,
+            )
+        return self._local[key]
+
+    def get_remote(self, remote_definitions_file):
+        key = os.path.abspath(remote_definitions_file)
+        if key not in self._remote:
+            unavailable_filter_names = []
+            self._remote[key] = get_remote_filter_definitions_list(
+                key,
+                self.manifest,
+                self.fetch_errors,
+                self.remote_cache,
+                self.max_size,
+                name_pool=self.name_pool,
+                unavailable_filter_names=unavailable_filter_names,
+            )
+            self._remote_unavailable_filter_names[key] = unavailable_filter_names
+        return self._remote[key]
+
+    def get_unavailable_filter_names(self, remote_definitions_file):
+        """Returns the names of the filter lists of a remote definitions file that were
+           not pulled and are not cached"""
+        key = os.path.abspath(remote_definitions_file)
+        return self._remote_unavailable_filter_names.get(key, [])
+
+    def update(self, changed_paths):
+        """Discards the parsed filter lists of the changed local definition files and
+           remote definitions files on changed_paths so that the next build reads only
+           these files again.  A changed local definitions directory path discards all
+           files in the directory.  Dotfiles are ignored.  Returns the set of the changed
+           definitions directory and remote definitions file paths."""
+        changed_sources = set()
+        for path in changed_paths:
+            path = os.path.abspath(path)
+            if path in self._remote:
+                del self._remote[path]
+                self._remote_unavailable_filter_names.pop(path, None)
+                changed_sources.add(path)
+            if path in self._local_files:
+                self._local.pop(path, None)
+                for definition_path in self._local_files[path]:
+                    self._local_files[path][definition_path] = None
+                changed_sources.add(path)
+            elif os.path.dirname(path) in self._local_files:
+                if os.path.basename(path)[0] == ".":
+                    continue
+                definitions_dir = os.path.dirname(path)
+                self._local.pop(definitions_dir, None)
+                self._local_files[definitions_dir][path] = None
+                changed_sources.add(definitions_dir)
+        if len(changed_sources) > 0:
+            # the pool of the previous files holds the glyph names of discarded filter
+            # lists, the unchanged Filter objects keep their own references
+            self.name_pool = NamePool()
+        return changed_sources
+
+
+class BuildTarget(object):
+    """BuildTarget defines a CustomFilter.plist file that is built from the filter lists
+       in one or more local definition directories and remote definitions files.  The
+       non-filter list contents of the base plist file are kept in the built file.  The
+       resolved filter lists and the data of unchanged plist files are reused across
+       builds of the same target."""
+
+    def __init__(self, plist_path, definitions_dirs, remote_definitions_files=(), base_plist_path=None):
+        self.plist_path = plist_path
+        self.definitions_dirs = list(definitions_dirs)
+        self.remote_definitions_files = list(remote_definitions_files)
+        self.base_plist_path = base_plist_path
+        self.resolver = None
+        self.plist_data = {}  # plist path: ((modification time, size), plist data)
+
+    def get_source_paths(self):
+        """Returns the set of absolute definitions directory and remote definitions file
+           paths of the target"""
+        return set(
+            os.path.abspath(path)
+            for path in self.definitions_dirs + self.remote_definitions_files
+        )
+
+    def get_filter_definitions_list(self, sources):
+        filter_definitions_list = []
+        for definitions_dir in self.definitions_dirs:
+            filter_definitions_list.extend(sources.get_local(definitions_dir))
+        for remote_definitions_file in self.remote_definitions_files:
+            filter_definitions_list.extend(sources.get_remote(remote_definitions_file))
+        return filter_definitions_list
+
+    def read_plist(self, path):
+        """Returns the data of the plist file on path.  The data of the previous build is
+           returned if the modification time and size of the file did not change."""
+        plist_stat = os.stat(path)
+        plist_key = (plist_stat.st_mtime, plist_stat.st_size)
+        cached_plist = self.plist_data.get(path)
+        if cached_plist is not None and cached_plist[0] == plist_key:
+            return cached_plist[1]
+        plist_data = read_plist(path)
+        self.plist_data[path] = (plist_key, plist_data)
+        return plist_data
+
+    def build(self, sources):
+        """Builds the plist file and returns a (changed, filter list count) tuple.  The
+           file is only written when its contents change."""
+        previous_plist_data = []
+        if os.path.isfile(self.plist_path):
+            previous_plist_data = self.read_plist(self.plist_path)
+        if self.resolver is None:
+            self.resolver = DefinitionResolver(sources.glyphdata_files)
+        filter_definitions_list = resolve_filter_definitions(
+            self.get_filter_definitions_list(sources),
+            self.resolver,
+            sources.resolve_errors,
+        )
+        unavailable_filter_names = []
+        for remote_definitions_file in self.remote_definitions_files:
+            unavailable_filter_names.extend(
+                sources.get_unavailable_filter_names(remote_definitions_file)
+            )
+        base_plist_data = previous_plist_data
+        if self.base_plist_path is not None:
+            # the filter lists of the remote definition files that cannot be pulled
+            # are kept from the previous file
+            base_plist_data = [
+                definition
+                for definition in self.read_plist(self.base_plist_path)
+                if "list" not in definition
+            ] + [definition for definition in previous_plist_data if "list" in definition]
+        new_plist_list = build_plist_data(
+            base_plist_data, filter_definitions_list, unavailable_filter_names
+        )
+        if new_plist_list == previous_plist_data and os.path.isfile(self.plist_path):
+            return False, len(filter_definitions_list)
+        plist_dir = os.path.dirname(os.path.abspath(self.plist_path))
+        if not os.path.isdir(plist_dir):
+            os.makedirs(plist_dir)
+        write_plist(new_plist_list, self.plist_path)
+        plist_stat = os.stat(self.plist_path)
+        self.plist_data[self.plist_path] = (
+            (plist_stat.st_mtime, plist_stat.st_size),
+            new_plist_list,
+        )
+        return True, len(filter_definitions_list)
+
+
+def read_build_targets(path):
+    """Returns the list of BuildTarget objects that are defined in a JSON targets file:
+
+       {"targets": [{"plist": "out/CustomFilter.plist",
+                     "defs": ["definitions", "definitions-latin"],
+                     "remote_defs": ["remote/defs.txt"],
+                     "base": "base/CustomFilter.plist"}]}
+
+       Relative paths are resolved against the directory of the targets file.  The
+       "remote_defs" and "base" values are optional."""
+    with open(path) as f:
+        targets_data = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(path))
+
+    def resolve(target_path):
+        return os.path.join(base_dir, os.path.expanduser(target_path))
+
+    build_targets = []
+    for target in targets_data["targets"]:
+        base_plist_path = target.get("base")
+        build_targets.append(
+            BuildTarget(
+                resolve(target["plist"]),
+                [resolve(p) for p in target.get("defs", [])],
+                [resolve(p) for p in target.get("remote_defs", [])],
+                None if base_plist_path is None else resolve(base_plist_path),
+            )
+        )
+    return build_targets
+
+
+class PollingWatcher(object):
+    """PollingWatcher detects the files that are created, modified, and removed in the
+       top level of a set of directories by comparing the modification time and size of
+       the files between scans.  The file names of a directory are only listed again
+       when the modification time of the directory changes."""
+
+    def __init__(self, directories, interval=FLM_WATCH_POLL_INTERVAL):
+        self.directories = [os.path.abspath(directory) for directory in directories]
+        self.interval = interval
+        self.listings = {}
+        self.snapshot = self.scan()
+
+    def list_files(self, directory):
+        try:
+            directory_mtime = os.stat(directory).st_mtime
+        except OSError:
+            self.listings.pop(directory, None)
+            return []
+        listing = self.listings.get(directory)
+        if listing is None or listing[0] != directory_mtime:
+            listing = (directory_mtime, os.listdir(directory))
+            self.listings[directory] = listing
+        return listing[1]
+
+    def scan(self):
+        """Returns a dictionary of file paths to (modification time, size) tuples"""
+        snapshot = {}
+        for directory in self.directories:
+            for filename in self.list_files(directory):
+                path = os.path.join(directory, filename)
+                try:
+                    file_stat = os.stat(path)
+                except OSError:
+                    # removed after the directory was listed
+                    continue
+                snapshot[path] = (file_stat.st_mtime, file_stat.st_size)
+        return snapshot
+
+    def read_changes(self, timeout=None):
+        """Returns the set of changed file paths.  Waits for changes for at most timeout
+           seconds and returns an empty set if nothing changed.  The default timeout
+           None waits until a file changes."""
+        deadline = None if timeout is None else TIMER() + timeout
+        while True:
+            if deadline is None:
+                time.sleep(self.interval)
+            else:
+                time.sleep(max(0, min(self.interval, deadline - TIMER())))
+            snapshot = self.scan()
+            changed_paths = set(
+                path
+                for path in set(snapshot) | set(self.snapshot)
+                if snapshot.get(path) != self.snapshot.get(path)
+            )
+            self.snapshot = snapshot
+            if len(changed_paths) > 0 or (deadline is not None and TIMER() >= deadline):
+                return changed_paths
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher(object):
+    """InotifyWatcher detects the files that are written, created, removed, and renamed
+       in the top level of a set of directories with the Linux inotify API.  The API is
+       called with ctypes.  OSError is raised when a directory cannot be watched and
+       AttributeError when the C library does not define the inotify functions."""
+
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_Q_OVERFLOW = 0x00004000
+    IN_CLOEXEC = 0o2000000
+    WATCH_MASK = (
+        IN_ATTRIB
+        | IN_CLOSE_WRITE
+        | IN_MOVED_FROM
+        | IN_MOVED_TO
+        | IN_CREATE
+        | IN_DELETE
+        | IN_DELETE_SELF
+        | IN_MOVE_SELF
+    )
+    READ_SIZE = 64 * 1024  # bytes
+
+    def __init__(self, directories):
+        import ctypes
+        import ctypes.util
+
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.event_header = struct.Struct(str("iIII"))
+        self.directories = {}  # watch descriptor: directory path
+        self.fd = self.libc.inotify_init1(self.IN_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, "inotify_init1: " + os.strerror(errno))
+        fsencode = getattr(os, "fsencode", lambda path: path)
+        try:
+            for directory in directories:
+                directory = os.path.abspath(directory)
+                watch_descriptor = self.libc.inotify_add_watch(
+                    self.fd, fsencode(directory), self.WATCH_MASK
+                )
+                if watch_descriptor < 0:
+                    errno = ctypes.get_errno()
+                    raise OSError(errno, directory + ": " + os.strerror(errno))
+                self.directories[watch_descriptor] = directory
+        except Exception:
+            self.close()
+            raise
+
+    def read_changes(self, timeout=None):
+        """Returns the set of changed file paths.  Waits for changes for at most timeout
+           seconds and returns an empty set if nothing changed.  The default timeout
+           None waits until a file changes.  The directory paths are returned for the
+           events of a watched directory itself and for all directories when the kernel
+           event queue overflowed."""
+        readable = select.select([self.fd], [], [], timeout)[0]
+        if len(readable) == 0:
+            return set()
+        fsdecode = getattr(os, "fsdecode", lambda path: path)
+        data = os.read(self.fd, self.READ_SIZE)
+        changed_paths = set()
+        offset = 0
+        while offset < len(data):
+            watch_descriptor, mask, _, name_size = self.event_header.unpack_from(data, offset)
+            offset += self.event_header.size
+            name = data[offset : offset + name_size].rstrip(b"\0")
+            offset += name_size
+            if mask & self.IN_Q_OVERFLOW:
+                # events were lost, all directories are read again
+                changed_paths.update(self.directories.values())
+            elif watch_descriptor in self.directories:
+                directory = self.directories[watch_descriptor]
+                if len(name) > 0:
+                    changed_paths.add(os.path.join(directory, fsdecode(name)))
+                else:
+                    changed_paths.add(directory)
+        return changed_paths
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def get_watcher(directories, polling=False, poll_interval=FLM_WATCH_POLL_INTERVAL):
+    """Returns an InotifyWatcher for directories on Linux and a PollingWatcher on other
+       platforms, when polling is True, or when inotify is not available"""
+    if not polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(directories)
+        except (ImportError, AttributeError, OSError) as e:
+            logger.warning(
+                "Unable to watch the definition files with inotify, polling for changes. Error: "
+                + str(e)
+            )
+    return PollingWatcher(directories, poll_interval)
+
+
+def read_debounced_changes(watcher, debounce=FLM_WATCH_DEBOUNCE):
+    """Waits for file changes and returns the set of changed paths when no further
+       change was detected for debounce seconds, so that a burst of edits and editor
+       save steps leads to a single rebuild"""
+    changed_paths = watcher.read_changes()
+    while True:
+        new_changed_paths = watcher.read_changes(debounce)
+        if len(new_changed_paths) == 0:
+            return changed_paths
+        changed_paths.update(new_changed_paths)
+
+
+def get_plist_errors():
+    """Returns the tuple of exception classes that plistlib raises for invalid plist
+       files.  A partially written XML plist file raises the expat ExpatError and
+       plistlib.InvalidFileException (a ValueError) is not defined in Python 2."""
+    from xml.parsers.expat import ExpatError
+
+    return (ValueError, getattr(plistlib, "InvalidFileException", ValueError), ExpatError)
+
+
+def build_targets_once(build_targets, sources, manifest):
+    """Builds the build targets, reports the results, and returns the exit status"""
+    for build_target in build_targets:
+        try:
+            changed, filter_count = build_target.build(sources)
+        except (
+            DefinitionSizeError,
+            UnicodeDecodeError,
+            IOError,
+            OSError,
+        ) + get_plist_errors() as e:
+            # a corrupt or partially written plist file is reported like the other
+            # build errors so that the watch command waits for the next change
+            sys.stderr.write(
+                "[ERROR] Unable to build " + build_target.plist_path + ": " + str(e) + os.linesep
+            )
+            return 1
+        print(
+            "[build] "
+            + build_target.plist_path
+            + ": "
+            + str(filter_count)
+            + " filter lists"
+            + ("" if changed else " (unchanged)")
+        )
+
+    if manifest is not None:
+        manifest.save()
+    if len(sources.fetch_errors) > 0:
+        sys.stderr.write(
+            "[ERROR] "
+            + str(len(sources.fetch_errors))
+            + " remote definition file(s) could not be pulled"
+            + os.linesep
+        )
+        return 1
+    if len(sources.resolve_errors) > 0:
+        sys.stderr.write(
+            "[ERROR] "
+            + str(len(sources.resolve_errors))
+            + " filter list(s) could not be resolved"
+            + os.linesep
+        )
+        return 1
+    return 0
+
+
+def watch_build_targets(build_targets, sources, manifest, watcher, debounce=FLM_WATCH_DEBOUNCE):
+    """Builds the build targets and builds them again when their local definition files
+       or remote definitions files change.  Only the targets that use a changed
+       definitions directory or remote definitions file are built again and only the
+       changed files are parsed again.  Runs until it is interrupted."""
+    build_targets_once(build_targets, sources, manifest)
+    while True:
+        changed_sources = sources.update(read_debounced_changes(watcher, debounce))
+        changed_build_targets = [
+            build_target
+            for build_target in build_targets
+            if len(build_target.get_source_paths() & changed_sources) > 0
+        ]
+        if len(changed_build_targets) == 0:
+            continue
+        for source_path in sorted(changed_sources):
+            print("[watch] " + source_path + " changed")
+        # report the errors of this build only
+        del sources.fetch_errors[:]
+        del sources.resolve_errors[:]
+        build_targets_once(changed_build_targets, sources, manifest)
+        sys.stdout.flush()
+
+
+def list_backup_generations(backup_store, plist_path):
+    """Prints the backup generations with their time and filter list count, returns the
+       exit status"""
+    digest = file_digest(plist_path) if os.path.isfile(plist_path) else None
+    generations = backup_store.list_generations()
+    if len(generations) == 0:
+        print("[restore] there are no backup generations")
+    for generation, backup_time, backup_path in generations:
+        line = (
+            "[restore] "
+            + str(generation)
+            + ": "
+            + time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(backup_time))
+        )
+        if backup_path is None:
+            line += ", the backup file is missing or modified"
+        else:
+            filter_count = len(
+                [definition for definition in read_plist(backup_path) if "list" in definition]
+            )
+            line += ", " + str(filter_count) + " filter lists"
+            if os.path.basename(backup_path).split(".")[0] == digest:
+                line += " (current file)"
+        print(line)
+    return 0
+
+
+def restore_backup_generation(backup_store, generation, plist_path):
+    """Restores a backup generation to plist_path, reports the result, and returns the
+       exit status"""
+    try:
+        backup_path = backup_store.restore(generation, plist_path)
+    except (IndexError, IOError, OSError) as e:
+        sys.stderr.write("[ERROR] Unable to restore " + plist_path + ": " + str(e) + os.linesep)
+        return 1
+    logger.info(
+        "Restored CustomFilters.plist backup generation "
+        + str(generation)
+        + " from "
+        + backup_path
+    )
+    print("[restore] " + plist_path + ": backup generation " + str(generation))
+    return 0
+
+
+def add_build_arguments(parser):
+    """Adds the build target and definition source options to an argparse.ArgumentParser"""
+    parser.add_argument(
+        "--defs",
+        action="append",
+        default=[],
+        metavar="DIR",
+        help="local definition files directory (repeat for multiple directories)",
+    )
+    parser.add_argument(
+        "--remote-defs",
+        action="append",
+        default=[],
+        metavar="FILE",
+        help="remote definitions URL file (repeat for multiple files)",
+    )
+    parser.add_argument(
+        "--base",
+        metavar="PLIST",
+        help="plist file with the non-filter list contents that are kept (default: the existing output file)",
+    )
+    parser.add_argument(
+        "--plist", action="append", default=[], metavar="OUT", help="output plist file path (repeat for multiple files)"
+    )
+    parser.add_argument(
+        "--targets", action="append", default=[], metavar="FILE", help="JSON build targets file"
+    )
+    parser.add_argument(
+        "--manifest",
+        metavar="FILE",
+        help="definitions manifest file that is used to skip unchanged definition files across runs",
+    )
+    parser.add_argument(
+        "--remote-cache", metavar="DIR", help="remote definition file cache directory"
+    )
+    parser.add_argument(
+        "--glyphdata",
+        action="append",
+        metavar="FILE",
+        help="GlyphData XML file for query directives (repeat for multiple files, default: the Glyphs application and custom GlyphData files)",
+    )
+    parser.add_argument(
+        "--max-size",
+        type=int,
+        default=FLM_DEFINITION_MAX_SIZE,
+        metavar="BYTES",
+        help="maximum definition file size (default: " + str(FLM_DEFINITION_MAX_SIZE) + ")",
+    )
+    parser.add_argument(
+        "-v", "--verbose", action="store_true", help="log the build steps"
+    )
+
+
+def main(argv):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="flmcore.py",
+        description="Filter List Manager CustomFilter.plist builder",
+    )
+    subparsers = parser.add_subparsers(dest="command")
+    build_parser = subparsers.add_parser(
+        "build", help="build CustomFilter.plist files from filter list definition files"
+    )
+    add_build_arguments(build_parser)
+    watch_parser = subparsers.add_parser(
+        "watch",
+        help="build CustomFilter.plist files and build them again when the definition files change",
+    )
+    add_build_arguments(watch_parser)
+    watch_parser.add_argument(
+        "--debounce",
+        type=float,
+        default=FLM_WATCH_DEBOUNCE,
+        metavar="SECONDS",
+        help="seconds without changes before a build (default: " + str(FLM_WATCH_DEBOUNCE) + ")",
+    )
+    watch_parser.add_argument(
+        "--poll",
+        action="store_true",
+        help="detect changes with modification time polling instead of inotify",
+    )
+    watch_parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=FLM_WATCH_POLL_INTERVAL,
+        metavar="SECONDS",
+        help="seconds between polling scans (default: " + str(FLM_WATCH_POLL_INTERVAL) + ")",
+    )
+    restore_parser = subparsers.add_parser(
+        "restore",
+        help="list the CustomFilter.plist backup generations of the plugin or restore one of them",
+    )
+    restore_action = restore_parser.add_mutually_exclusive_group(required=True)
+    restore_action.add_argument(
+        "--list", action="store_true", help="list the backup generations, most recent first"
+    )
+    restore_action.add_argument(
+        "--generation",
+        type=int,
+        metavar="N",
+        help="restore backup generation N (0 = most recent), the current file is added to the backups first",
+    )
+    restore_parser.add_argument(
+        "--plist",
+        default=GLYPHS_PLIST_FILE,
+        metavar="FILE",
+        help="CustomFilter.plist file path (default: the Glyphs application file)",
+    )
+    restore_parser.add_argument(
+        "-v", "--verbose", action="store_true", help="log the restore steps"
+    )
+    args = parser.parse_args(argv)
+    if args.command not in ("build", "watch", "restore"):
+        parser.print_help()
+        return 2
+
+    logging.basicConfig(
+        format="%(levelname)s  %(message)s",
+        level=logging.INFO if args.verbose else logging.WARNING,
+    )
+
+    if args.command == "restore":
+        backup_store = get_backup_store(read_settings())
+        if args.list:
+            return list_backup_generations(backup_store, args.plist)
+        return restore_backup_generation(backup_store, args.generation, args.plist)
+
+    build_targets = []
+    for plist_path in args.plist:
+        build_targets.append(
+            BuildTarget(plist_path, args.defs, args.remote_defs, args.base)
+        )
+    for targets_path in args.targets:
+        build_targets.extend(read_build_targets(targets_path))
+    if len(build_targets) == 0:
+        sys.stderr.write("[ERROR] Define at least one --plist or --targets argument" + os.linesep)
+        return 1
+    for build_target in build_targets:
+        for definitions_dir in build_target.definitions_dirs:
+            if not os.path.isdir(definitions_dir):
+                sys.stderr.write(
+                    "[ERROR] " + definitions_dir + " does not appear to be a valid directory path!" + os.linesep
+                )
+                return 1
+
+    manifest = None
+    if args.manifest is not None:
+        manifest = DefinitionsManifest(args.manifest)
+        manifest.load()
+    remote_cache = None
+    if args.remote_cache is not None:
+        remote_cache = RemoteCache(args.remote_cache)
+    sources = DefinitionSources(
+        manifest, remote_cache, args.max_size, GlyphDataFiles(args.glyphdata)
+    )
+
+    if args.command == "watch":
+        watch_directories = set()
+        for build_target in build_targets:
+            watch_directories.update(
+                os.path.abspath(definitions_dir) for definitions_dir in build_target.definitions_dirs
+            )
+            watch_directories.update(
+                os.path.dirname(os.path.abspath(remote_definitions_file))
+                for remote_definitions_file in build_target.remote_definitions_files
+            )
+        watcher = get_watcher(sorted(watch_directories), args.poll, args.poll_interval)
+        print(
+            "[watch] watching "
+            + ", ".join(sorted(watch_directories))
+            + " ("
+            + type(watcher).__name__
+            + ")"
+        )
+        sys.stdout.flush()
+        try:
+            watch_build_targets(build_targets, sources, manifest, watcher, args.debounce)
+        except KeyboardInterrupt:
+            return 0
+        finally:
+            watcher.close()
+    return build_targets_once(build_targets, sources, manifest)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
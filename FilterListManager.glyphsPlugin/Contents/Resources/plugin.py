@@ -15,80 +15,61 @@ from __future__ import division, print_function, unicode_literals
 import logging
 import objc
 import os
-import plistlib
 import shutil
-import subprocess
-try:
-	import urllib2 as urllibrequest
-	import urlparse as urllibparse
-except:
-	import urllib.request as urllibrequest
-	import urllib.parse as urllibparse
+import sys
+import threading
 
 from GlyphsApp import *
 from GlyphsApp.plugins import *
 
-# -----------------
-# Path definitions
-# -----------------
-# Glyphs application paths
-GLYPHS_PLIST_FILE = os.path.join(
-    os.path.expanduser("~"),
-    "Library",
-    "Application Support",
-    "Glyphs",
-    "CustomFilter.plist",
-)
-
-
-# FLM plugin paths
-FLM_GLYPHSFILTERS_DIR = os.path.join(os.path.expanduser("~"), "GlyphsFilters")
-FLM_BACKUP_DIR = os.path.join(os.path.expanduser("~"), "GlyphsFilters", "backup")
-FLM_BACKUP_ORIGINAL_FILE = os.path.join(FLM_BACKUP_DIR, "CustomFilters.plist.original")
-FLM_BACKUP_PREVIOUS_FILE = os.path.join(FLM_BACKUP_DIR, "CustomFilters.plist")
-FLM_DEFAULT_PLIST = os.path.join(
-    os.path.expanduser("~"),
-    "Library",
-    "Application Support",
-    "Glyphs",
-    "Plugins",
-    "FilterListManager.glyphsPlugin",
-    "Contents",
-    "Resources",
-    "CustomFilter.plist",
-)
-FLM_LOG_DIR = os.path.join(os.path.expanduser("~"), "GlyphsFilters", "logs")
-FLM_LOG_FILE = os.path.join(FLM_LOG_DIR, "flm.log")
-FLM_REMOTE_DEF_FILE = os.path.join(
-    os.path.expanduser("~"), "GlyphsFilters", "remote", "defs.txt"
-)
-
-# ---------------
-# Logging setup
-# ---------------
-if not os.path.isdir(FLM_LOG_DIR):
-    os.makedirs(FLM_LOG_DIR)
-logging.basicConfig(
-    filename=FLM_LOG_FILE,
-    filemode="w",
-    format="%(asctime)s %(levelname)s  %(message)s",
-    datefmt="%m/%d/%Y %I:%M:%S %p",
-    level=logging.DEBUG,
-)
-
-# ----------------------------
-# CustomFilters.plist backup
-# ----------------------------
-# Backup CustomFilters.plist file present at the time of
-# plugin installation (to avoid permanent elimination of
-# custom filters that user created before plugin use)
-try:
-    if not os.path.isfile(FLM_BACKUP_ORIGINAL_FILE) and os.path.isfile(GLYPHS_PLIST_FILE):
-        if not os.path.isdir(FLM_BACKUP_DIR):
-            os.makedirs(FLM_BACKUP_DIR)
-        shutil.copy(GLYPHS_PLIST_FILE, FLM_BACKUP_ORIGINAL_FILE)
-except:
-    pass
+# the filter list definition parsing and CustomFilter.plist build pipeline
+# is defined in the flmcore module in the plugin Resources directory
+FLM_RESOURCES_DIR = os.path.dirname(os.path.abspath(__file__))
+if FLM_RESOURCES_DIR not in sys.path:
+    sys.path.insert(0, FLM_RESOURCES_DIR)
+from flmcore import *
+
+# plugin messages are written with the flmcore log file configuration
+logger = logging.getLogger("flm")
+
+# The logging setup and the CustomFilters.plist backup take place on the first
+# menu action instead of at import so that the plugin does not add file system
+# work to the Glyphs application start
+_plugin_initialized = False
+
+
+def initialize_plugin():
+    global _plugin_initialized
+    if _plugin_initialized:
+        return
+    _plugin_initialized = True
+
+    # ---------------
+    # Logging setup
+    # ---------------
+    # log records are written to the rotating log file on a background thread
+    settings = read_settings()
+    configure_logging(
+        FLM_LOG_FILE,
+        settings["log_level"],
+        settings["log_max_size"],
+        settings["log_backup_count"],
+    )
+
+    # ----------------------------
+    # CustomFilters.plist backup
+    # ----------------------------
+    # Backup CustomFilters.plist file present at the time of
+    # plugin installation (to avoid permanent elimination of
+    # custom filters that user created before plugin use).
+    # FLM does not modify the file before the first menu action.
+    try:
+        if not os.path.isfile(FLM_BACKUP_ORIGINAL_FILE) and os.path.isfile(GLYPHS_PLIST_FILE):
+            if not os.path.isdir(FLM_BACKUP_DIR):
+                os.makedirs(FLM_BACKUP_DIR)
+            shutil.copy(GLYPHS_PLIST_FILE, FLM_BACKUP_ORIGINAL_FILE)
+    except:
+        pass
 
 class FilterListManager(GeneralPlugin):
     @objc.python_method
@@ -99,12 +80,24 @@ class FilterListManager(GeneralPlugin):
                 "de": "Filterlisten aktualisieren"
             }
         )
+        self.cancelupdate_name = Glyphs.localize(
+            {
+                "en": "Cancel Filter List Update",
+                "de": "Filterlisten-Aktualisierung abbrechen",
+            }
+        )
         self.restoredefault_name = Glyphs.localize(
             {
                 "en": "Restore Default Filter Lists",
                 "de": "Standard-Filterlisten wiederherstellen",
             }
         )
+        self.restoreprevious_name = Glyphs.localize(
+            {
+                "en": "Restore Previous Filter Lists",
+                "de": "Vorherige Filterlisten wiederherstellen",
+            }
+        )
         self.opendir_name = Glyphs.localize(
             {
                 "en": "Open GlyphsFilters Directory",
@@ -114,142 +107,239 @@ class FilterListManager(GeneralPlugin):
 
     @objc.python_method
     def start(self):
+        # memoizes the resolved filter lists with directives across updates,
+        # defined on the first update
+        self.definition_resolver = None
+        # update worker thread state
+        self.update_worker = None
+        self.update_cancellation = None
+        self.update_progress = None
         try:
             # new API in Glyphs 2.3.1-910
             new_update_menu_item = NSMenuItem(self.update_name, self.updateFilters_)
+            new_cancel_menu_item = NSMenuItem(self.cancelupdate_name, self.cancelUpdate_)
             new_restore_menu_item = NSMenuItem(self.restoredefault_name, self.restoreFilters_)
+            new_restoreprevious_menu_item = NSMenuItem(self.restoreprevious_name, self.restorePreviousFilters_)
             new_opendir_menu_item = NSMenuItem(self.opendir_name, self.openGlyphsfiltersDirectory_)
             Glyphs.menu[EDIT_MENU].append(new_update_menu_item)
+            Glyphs.menu[EDIT_MENU].append(new_cancel_menu_item)
             Glyphs.menu[EDIT_MENU].append(new_restore_menu_item)
+            Glyphs.menu[EDIT_MENU].append(new_restoreprevious_menu_item)
             Glyphs.menu[EDIT_MENU].append(new_opendir_menu_item)
         except Exception:
             main_menu = Glyphs.mainMenu()
             update_selector = objc.selector(self.updateFilters_, signature="v@:@")
+            cancel_selector = objc.selector(self.cancelUpdate_, signature="v@:@")
             restore_selector = objc.selector(self.restoreFilters_, signature="v@:@")
+            restoreprevious_selector = objc.selector(
+                self.restorePreviousFilters_, signature="v@:@"
+            )
             open_selector = objc.selector(
                 self.openGlyphsfiltersDirectory_, signature="v@:@"
             )
             new_update_menu_item = NSMenuItem.alloc().initWithTitle_action_keyEquivalent_(
                 self.update_name, update_selector, ""
             )
+            new_cancel_menu_item = NSMenuItem.alloc().initWithTitle_action_keyEquivalent_(
+                self.cancelupdate_name, cancel_selector, ""
+            )
             new_restore_menu_item = NSMenuItem.alloc().initWithTitle_action_keyEquivalent_(
-                self.restore_name, restore_selector, ""
+                self.restoredefault_name, restore_selector, ""
+            )
+            new_restoreprevious_menu_item = NSMenuItem.alloc().initWithTitle_action_keyEquivalent_(
+                self.restoreprevious_name, restoreprevious_selector, ""
             )
             new_open_menu_item = NSMenuItem.alloc().initWithTitle_action_keyEquivalent_(
                 self.opendir_name, open_selector, ""
             )
             new_update_menu_item.setTarget_(self)
             main_menu.itemWithTag_(5).submenu().addItem_(new_update_menu_item)
+            new_cancel_menu_item.setTarget_(self)
+            main_menu.itemWithTag_(5).submenu().addItem_(new_cancel_menu_item)
             new_restore_menu_item.setTarget_(self)
             main_menu.itemWithTag_(5).submenu().addItem_(new_restore_menu_item)
+            new_restoreprevious_menu_item.setTarget_(self)
+            main_menu.itemWithTag_(5).submenu().addItem_(new_restoreprevious_menu_item)
             new_open_menu_item.setTarget_(self)
             main_menu.itemWithTag_(5).submenu().addItem_(new_open_menu_item)
 
     def updateFilters_(self, sender):
-        """Perform the list filter update"""
-        # Expected filter definitions directory test
-        if not self.filter_directory_is_present():
+        """Perform the list filter update on a background worker thread so that the
+           Glyphs application does not wait for the definition files"""
+        initialize_plugin()
+        if self.update_is_running():
             Glyphs.showNotification(
                 "Filter List Manager",
-                "ERROR: Unable to locate ~/GlyphsFilters directory! See log.",
+                "A filter list update is already in progress"
+                + self.format_update_progress()
+                + ".",
             )
-            logging.error(
+            return 0
+        self.update_cancellation = Cancellation()
+        self.update_progress = None
+        self.update_worker = threading.Thread(
+            target=self.run_update, name="FilterListManager update"
+        )
+        self.update_worker.daemon = True
+        self.update_worker.start()
+        return 0
+
+    @objc.python_method
+    def run_update(self):
+        """Update worker thread function"""
+        try:
+            # the update phases are logged as JSON timing spans, see TimingSpan
+            with TimingSpan("update"):
+                self.update_filters(self.update_cancellation)
+        except UpdateCancelled:
+            logger.info("The filter list update was cancelled. No changes were made.")
+            self.notify("The filter list update was cancelled. No changes were made.")
+        except Exception as e:
+            logger.error("The filter list update failed. Error: " + str(e))
+            self.notify("ERROR: The filter list update failed. See log.")
+
+    @objc.python_method
+    def update_is_running(self):
+        return self.update_worker is not None and self.update_worker.is_alive()
+
+    @objc.python_method
+    def report_progress(self, phase, count, total, source):
+        """Records the progress of the update worker, called after each definition file"""
+        self.update_progress = (phase, count, total)
+        logger.debug(
+            "Update progress: %s definition file %d of %d (%s)", phase, count, total, source
+        )
+
+    @objc.python_method
+    def format_update_progress(self):
+        """Returns the progress of the running update for notifications, e.g.
+           " (remote definition file 2 of 4)", or an empty string before the first
+           definition file"""
+        update_progress = self.update_progress
+        if update_progress is None:
+            return ""
+        phase, count, total = update_progress
+        return (
+            " (" + phase + " definition file " + str(count) + " of " + str(total) + ")"
+        )
+
+    @objc.python_method
+    def notify(self, message):
+        """Shows a notification on the main thread"""
+        self.performSelectorOnMainThread_withObject_waitUntilDone_(
+            "showNotification:", message, False
+        )
+
+    def showNotification_(self, message):
+        Glyphs.showNotification("Filter List Manager", message)
+
+    def cancelUpdate_(self, sender):
+        """Requests the cancellation of the running filter list update.  The update
+           stops before the CustomFilters.plist file is backed up and written."""
+        if not self.update_is_running():
+            Glyphs.showNotification(
+                "Filter List Manager", "There is no filter list update in progress."
+            )
+            return 0
+        self.update_cancellation.cancel()
+        logger.info("Filter list update cancellation requested")
+        return 0
+
+    @objc.python_method
+    def update_filters(self, cancellation):
+        """Updates the CustomFilters.plist file.  Executed on the update worker thread,
+           the notification is shown on the main thread."""
+        # Expected filter definitions directory test
+        if not self.filter_directory_is_present():
+            self.notify("ERROR: Unable to locate ~/GlyphsFilters directory! See log.")
+            logger.error(
                 "Unable to locate the ~/GlyphsFilters directory.  This directory is mandatory for execution.  Please create it!"
             )
             return 0
 
-        # --------------------------------------------
-        #
-        #  Backup original CustomFilters.plist file
-        #
-        # --------------------------------------------
+        settings = read_settings()
 
         # read previous CustomFilters.plist definition file
         #  - used to prepare backup
         #  - used to define new definition file
+        #  - used to identify filter list changes
         try:
-            previous_plist_data = plistlib.readPlist(GLYPHS_PLIST_FILE)
+            with TimingSpan("read_plist"):
+                previous_plist_data = read_plist(GLYPHS_PLIST_FILE)
         except Exception as e:
-            Glyphs.showNotification(
-                "Filter List Manager",
-                "ERROR: Unable to read CustomFilters.plist file. See log.",
-            )
-            logging.error(
+            self.notify("ERROR: Unable to read CustomFilters.plist file. See log.")
+            logger.error(
                 "Unable to read the original CustomFilters.plist file in order to create a backup.  Error: "
                 + str(e)
             )
             return 1
 
-        new_plist_list = []  # storage data structure for new plist file definitions
-
-        # backup the existing CustomFilters.plist file in the
-        # ~/GlyphsFilters/backup directory
-        try:
-            if os.path.exists(FLM_BACKUP_DIR):
-                shutil.move(GLYPHS_PLIST_FILE, FLM_BACKUP_PREVIOUS_FILE)
-            else:
-                os.makedirs(FLM_BACKUP_DIR)
-                shutil.move(GLYPHS_PLIST_FILE, FLM_BACKUP_PREVIOUS_FILE)
-        except Exception as e:
-            Glyphs.showNotification(
-                "Filter List Manager",
-                "ERROR: Unable to backup your CustomFilters.plist file. See log.",
-            )
-            logging.error(
-                "Unable to backup your CustomFilters.plist file. Error: " + str(e)
-            )
-            return 1
-
         # -----------------------------------------------------
         #
         #  Update CustomFilters.plist file with new definitions
         #
         # -----------------------------------------------------
 
+        # read the definitions manifest with the filter lists that were
+        # parsed from unchanged definition sources in the last update
+        manifest = DefinitionsManifest(FLM_MANIFEST_FILE)
+        manifest.load()
+
+        # the glyph names of the local and remote filter lists of this update share
+        # a name pool that is released with the filter lists
+        name_pool = NamePool()
+
         # parse local filter list definition files
         try:
-            local_filter_definitions_list = self.get_local_filter_definitions_list()
+            with TimingSpan("local_parse") as span:
+                local_filter_definitions_list = get_local_filter_definitions_list(
+                    FLM_GLYPHSFILTERS_DIR,
+                    manifest,
+                    settings["definition_max_size"],
+                    self.report_progress,
+                    cancellation,
+                    name_pool=name_pool,
+                )
+                span.fields["filters"] = len(local_filter_definitions_list)
+        except UpdateCancelled:
+            raise
         except Exception as e:
-            Glyphs.showNotification(
-                "Filter List Manager",
-                "Failed to parse local definition files. See log.",
-            )
-            logging.error("Failed to parse local definitions files.  Error: " + str(e))
+            self.notify("Failed to parse local definition files. See log.")
+            logger.error("Failed to parse local definitions files.  Error: " + str(e))
             return 1
 
         # parse remote filter list definition files
+        remote_fetch_errors = []
+        unavailable_filter_names = []
         try:
-            remote_filter_definitions_list = self.get_remote_filter_definitions_list()
+            with TimingSpan("remote_fetch") as span:
+                remote_filter_definitions_list = get_remote_filter_definitions_list(
+                    FLM_REMOTE_DEF_FILE,
+                    manifest,
+                    remote_fetch_errors,
+                    RemoteCache(FLM_REMOTE_CACHE_DIR, settings["remote_max_age"]),
+                    settings["definition_max_size"],
+                    self.report_progress,
+                    cancellation,
+                    name_pool=name_pool,
+                    unavailable_filter_names=unavailable_filter_names,
+                )
+                span.fields["filters"] = len(remote_filter_definitions_list)
+                span.fields["errors"] = len(remote_fetch_errors)
+        except UpdateCancelled:
+            raise
         except Exception as e:
-            Glyphs.showNotification(
-                "Filter List Manager",
-                "Failed to parse remote definition files. See log.",
-            )
-            logging.error("Failed to parse remote definitions files.  Error: " + str(e))
+            self.notify("Failed to parse remote definition files. See log.")
+            logger.error("Failed to parse remote definitions files.  Error: " + str(e))
             return 1
 
-        plist_filter_definitions_list = []
-
-        # create list with data structure that is formatted
-        # so that it can be translated to a plist file on write
         for local_filter in local_filter_definitions_list:
-            filter_dict = {}
-            filter_dict["name"] = local_filter.name
-            filter_dict["list"] = local_filter.list
-            plist_filter_definitions_list.append(filter_dict)
-            logging.info(
-                "Found local definition file for the filter '" + local_filter.name + "'"
+            logger.debug(
+                "Found local definition file for the filter '%s'", local_filter.name
             )
-
         for remote_filter in remote_filter_definitions_list:
-            filter_dict = {}
-            filter_dict["name"] = remote_filter.name
-            filter_dict["list"] = remote_filter.list
-            plist_filter_definitions_list.append(filter_dict)
-            logging.info(
-                "Found remote definition file for the filter '"
-                + remote_filter.name
-                + "'"
+            logger.debug(
+                "Found remote definition file for the filter '%s'", remote_filter.name
             )
 
         # confirm that at least one definition was parsed from the definition files
@@ -258,76 +348,172 @@ class FilterListManager(GeneralPlugin):
             len(local_filter_definitions_list) == 0
             and len(remote_filter_definitions_list) == 0
         ):
-            Glyphs.showNotification(
-                "Filter List Manager",
-                "Unable to identify new filter list definition files. No changes were made.",
+            self.notify(
+                "Unable to identify new filter list definition files. No changes were made."
             )
-            logging.info(
+            logger.info(
                 "Unable to identify new filter list definition files. There were no changes made to the filter list definitions."
             )
             return 0
 
-        # filter out previous filter list contents in the CustomFilter.plist
-        # file and keep previous non-filter list contents
-        for previous_definition in previous_plist_data:
-            if "list" in previous_definition:
-                if "name" in previous_definition:
-                    logging.info(
-                        "Removing previously defined filter list '"
-                        + previous_definition["name"]
-                        + "'"
-                    )
+        # expand the @include, @exclude, and @intersect directives in the
+        # filter list definitions
+        cancellation.check()
+        resolve_errors = []
+        if self.definition_resolver is None:
+            self.definition_resolver = DefinitionResolver(GlyphDataFiles())
+        with TimingSpan("resolve") as span:
+            filter_definitions_list = resolve_filter_definitions(
+                local_filter_definitions_list + remote_filter_definitions_list,
+                self.definition_resolver,
+                resolve_errors,
+            )
+            span.fields["errors"] = len(resolve_errors)
+        update_errors = self.format_update_errors(remote_fetch_errors, resolve_errors)
+
+        # replace the previous filter lists in the CustomFilter.plist data
+        # with the new filter lists and keep previous non-filter list contents,
+        # then compare the new definitions with the previous CustomFilters.plist
+        # definitions.  The file is not backed up or written when they are equal
+        with TimingSpan("merge") as span:
+            # the filter lists of remote definition files that cannot be pulled
+            # are kept
+            new_plist_list = build_plist_data(
+                previous_plist_data, filter_definitions_list, unavailable_filter_names
+            )
+            filter_list_changes = get_filter_list_changes(
+                previous_plist_data, new_plist_list
+            )
+            span.fields["changes"] = len(filter_list_changes)
+        if new_plist_list == previous_plist_data:
+            self.save_manifest(manifest)
+            logger.info(
+                "The filter list definitions did not change. The CustomFilter.plist file was not modified."
+            )
+            if len(update_errors) > 0:
+                self.notify(
+                    "The filter lists are up to date, but "
+                    + update_errors
+                    + ". See log."
+                )
             else:
-                new_plist_list.append(previous_definition)
-                if "name" in previous_definition:
-                    logging.info(
-                        "Saving previously defined CustomFilters.plist data with name '"
-                        + previous_definition["name"]
-                        + "'"
-                    )
-
-        # add new data that was read from local and remote
-        # definition files to a data format that translates
-        # to a plist file
-        for new_definition in plist_filter_definitions_list:
-            new_plist_list.append(new_definition)
-            if "name" in new_definition:
-                logging.info("Adding new filter list '" + new_definition["name"] + "'")
+                self.notify("The filter lists are up to date. No changes were made.")
+            return 0
 
-        # write new CustomFilters.plist definition file to disk
+        for change in filter_list_changes:
+            logger.info("Filter list change: " + format_filter_list_change(change))
+
+        # the update can not be cancelled after this point
+        cancellation.check()
+
+        # --------------------------------------------
+        #
+        #  Backup original CustomFilters.plist file
+        #
+        # --------------------------------------------
+
+        # backup the existing CustomFilters.plist file in the backup history in the
+        # ~/GlyphsFilters/backup directory.  The file is only stored (cloned or
+        # copied) if its contents are new and it is left in place until the new
+        # file replaces it
         try:
-            plistlib.writePlist(new_plist_list, GLYPHS_PLIST_FILE)
-            logging.info("The new CustomFilter.plist file write was successful.")
+            with TimingSpan("backup"):
+                backup_store = get_backup_store(settings)
+                backup_store.add(GLYPHS_PLIST_FILE)
+                backup_store.prune()
         except Exception as e:
-            Glyphs.showNotification(
-                "Filter List Manager",
-                "ERROR: Unable to write CustomFilters.plist file. See log.",
+            self.notify(
+                "ERROR: Unable to backup your CustomFilters.plist file. See log."
+            )
+            logger.error(
+                "Unable to backup your CustomFilters.plist file. Error: " + str(e)
             )
-            logging.error(
+            return 1
+
+        # write new CustomFilters.plist definition file to disk
+        try:
+            with TimingSpan("write"):
+                write_plist(new_plist_list, GLYPHS_PLIST_FILE)
+            logger.info("The new CustomFilter.plist file write was successful.")
+        except Exception as e:
+            self.notify("ERROR: Unable to write CustomFilters.plist file. See log.")
+            logger.error(
                 "Unable to write new CustomFilters.plist file to disk. Error: " + str(e)
             )
             return 1
 
-        Glyphs.showNotification(
-            "Filter List Manager",
-            "The filter list updates were successful.  Please quit and restart Glyphs.",
-        )
-        logging.info(
+        self.save_manifest(manifest)
+
+        change_summary = summarize_filter_list_changes(filter_list_changes)
+        if len(update_errors) > 0:
+            self.notify(
+                "The filter list updates were successful ("
+                + change_summary
+                + "), but "
+                + update_errors
+                + ". See log.  Please quit and restart Glyphs."
+            )
+        else:
+            self.notify(
+                "The filter list updates were successful ("
+                + change_summary
+                + ").  Please quit and restart Glyphs."
+            )
+        logger.info(
             "The filter list updates were successful.  Please quit and restart the Glyphs application to view the new filter lists."
         )
 
+    @objc.python_method
+    def format_update_errors(self, remote_fetch_errors, resolve_errors):
+        """Returns a description of the update errors for the notifications or an
+           empty string when there were no errors"""
+        update_errors = []
+        if len(remote_fetch_errors) > 0:
+            update_errors.append(
+                str(len(remote_fetch_errors))
+                + " remote definition file(s) could not be pulled"
+            )
+        if len(resolve_errors) > 0:
+            update_errors.append(
+                str(len(resolve_errors)) + " filter list(s) could not be resolved"
+            )
+        return " and ".join(update_errors)
+
+    @objc.python_method
+    def save_manifest(self, manifest):
+        """Records the definition sources of this update for the next update"""
+        try:
+            manifest.save()
+        except Exception as e:
+            logger.warning(
+                "Unable to write the definitions manifest file. Error: " + str(e)
+            )
+
     def restoreFilters_(self, sender):
         """Perform restore of default list filters"""
+        initialize_plugin()
+        if self.update_is_running():
+            Glyphs.showNotification(
+                "Filter List Manager",
+                "Please wait for the filter list update to finish or cancel it"
+                + self.format_update_progress()
+                + ".",
+            )
+            return 0
         # copy the default definitions to the Glyphs application
         try:
-            default_filters = plistlib.readPlist(FLM_DEFAULT_PLIST)
-            plistlib.writePlist(default_filters, GLYPHS_PLIST_FILE)
+            default_filters = read_plist(FLM_DEFAULT_PLIST)
+            if os.path.isfile(GLYPHS_PLIST_FILE):
+                backup_store = get_backup_store(read_settings())
+                backup_store.add(GLYPHS_PLIST_FILE)
+                backup_store.prune()
+            write_plist(default_filters, GLYPHS_PLIST_FILE)
         except Exception as e:
             Glyphs.showNotification(
                 "Filter List Manager",
                 "ERROR: Unable to restore the default filter list definitions. See log.",
             )
-            logging.error(
+            logger.error(
                 "Unable to restore default filter list definitions.  Error: " + str(e)
             )
             return 1
@@ -336,23 +522,73 @@ class FilterListManager(GeneralPlugin):
             "Filter List Manager",
             "The default filter list restoration was successful.  Please quit and restart Glyphs.",
         )
-        logging.info(
+        logger.info(
             "The default filter list restoration was successful.  Please quit and restart the Glyphs application to view the filter lists."
         )
 
+    def restorePreviousFilters_(self, sender):
+        """Perform restore of the most recent CustomFilters.plist backup"""
+        initialize_plugin()
+        if self.update_is_running():
+            Glyphs.showNotification(
+                "Filter List Manager",
+                "Please wait for the filter list update to finish or cancel it"
+                + self.format_update_progress()
+                + ".",
+            )
+            return 0
+        try:
+            backup_store = get_backup_store(read_settings())
+            generation = backup_store.get_previous_generation(GLYPHS_PLIST_FILE)
+            self.restore_backup_generation(generation)
+        except Exception as e:
+            Glyphs.showNotification(
+                "Filter List Manager",
+                "ERROR: Unable to restore the previous filter list definitions. See log.",
+            )
+            logger.error(
+                "Unable to restore previous filter list definitions.  Error: " + str(e)
+            )
+            return 1
+
+        Glyphs.showNotification(
+            "Filter List Manager",
+            "The previous filter list restoration was successful.  Please quit and restart Glyphs.",
+        )
+        logger.info(
+            "The previous filter list restoration was successful.  Please quit and restart the Glyphs application to view the filter lists."
+        )
+
+    @objc.python_method
+    def restore_backup_generation(self, generation):
+        """Restores the CustomFilters.plist backup generation (0 = most recent backup).
+           The current CustomFilters.plist file is added to the backup history first
+           so that the restore can be reverted."""
+        backup_store = get_backup_store(read_settings())
+        backup_path = backup_store.restore(generation, GLYPHS_PLIST_FILE)
+        logger.info(
+            "Restored CustomFilters.plist backup generation "
+            + str(generation)
+            + " from "
+            + backup_path
+        )
+
     def openGlyphsfiltersDirectory_(self, sender):
         """Called from a plugin Edit menu item and opens the ~/GlyphsFilters directory in the macOS Finder"""
+        initialize_plugin()
         if not os.path.isdir(FLM_GLYPHSFILTERS_DIR):
             Glyphs.showNotification(
                 "Filter List Manager",
                 "Unable to find ~/GlyphsFilters directory. Please create this path.",
             )
-            logging.error(
+            logger.error(
                 "Unable to find the ~/GlyphsFilters directory.  Please create this directory path."
             )
         else:
+            import subprocess
+
             subprocess.call(["open", FLM_GLYPHSFILTERS_DIR])
-            logging.info(
+            logger.info(
                 "The ~/GlyphsFilters directory was opened with the Edit menu item."
             )
 
@@ -364,103 +600,7 @@ class FilterListManager(GeneralPlugin):
         else:
             return True
 
-    @objc.python_method
-    def get_local_filter_definitions_list(self):
-        """Reads and launches parsing of local definition files, returns a Python list of
-           Filter objects that are created from the parse"""
-        local_definitions_list = []
-
-        if not os.path.isdir(FLM_GLYPHSFILTERS_DIR):
-            # return an empty list if the directory is not found
-            return []
-
-        raw_definitions_file_list = [
-            f
-            for f in os.listdir(FLM_GLYPHSFILTERS_DIR)
-            if os.path.isfile(os.path.join(FLM_GLYPHSFILTERS_DIR, f))
-        ]
-        definitions_file_list = []
-        # filter list for dotfiles.  This eliminates macOS .DS_Store files that lead to errors during processing
-        for definition_file in raw_definitions_file_list:
-            if definition_file[0] == ".":
-                pass
-            else:
-                definitions_file_list.append(definition_file)
-        for definition_file in definitions_file_list:
-            definition_path_list = definition_file.split(".")
-            # define the filter list name as the file name
-            new_filter = Filter(definition_path_list[0])
-            with open(os.path.join(FLM_GLYPHSFILTERS_DIR, definition_file)) as f:
-                # define the filter object with the definitions in the text data
-                text = f.read()
-                new_filter.define_list_with_newline_delimited_text(text)
-
-            local_definitions_list.append(new_filter)
-
-        return local_definitions_list
-
-    @objc.python_method
-    def get_remote_filter_definitions_list(self):
-        """Pulls, reads, and launches parsing of remote definition files, returns a Python list of
-           Filter objects that are created from the parse"""
-        remote_definitions_list = []
-
-        if not os.path.isfile(FLM_REMOTE_DEF_FILE):
-            return []
-
-        with open(FLM_REMOTE_DEF_FILE) as f:
-            for line in f:
-                url = line.strip()
-                if len(url) == 0:
-                    pass
-                elif url[0] in ("#", "/"):
-                    pass
-                else:
-                    # unquote URL defined in list to define file name
-                    # (in case the user pasted a urlencoded string)
-                    decoded_url = urllibparse.unquote(url)
-                    parsed_url = urllibparse.urlparse(decoded_url).path
-                    parsed_path = os.path.split(parsed_url)
-                    filter_defintion_filename = parsed_path[1]
-                    new_filter = Filter(filter_defintion_filename)
-
-                    # quote URL defined in list to make HTTP GET request
-                    response = urllibrequest.urlopen(url)
-                    text = response.read()
-                    new_filter.define_list_with_newline_delimited_text(text)
-                    remote_definitions_list.append(new_filter)
-
-        return remote_definitions_list
-
     @objc.python_method
     def __file__(self):
         """Glyphs plugin API specific method. Please leave this method unchanged"""
         return __file__
-
-
-class Filter(object):
-    """Filter is an object that maintains data elements for Glyphs application filter lists.
-       It is instantiated with a new filter list name and list elements are defined with
-       a class method"""
-
-    def __init__(self, name):
-        self.comment_delimiters = ("#", "/")
-        self.name = name
-        self.list = []
-
-    def define_list_with_newline_delimited_text(self, text):
-        """Filter class method that defines a Filter object with parsed data from newline-
-           delimited text files of list elements"""
-        raw_code_point_list = text.splitlines()
-        filtered_code_point_list = []
-        for item in raw_code_point_list:
-            test_item = item.strip()
-            if len(test_item) == 0:  # discard blank lines in definition file
-                pass
-            elif (
-                test_item[0] in self.comment_delimiters
-            ):  # discard comment lines in definition file
-                pass
-            else:
-                filtered_code_point_list.append(test_item)
-        self.list = filtered_code_point_list
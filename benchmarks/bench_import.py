@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# ==============================================================
+#
+#
+#   bench_import.py
+#   Plugin module import time benchmark
+#   Copyright 2018 Christopher Simpkins
+#   Apache License 2.0
+#
+# ==============================================================
+
+# USAGE
+#
+#    $ python3 bench_import.py [--repeat N] [--rev REVISION]
+#
+# Imports the plugin.py module with the GlyphsApp and objc stub modules in the
+# stubs directory in a new Python process and reports the median import time,
+# the number of modules that the import loads, and the number of files that
+# the import creates.  Each import is executed with the HOME environment
+# variable set to a new temporary directory that includes a CustomFilter.plist
+# file so that the files in your home directory are not used or modified.
+# The Python files are byte-compiled first so that the import time does not
+# include the compilation, as in an installed plugin.
+#
+# Use --rev to compare the import with the plugin Resources directory Python
+# files of a git revision, e.g. the commit before a change:
+#
+#    $ python3 bench_import.py --rev HEAD~1
+
+import argparse
+import compileall
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCHMARKS_DIR)
+STUBS_DIR = os.path.join(BENCHMARKS_DIR, "stubs")
+RESOURCES_PATH = "FilterListManager.glyphsPlugin/Contents/Resources"
+DEFAULT_PLIST = os.path.join(ROOT_DIR, RESOURCES_PATH, "CustomFilter.plist")
+
+IMPORT_SCRIPT = """
+import json, sys, time
+sys.path[0:0] = [{stubs_dir!r}, {resources_dir!r}]
+modules = set(sys.modules)
+start = time.perf_counter()
+import plugin
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "modules": len(set(sys.modules) - modules)}}))
+"""
+
+
+def export_resources(revision, export_dir):
+    """Writes the plugin Resources directory Python files of a git revision to
+       export_dir"""
+    filenames = subprocess.check_output(
+        ["git", "ls-tree", "--name-only", revision, RESOURCES_PATH + "/"], cwd=ROOT_DIR
+    ).decode("utf-8").splitlines()
+    for path in filenames:
+        if path.endswith(".py"):
+            source = subprocess.check_output(
+                ["git", "show", revision + ":" + path], cwd=ROOT_DIR
+            )
+            with open(os.path.join(export_dir, os.path.basename(path)), "wb") as f:
+                f.write(source)
+
+
+def count_files(path):
+    return sum(len(filenames) for _, _, filenames in os.walk(path))
+
+
+def measure_import(resources_dir, repeat):
+    """Returns a (median seconds, loaded module count, created file count) tuple"""
+    compileall.compile_dir(resources_dir, quiet=1)
+    times = []
+    modules = 0
+    created_files = 0
+    for _ in range(repeat):
+        home_dir = tempfile.mkdtemp(prefix="flm-bench-home-")
+        try:
+            glyphs_dir = os.path.join(home_dir, "Library", "Application Support", "Glyphs")
+            os.makedirs(glyphs_dir)
+            shutil.copy(DEFAULT_PLIST, os.path.join(glyphs_dir, "CustomFilter.plist"))
+            initial_files = count_files(home_dir)
+            script = IMPORT_SCRIPT.format(stubs_dir=STUBS_DIR, resources_dir=resources_dir)
+            output = subprocess.check_output(
+                [sys.executable, "-c", script],
+                env=dict(os.environ, HOME=home_dir),
+                cwd=home_dir,
+            )
+            result = json.loads(output.decode("utf-8").splitlines()[-1])
+            times.append(result["seconds"])
+            modules = result["modules"]
+            created_files = count_files(home_dir) - initial_files
+        finally:
+            shutil.rmtree(home_dir, ignore_errors=True)
+    return statistics.median(times), modules, created_files
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        prog="bench_import.py", description="Plugin module import time benchmark"
+    )
+    parser.add_argument("--repeat", type=int, default=10, metavar="N", help="imports per measurement (default: 10)")
+    parser.add_argument("--rev", metavar="REVISION", help="git revision to compare with the working tree")
+    args = parser.parse_args(argv)
+
+    measurements = []
+    if args.rev is not None:
+        export_dir = tempfile.mkdtemp(prefix="flm-bench-rev-")
+        try:
+            export_resources(args.rev, export_dir)
+            measurements.append((args.rev, measure_import(export_dir, args.repeat)))
+        finally:
+            shutil.rmtree(export_dir, ignore_errors=True)
+    measurements.append(
+        ("working tree", measure_import(os.path.join(ROOT_DIR, RESOURCES_PATH), args.repeat))
+    )
+
+    print("{0:<16} {1:>12} {2:>8} {3:>14}".format("plugin.py", "import (ms)", "modules", "files created"))
+    for label, (seconds, modules, created_files) in measurements:
+        print("{0:<16} {1:>12.1f} {2:>8} {3:>14}".format(label, seconds * 1000, modules, created_files))
+    if len(measurements) == 2:
+        before = measurements[0][1][0]
+        after = measurements[1][1][0]
+        print("change           {0:>+11.1f}%".format((after - before) / before * 100))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# ==============================================================
+#
+#
+#   bench_memory.py
+#   Filter list memory benchmark
+#   Copyright 2018 Christopher Simpkins
+#   Apache License 2.0
+#
+# ==============================================================
+
+# USAGE
+#
+#    $ python3 bench_memory.py [--glyphs N] [--files N] [--names N]
+#
+# Generates a definitions directory of overlapping filter lists with the
+# corpus.py module in a temporary directory and reports the memory that is
+# held by the loaded filter lists, once with a Filter class that stores each
+# list as a Python list of separate string objects (the previous Filter
+# implementation) and once with the flmcore Filter class that stores each
+# list as a tuple of glyph names that are shared through the name pool of the
+# load call.  Memory is measured with the tracemalloc module.
+
+import argparse
+import gc
+import os
+import shutil
+import sys
+import tempfile
+import tracemalloc
+
+import corpus
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        os.pardir,
+        "FilterListManager.glyphsPlugin",
+        "Contents",
+        "Resources",
+    ),
+)
+import flmcore  # noqa: E402
+
+
+class ListFilter(object):
+    """Filter class with per-instance list storage (previous implementation)"""
+
+    def __init__(self, name):
+        self.comment_delimiters = ("#", "/")
+        self.name = name
+        self.list = []
+
+    def define_list_with_newline_delimited_text(self, text):
+        raw_code_point_list = text.splitlines()
+        filtered_code_point_list = []
+        for item in raw_code_point_list:
+            test_item = item.strip()
+            if len(test_item) == 0:
+                pass
+            elif test_item[0] in self.comment_delimiters:
+                pass
+            else:
+                filtered_code_point_list.append(test_item)
+        self.list = filtered_code_point_list
+
+
+def load_list_filters(definitions_dir):
+    filters = []
+    for filename in sorted(os.listdir(definitions_dir)):
+        new_filter = ListFilter(filename.split(".")[0])
+        with open(os.path.join(definitions_dir, filename)) as f:
+            new_filter.define_list_with_newline_delimited_text(f.read())
+        filters.append(new_filter)
+    return filters
+
+
+def load_pooled_filters(definitions_dir):
+    return flmcore.get_local_filter_definitions_list(definitions_dir)
+
+
+def measure(load, definitions_dir):
+    """Returns a (filter list count, glyph name count, unique glyph name count, bytes)
+       tuple for the memory that is held by the filter lists that the load function
+       returns"""
+    gc.collect()
+    tracemalloc.start()
+    filters = load(definitions_dir)
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    glyph_name_count = sum(len(f.list) for f in filters)
+    unique_glyph_name_count = len(set(name for f in filters for name in f.list))
+    return len(filters), glyph_name_count, unique_glyph_name_count, size
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="bench_memory.py")
+    parser.add_argument("--glyphs", type=int, default=20000, metavar="N", help="number of glyph records (default: 20000)")
+    parser.add_argument("--files", type=int, default=500, metavar="N", help="number of definition files (default: 500)")
+    parser.add_argument("--names", type=int, default=1000, metavar="N", help="glyph names per definition file (default: 1000)")
+    args = parser.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix="flm-bench-")
+    try:
+        definitions_dir = os.path.join(work_dir, "definitions")
+        records = corpus.get_glyph_records(args.glyphs)
+        corpus.write_definitions(definitions_dir, records, args.files, args.names)
+
+        list_result = measure(load_list_filters, definitions_dir)
+        pooled_result = measure(load_pooled_filters, definitions_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    filter_count, glyph_name_count, unique_glyph_name_count = list_result[:3]
+    print(
+        str(filter_count)
+        + " filter lists, "
+        + str(glyph_name_count)
+        + " glyph names, "
+        + str(unique_glyph_name_count)
+        + " unique glyph names"
+    )
+    for label, result in (
+        ("list of strings", list_result),
+        ("interned tuple", pooled_result),
+    ):
+        print("  {0:<18} {1:>8.2f} MiB".format(label, result[3] / 1024.0 / 1024.0))
+    print(
+        "  reduction          {0:>7.1f} %".format(
+            (1 - pooled_result[3] / float(list_result[3])) * 100
+        )
+    )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# ==============================================================
+#
+#
+#   bench_remote.py
+#   Remote definition file fetch benchmark
+#   Copyright 2018 Christopher Simpkins
+#   Apache License 2.0
+#
+# ==============================================================
+
+# USAGE
+#
+#    $ python3 bench_remote.py [--files N] [--connect-latency MS] [--gzip]
+#
+# Starts a local HTTP/1.1 keep-alive server that serves N generated definition
+# files and pulls them with the flmcore fetch_remote_definitions function, once
+# with a new connection for every request and once with the keep-alive
+# connection pool.  The server delays each new connection by the
+# --connect-latency value to simulate the TCP and TLS handshake cost of a
+# remote host.  The number of connections that the server accepted and the
+# total fetch time are reported for each run.
+
+import argparse
+import gzip
+import os
+import sys
+import threading
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+except ImportError:
+    sys.stderr.write("[ERROR] Python 3.7+ is required" + os.linesep)
+    sys.exit(1)
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        os.pardir,
+        "FilterListManager.glyphsPlugin",
+        "Contents",
+        "Resources",
+    ),
+)
+import flmcore  # noqa: E402
+
+
+class DefinitionServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, files, connect_latency, compress):
+        ThreadingHTTPServer.__init__(self, ("127.0.0.1", 0), DefinitionRequestHandler)
+        self.files = files
+        self.connect_latency = connect_latency
+        self.compress = compress
+        self.connection_count = 0
+        self.lock = threading.Lock()
+
+
+class DefinitionRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # write the response headers and body without Nagle delays on
+    # reused connections, as production HTTP servers do
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        with self.server.lock:
+            self.server.connection_count += 1
+        time.sleep(self.server.connect_latency)
+
+    def do_GET(self):
+        body = self.server.files.get(self.path)
+        if body is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        if self.server.compress and "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_files(count):
+    files = {}
+    for file_number in range(count):
+        lines = ["// definition file " + str(file_number)]
+        for glyph_number in range(200):
+            lines.append("uni%04X" % (0x0100 + (file_number + glyph_number) % 0xFE00))
+        files["/defs/%04d.txt" % file_number] = "\n".join(lines).encode("utf-8")
+    return files
+
+
+def run(server, url_list, connection_pool):
+    server.connection_count = 0
+    start = time.perf_counter()
+    results = flmcore.fetch_remote_definitions(
+        url_list, connection_pool=connection_pool
+    )
+    elapsed = time.perf_counter() - start
+    errors = [result for result in results if result[3] is not None]
+    if len(errors) > 0:
+        sys.stderr.write("[ERROR] " + str(errors[0][3]) + os.linesep)
+        sys.exit(1)
+    return server.connection_count, elapsed
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="bench_remote.py")
+    parser.add_argument("--files", type=int, default=50, metavar="N")
+    parser.add_argument("--connect-latency", type=float, default=20.0, metavar="MS")
+    parser.add_argument("--gzip", action="store_true", help="gzip response bodies")
+    args = parser.parse_args(argv)
+
+    files = make_files(args.files)
+    server = DefinitionServer(files, args.connect_latency / 1000.0, args.gzip)
+    server_thread = threading.Thread(target=server.serve_forever)
+    server_thread.daemon = True
+    server_thread.start()
+    url_list = [
+        "http://127.0.0.1:" + str(server.server_port) + path for path in sorted(files)
+    ]
+
+    print(
+        str(args.files)
+        + " files, "
+        + str(args.connect_latency)
+        + " ms connection latency"
+        + (", gzip" if args.gzip else "")
+    )
+    for label, connection_pool in (
+        ("new connection per request", flmcore.ConnectionPool(max_idle_connections=0)),
+        ("keep-alive connection pool", flmcore.ConnectionPool()),
+    ):
+        connection_count, elapsed = run(server, url_list, connection_pool)
+        print(
+            "  {0:<28} {1:>5} connections  {2:>8.1f} ms".format(
+                label, connection_count, elapsed * 1000
+            )
+        )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
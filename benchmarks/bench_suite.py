@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# ==============================================================
+#
+#
+#   bench_suite.py
+#   Filter list definition pipeline and tools benchmark suite
+#   Copyright 2018 Christopher Simpkins
+#   Apache License 2.0
+#
+# ==============================================================
+
+# USAGE
+#
+#    $ python3 bench_suite.py [--glyphs N] [--files N] [--names N] [--repeat N]
+#                             [--only NAME] [--output FILE] [--compare FILE]
+#
+# Generates a synthetic GlyphData.xml file and definitions directory with the
+# corpus.py module in a temporary directory and times the following steps:
+#
+#   filter_parse         Filter.define_list_with_newline_delimited_text on the
+#                        text of all definition files
+#   local_discovery      flmcore.get_local_filter_definitions_list without and
+#   local_discovery_manifest   with a current definitions manifest
+#   plist_merge          flmcore.build_plist_data
+#   plist_write          flmcore.write_plist
+#   query_resolve        flmcore.resolve_filter_definitions on query directive
+#                        definitions (@range, @script, @production), one per
+#                        definition file, with a new GlyphData index
+#   glinter_cold         glinter.py with a new GlyphData index and lint cache
+#   glinter              glinter.py --no-cache with a current GlyphData index
+#   glinter_cached       glinter.py with current lint cache results
+#   glformatter          glformatter.py on a copy of the definitions directory
+#
+# glinter.py and glformatter.py are executed in a new Python process with the
+# HOME environment variable set to the temporary directory so that the cache
+# files in your ~/GlyphsFilters directory are not used or modified.
+#
+# Each step is executed --repeat times and the minimum, median, and mean
+# times are reported in seconds.  Use --output to write the results with the
+# corpus parameters and platform details to a JSON file and --compare to
+# report the change in the median times relative to a previous JSON results
+# file, e.g. from a run on an earlier commit:
+#
+#    $ python3 bench_suite.py --output before.json
+#    $ git checkout [commit]
+#    $ python3 bench_suite.py --compare before.json --output after.json
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import corpus
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCHMARKS_DIR)
+RESOURCES_DIR = os.path.join(
+    ROOT_DIR, "FilterListManager.glyphsPlugin", "Contents", "Resources"
+)
+TOOLS_DIR = os.path.join(ROOT_DIR, "tools")
+
+sys.path.insert(0, RESOURCES_DIR)
+import flmcore  # noqa: E402
+
+RESULTS_VERSION = 1
+
+
+class BenchmarkSuite(object):
+    """BenchmarkSuite times the benchmark steps on a corpus in work_dir"""
+
+    def __init__(self, work_dir, glyphdata_path, definitions_dir, repeat):
+        self.work_dir = work_dir
+        self.glyphdata_path = glyphdata_path
+        self.definitions_dir = definitions_dir
+        self.repeat = repeat
+        self.env = dict(os.environ, HOME=work_dir)
+        self.definition_paths = [
+            os.path.join(definitions_dir, filename)
+            for filename in sorted(os.listdir(definitions_dir))
+        ]
+
+    def get_benchmarks(self):
+        return [
+            ("filter_parse", self.bench_filter_parse),
+            ("local_discovery", self.bench_local_discovery),
+            ("local_discovery_manifest", self.bench_local_discovery_manifest),
+            ("plist_merge", self.bench_plist_merge),
+            ("plist_write", self.bench_plist_write),
+            ("query_resolve", self.bench_query_resolve),
+            ("glinter_cold", self.bench_glinter_cold),
+            ("glinter", self.bench_glinter),
+            ("glinter_cached", self.bench_glinter_cached),
+            ("glformatter", self.bench_glformatter),
+        ]
+
+    def measure(self, step, setup=None):
+        """Returns the list of step execution times in seconds.  The setup callable
+           is executed before each step execution and is not timed."""
+        times = []
+        for _ in range(self.repeat):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            step()
+            times.append(time.perf_counter() - start)
+        return times
+
+    def run_tool(self, script, args):
+        command = [sys.executable, os.path.join(TOOLS_DIR, script)] + args
+        exit_status = subprocess.call(
+            command, env=self.env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        # glinter.py exits with status 1 when it reports invalid glyph names,
+        # the corpus includes undefined glyph names on purpose
+        if exit_status not in (0, 1):
+            raise subprocess.CalledProcessError(exit_status, command)
+
+    def remove_cache(self):
+        shutil.rmtree(os.path.join(self.work_dir, "GlyphsFilters", ".cache"), ignore_errors=True)
+
+    def bench_filter_parse(self):
+        texts = []
+        for definition_path in self.definition_paths:
+            with open(definition_path) as f:
+                texts.append(f.read())
+
+        def step():
+            for text in texts:
+                flmcore.Filter("benchmark").define_list_with_newline_delimited_text(text)
+
+        return self.measure(step)
+
+    def bench_local_discovery(self):
+        return self.measure(
+            lambda: flmcore.get_local_filter_definitions_list(self.definitions_dir)
+        )
+
+    def bench_local_discovery_manifest(self):
+        manifest_path = os.path.join(self.work_dir, "manifest.json")
+        manifest = flmcore.DefinitionsManifest(manifest_path)
+        flmcore.get_local_filter_definitions_list(self.definitions_dir, manifest)
+        manifest.save()
+
+        def step():
+            manifest = flmcore.DefinitionsManifest(manifest_path)
+            manifest.load()
+            flmcore.get_local_filter_definitions_list(self.definitions_dir, manifest)
+
+        return self.measure(step)
+
+    def get_plist_data(self):
+        filter_definitions_list = flmcore.get_local_filter_definitions_list(
+            self.definitions_dir
+        )
+        # the filter lists are replaced and the other contents are kept in the merge
+        previous_plist_data = [{"name": "Incompatible Master", "list": []}]
+        previous_plist_data.extend(
+            {"name": f.name, "list": f.list} for f in filter_definitions_list
+        )
+        previous_plist_data.append({"name": "Saved Search", "predicate": "name BEGINSWITH 'a'"})
+        return previous_plist_data, filter_definitions_list
+
+    def bench_plist_merge(self):
+        previous_plist_data, filter_definitions_list = self.get_plist_data()
+        return self.measure(
+            lambda: flmcore.build_plist_data(previous_plist_data, filter_definitions_list)
+        )
+
+    def bench_plist_write(self):
+        previous_plist_data, filter_definitions_list = self.get_plist_data()
+        plist_data = flmcore.build_plist_data(previous_plist_data, filter_definitions_list)
+        plist_path = os.path.join(self.work_dir, "CustomFilter.plist")
+        return self.measure(lambda: flmcore.write_plist(plist_data, plist_path))
+
+    def bench_query_resolve(self):
+        query_definitions_list = []
+        for file_number in range(len(self.definition_paths)):
+            first_code_point = 0x0020 + file_number * 0x40
+            query = (
+                "@range U+%04X..U+%04X" % (first_code_point, first_code_point + 0x7F),
+                "@script " + corpus.SCRIPTS[file_number % len(corpus.SCRIPTS)],
+                "@production uni%02X" % (file_number % 0x100),
+            )[file_number % 3]
+            a_filter = flmcore.Filter("query" + str(file_number))
+            a_filter.list = [query]
+            query_definitions_list.append(a_filter)
+
+        def step():
+            glyphdata_files = flmcore.GlyphDataFiles([self.glyphdata_path])
+            flmcore.resolve_filter_definitions(
+                query_definitions_list, flmcore.DefinitionResolver(glyphdata_files)
+            )
+
+        return self.measure(step)
+
+    def get_glinter_args(self):
+        return ["--glyphdata", self.glyphdata_path] + self.definition_paths
+
+    def bench_glinter_cold(self):
+        args = self.get_glinter_args()
+        return self.measure(lambda: self.run_tool("glinter.py", args), setup=self.remove_cache)
+
+    def bench_glinter(self):
+        args = ["--no-cache"] + self.get_glinter_args()
+        self.run_tool("glinter.py", args)
+        return self.measure(lambda: self.run_tool("glinter.py", args))
+
+    def bench_glinter_cached(self):
+        args = self.get_glinter_args()
+        self.run_tool("glinter.py", args)
+        return self.measure(lambda: self.run_tool("glinter.py", args))
+
+    def bench_glformatter(self):
+        format_dir = os.path.join(self.work_dir, "format")
+        args = ["--glyphdata", self.glyphdata_path, format_dir]
+        # build the GlyphData index so that only the formatting is timed
+        self.run_tool("glformatter.py", ["--glyphdata", self.glyphdata_path])
+
+        def setup():
+            shutil.rmtree(format_dir, ignore_errors=True)
+            shutil.copytree(self.definitions_dir, format_dir)
+
+        return self.measure(lambda: self.run_tool("glformatter.py", args), setup=setup)
+
+
+def summarize(times):
+    return {
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.mean(times),
+        "repeat": len(times),
+    }
+
+
+def get_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT_DIR,
+            stderr=subprocess.DEVNULL,
+        ).decode("utf-8").strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, previous_results):
+    """Prints the change in the median times relative to previous_results"""
+    if previous_results["corpus"] != results["corpus"]:
+        print("[WARNING] the compared results were measured with a different corpus")
+    print("")
+    print(
+        "{0:<26} {1:>12} {2:>12} {3:>8}".format(
+            "benchmark", "before (s)", "after (s)", "change"
+        )
+    )
+    for name, result in results["benchmarks"].items():
+        previous_result = previous_results["benchmarks"].get(name)
+        if previous_result is None:
+            continue
+        before = previous_result["median"]
+        after = result["median"]
+        change = (after - before) / before * 100 if before > 0 else 0.0
+        print(
+            "{0:<26} {1:>12.4f} {2:>12.4f} {3:>+7.1f}%".format(name, before, after, change)
+        )
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        prog="bench_suite.py",
+        description="Filter list definition pipeline and tools benchmark suite",
+    )
+    parser.add_argument("--glyphs", type=int, default=20000, metavar="N", help="number of glyph records (default: 20000)")
+    parser.add_argument("--files", type=int, default=500, metavar="N", help="number of definition files (default: 500)")
+    parser.add_argument("--names", type=int, default=200, metavar="N", help="glyph names per definition file (default: 200)")
+    parser.add_argument("--seed", type=int, default=0, metavar="N", help="corpus random seed (default: 0)")
+    parser.add_argument("--repeat", type=int, default=5, metavar="N", help="executions per benchmark (default: 5)")
+    parser.add_argument("--only", action="append", metavar="NAME", help="run the named benchmark (repeat for multiple benchmarks)")
+    parser.add_argument("--output", metavar="FILE", help="JSON results file path")
+    parser.add_argument("--compare", metavar="FILE", help="previous JSON results file path")
+    args = parser.parse_args(argv)
+
+    previous_results = None
+    if args.compare is not None:
+        with open(args.compare) as f:
+            previous_results = json.load(f)
+
+    work_dir = tempfile.mkdtemp(prefix="flm-bench-")
+    try:
+        glyphdata_path = os.path.join(work_dir, "GlyphData.xml")
+        definitions_dir = os.path.join(work_dir, "definitions")
+        records = corpus.write_glyphdata(glyphdata_path, args.glyphs, args.seed)
+        corpus.write_definitions(definitions_dir, records, args.files, args.names, args.seed)
+        suite = BenchmarkSuite(work_dir, glyphdata_path, definitions_dir, args.repeat)
+
+        print(
+            str(args.glyphs)
+            + " glyph records, "
+            + str(args.files)
+            + " definition files, "
+            + str(args.names)
+            + " glyph names per file"
+        )
+        benchmark_results = {}
+        for name, benchmark in suite.get_benchmarks():
+            if args.only is not None and name not in args.only:
+                continue
+            result = summarize(benchmark())
+            benchmark_results[name] = result
+            print(
+                "  {0:<26} min {1:>9.4f} s  median {2:>9.4f} s".format(
+                    name, result["min"], result["median"]
+                )
+            )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    results = {
+        "version": RESULTS_VERSION,
+        "commit": get_commit(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "corpus": {
+            "glyphs": args.glyphs,
+            "files": args.files,
+            "names": args.names,
+            "seed": args.seed,
+        },
+        "benchmarks": benchmark_results,
+    }
+    if previous_results is not None:
+        compare(results, previous_results)
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
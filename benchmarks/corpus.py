@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# ==============================================================
+#
+#
+#   corpus.py
+#   Synthetic GlyphData.xml and definition file generator
+#   Copyright 2018 Christopher Simpkins
+#   Apache License 2.0
+#
+# ==============================================================
+
+# USAGE
+#
+#    $ python3 corpus.py [--glyphs N] [--files N] [--names N] [--seed N] [output directory]
+#
+# Writes a GlyphData.xml file with N glyph records and a definitions directory
+# with N filter list definition files to the output directory.  The glyph
+# records use the attributes of the Glyphs application GlyphData.xml file and
+# each definition file lists --names glyph names that are drawn from the
+# generated records as nice names, production names, and alternate names, with
+# comment lines, blank lines, and a small share of undefined glyph names.  The
+# same arguments always generate the same files.
+#
+# This module is also imported by the bench_suite.py script.
+
+import argparse
+import os
+import random
+import sys
+
+from xml.sax.saxutils import quoteattr
+
+SCRIPTS = ("latin", "cyrillic", "greek", "arabic", "hebrew", "devanagari", "thai")
+CATEGORIES = ("Letter", "Number", "Punctuation", "Symbol", "Mark", "Separator")
+SUFFIXES = ("", "", "", ".sc", ".case", ".ss01", ".alt", ".init", ".medi", ".fina")
+
+
+def get_glyph_records(glyph_count, seed=0):
+    """Returns a list of (unicode, name, production, alt_names, script, category,
+       description) tuples.  The unicode value is an empty string for glyph records
+       without a code point."""
+    rng = random.Random(seed)
+    records = []
+    code_point = 0x0020
+    for glyph_number in range(glyph_count):
+        script = SCRIPTS[glyph_number * len(SCRIPTS) // glyph_count]
+        category = rng.choice(CATEGORIES)
+        suffix = rng.choice(SUFFIXES)
+        if suffix == "":
+            # skip the surrogate range, there are no glyph names for it
+            if 0xD800 <= code_point <= 0xDFFF:
+                code_point = 0xE000
+            unicode = "%04X" % code_point
+            production = ("uni%04X" if code_point <= 0xFFFF else "u%05X") % code_point
+            code_point += rng.choice((1, 1, 1, 2, 3))
+        else:
+            unicode = ""
+            production = "uni%04X%s" % (0x0100 + glyph_number % 0xFE00, suffix)
+        name = "%s%s%d%s" % (script, category.lower()[:3], glyph_number, suffix)
+        alt_names = ""
+        if glyph_number % 11 == 0:
+            alt_names = "%s-alt%d, %s.legacy" % (script, glyph_number, name)
+        description = "%s %s %d" % (script.upper(), category.upper(), glyph_number)
+        records.append(
+            (unicode, name, production, alt_names, script, category, description)
+        )
+    return records
+
+
+def write_glyphdata(path, glyph_count, seed=0):
+    """Writes a GlyphData.xml file with glyph_count glyph records and returns the
+       glyph records"""
+    records = get_glyph_records(glyph_count, seed)
+    with open(path, "w") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write('<glyphData format="Glyphs 2.3">\n')
+        for unicode, name, production, alt_names, script, category, description in records:
+            attributes = []
+            if len(unicode) > 0:
+                attributes.append("unicode=" + quoteattr(unicode))
+            attributes.append("name=" + quoteattr(name))
+            attributes.append("category=" + quoteattr(category))
+            attributes.append("script=" + quoteattr(script))
+            attributes.append("production=" + quoteattr(production))
+            if len(alt_names) > 0:
+                attributes.append("altNames=" + quoteattr(alt_names))
+            attributes.append("description=" + quoteattr(description))
+            f.write("\t<glyph " + " ".join(attributes) + " />\n")
+        f.write("</glyphData>\n")
+    return records
+
+
+def write_definitions(definitions_dir, records, file_count, names_per_file, seed=0):
+    """Writes file_count definition files with names_per_file glyph names from the
+       glyph records to definitions_dir and returns the list of file paths"""
+    rng = random.Random(seed)
+    if not os.path.isdir(definitions_dir):
+        os.makedirs(definitions_dir)
+    filepaths = []
+    for file_number in range(file_count):
+        # each definition file is a contiguous block of glyph records that
+        # overlaps with neighboring files, like script or encoding subsets
+        start = rng.randrange(max(1, len(records) - names_per_file))
+        lines = ["# synthetic definition file " + str(file_number), ""]
+        for unicode, name, production, alt_names, script, category, description in records[start:start + names_per_file]:
+            choice = rng.random()
+            if choice < 0.01:
+                lines.append("undefined" + str(rng.randrange(1000000)))
+            elif choice < 0.03 and len(alt_names) > 0:
+                lines.append(alt_names.split(",")[0].strip())
+            elif choice < 0.25:
+                lines.append(production)
+            else:
+                lines.append(name)
+            if choice > 0.98:
+                lines.append("")
+                lines.append("// " + description)
+        filepath = os.path.join(definitions_dir, "filter%05d.txt" % file_number)
+        with open(filepath, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        filepaths.append(filepath)
+    return filepaths
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        prog="corpus.py",
+        description="Synthetic GlyphData.xml and definition file generator",
+    )
+    parser.add_argument("--glyphs", type=int, default=20000, metavar="N", help="number of glyph records (default: 20000)")
+    parser.add_argument("--files", type=int, default=500, metavar="N", help="number of definition files (default: 500)")
+    parser.add_argument("--names", type=int, default=200, metavar="N", help="glyph names per definition file (default: 200)")
+    parser.add_argument("--seed", type=int, default=0, metavar="N", help="random seed (default: 0)")
+    parser.add_argument("output_dir", help="output directory path")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.output_dir):
+        os.makedirs(args.output_dir)
+    glyphdata_path = os.path.join(args.output_dir, "GlyphData.xml")
+    records = write_glyphdata(glyphdata_path, args.glyphs, args.seed)
+    definitions_dir = os.path.join(args.output_dir, "definitions")
+    write_definitions(definitions_dir, records, args.files, args.names, args.seed)
+    print("[corpus] " + glyphdata_path + ": " + str(args.glyphs) + " glyph records")
+    print("[corpus] " + definitions_dir + ": " + str(args.files) + " definition files")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# ==============================================================
+#
+#
+#   run_plugin.py
+#   Headless plugin menu action harness
+#   Copyright 2018 Christopher Simpkins
+#   Apache License 2.0
+#
+# ==============================================================
+
+# USAGE
+#
+#    $ python3 run_plugin.py [--cancel-after SECONDS] [ACTION]
+#
+# Imports the plugin.py module with the GlyphsApp and objc stub modules in the
+# stubs directory, executes a plugin menu action, and prints the update progress
+# events and the notifications that the plugin shows.  ACTION is one of update
+# (the default), restore, restore-previous, and open.  The queued main thread
+# calls of the update worker are executed until the worker ends.  Use
+# --cancel-after to execute the Cancel Filter List Update menu action while an
+# update is running.
+#
+# The plugin uses the files in your home directory.  Set the HOME environment
+# variable to a test directory to use other files:
+#
+#    $ HOME=/tmp/flm-home python3 run_plugin.py update
+
+import argparse
+import os
+import sys
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path[0:0] = [
+    os.path.join(BENCHMARKS_DIR, "stubs"),
+    os.path.join(
+        BENCHMARKS_DIR,
+        os.pardir,
+        "FilterListManager.glyphsPlugin",
+        "Contents",
+        "Resources",
+    ),
+]
+import GlyphsApp  # noqa: E402
+import plugin  # noqa: E402
+
+ACTIONS = {
+    "update": "updateFilters_",
+    "restore": "restoreFilters_",
+    "restore-previous": "restorePreviousFilters_",
+    "open": "openGlyphsfiltersDirectory_",
+}
+
+
+def print_progress(phase, count, total, source):
+    print("[progress] " + phase + " " + str(count) + " of " + str(total) + ": " + source)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        prog="run_plugin.py", description="Headless plugin menu action harness"
+    )
+    parser.add_argument("action", nargs="?", default="update", choices=sorted(ACTIONS))
+    parser.add_argument("--cancel-after", type=float, metavar="SECONDS", help="cancel the update after SECONDS")
+    args = parser.parse_args(argv)
+
+    flm = plugin.FilterListManager()
+    flm.start()
+    report_progress = flm.report_progress
+
+    def report_and_print_progress(phase, count, total, source):
+        report_progress(phase, count, total, source)
+        print_progress(phase, count, total, source)
+
+    flm.report_progress = report_and_print_progress
+
+    start = time.time()
+    getattr(flm, ACTIONS[args.action])(None)
+    if args.cancel_after is not None:
+        GlyphsApp.run_main_loop(lambda: time.time() - start >= args.cancel_after)
+        flm.cancelUpdate_(None)
+    if not GlyphsApp.run_main_loop(lambda: not flm.update_is_running()):
+        print("[ERROR] the update worker did not end")
+        return 1
+    print("[done] " + args.action + " in " + "{0:.3f}".format(time.time() - start) + " s")
+    for title, message in GlyphsApp.Glyphs.notifications:
+        print("[notification] " + title + ": " + message)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
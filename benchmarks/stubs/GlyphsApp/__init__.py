@@ -0,0 +1,68 @@
+# Minimal GlyphsApp module stub for the headless plugin harnesses
+#
+# Defines the parts of the Glyphs application Python API that the Filter List
+# Manager plugin uses so that plugin.py can be imported and its menu actions can
+# be executed without the Glyphs application and PyObjC.  Add the stubs
+# directory to the beginning of sys.path before the plugin module is imported.
+# Notifications are recorded in Glyphs.notifications.
+#
+# Calls that the plugin performs on the main thread with
+# performSelectorOnMainThread_withObject_waitUntilDone_ are queued and are
+# executed by run_main_loop on the thread that calls it, in place of the
+# application run loop.
+
+import time
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+EDIT_MENU = "EDIT_MENU"
+
+main_thread_calls = queue.Queue()
+
+
+def run_main_loop(until, timeout=60.0):
+    """Executes the queued main thread calls until the until callable returns True
+       and all queued calls are executed.  Returns False on timeout."""
+    deadline = time.time() + timeout
+    while True:
+        try:
+            function, argument = main_thread_calls.get(timeout=0.01)
+        except queue.Empty:
+            if until():
+                return True
+            if time.time() > deadline:
+                return False
+            continue
+        function(argument)
+
+
+class NSMenuItem(object):
+    def __init__(self, title, action):
+        self.title = title
+        self.action = action
+
+
+class Menu(object):
+    def __init__(self):
+        self.items = {}
+
+    def __getitem__(self, key):
+        return self.items.setdefault(key, [])
+
+
+class GlyphsApplication(object):
+    def __init__(self):
+        self.menu = Menu()
+        self.notifications = []
+
+    def localize(self, strings):
+        return strings["en"]
+
+    def showNotification(self, title, message):
+        self.notifications.append((title, message))
+
+
+Glyphs = GlyphsApplication()
@@ -0,0 +1,24 @@
+# Minimal GlyphsApp.plugins module stub for the headless plugin harnesses.  See
+# __init__.py.
+
+from GlyphsApp import main_thread_calls
+
+
+class GeneralPlugin(object):
+    """Plugin base class.  The Glyphs application calls settings() and start() when
+       the plugin is loaded."""
+
+    def __init__(self):
+        self.settings()
+
+    def settings(self):
+        pass
+
+    def start(self):
+        pass
+
+    def performSelectorOnMainThread_withObject_waitUntilDone_(
+        self, selector, argument, wait
+    ):
+        """Queues the method call for run_main_loop.  The wait argument is ignored."""
+        main_thread_calls.put((getattr(self, selector.replace(":", "_")), argument))
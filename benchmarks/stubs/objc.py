@@ -0,0 +1,10 @@
+# Minimal PyObjC objc module stub for the headless plugin harnesses.  See
+# GlyphsApp/__init__.py.
+
+
+def python_method(function):
+    return function
+
+
+def selector(function, signature=None):
+    return function
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# ==============================================================
+#
+#
+#   test_flmcore.py
+#   Tests for the plugin flmcore.py update pipeline
+#   Copyright 2018 Christopher Simpkins
+#   Apache License 2.0
+#
+# ==============================================================
+
+# USAGE
+#
+#    $ python3 -m unittest discover tests
+
+import codecs
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        os.pardir,
+        "FilterListManager.glyphsPlugin",
+        "Contents",
+        "Resources",
+    ),
+)
+import flmcore  # noqa: E402
+
+
+class ChunkedStream(object):
+    """Binary stream that returns at most chunk_size bytes per read call"""
+
+    def __init__(self, data, chunk_size):
+        self.stream = io.BytesIO(data)
+        self.chunk_size = chunk_size
+
+    def read(self, size=-1):
+        return self.stream.read(self.chunk_size)
+
+
+class DefinitionResolverTest(unittest.TestCase):
+    def test_include_exclude_intersect(self):
+        resolver = flmcore.DefinitionResolver()
+        resolver.update(
+            {
+                "upper": ("A", "B", "C"),
+                "lower": ("a", "b"),
+                "vowels": ("A", "a", "E"),
+                "letters": ("@include upper", "@include lower", "@exclude vowels"),
+                "upper vowels": ("@include upper", "@intersect vowels"),
+            }
+        )
+        self.assertEqual(resolver.resolve("letters"), ("B", "C", "b"))
+        self.assertEqual(resolver.resolve("upper vowels"), ("A",))
+
+    def test_cycle_raises(self):
+        resolver = flmcore.DefinitionResolver()
+        resolver.update(
+            {
+                "first": ("A", "@include second"),
+                "second": ("B", "@include third"),
+                "third": ("@exclude first",),
+            }
+        )
+        with self.assertRaises(flmcore.DefinitionReferenceError) as context:
+            resolver.resolve("first")
+        self.assertIn("first -> second -> third -> first", str(context.exception))
+
+    def test_undefined_reference_raises(self):
+        resolver = flmcore.DefinitionResolver()
+        resolver.update({"first": ("@include missing",)})
+        with self.assertRaises(flmcore.DefinitionReferenceError):
+            resolver.resolve("first")
+
+    def test_update_invalidates_dependents(self):
+        resolver = flmcore.DefinitionResolver()
+        resolver.update(
+            {
+                "base": ("A", "B"),
+                "middle": ("@include base", "C"),
+                "top": ("@include middle", "D"),
+                "other": ("@include unrelated",),
+                "unrelated": ("E",),
+            }
+        )
+        self.assertEqual(resolver.resolve("top"), ("A", "B", "C", "D"))
+        other = resolver.resolve("other")
+
+        resolver.update(
+            {
+                "base": ("A", "X"),
+                "middle": ("@include base", "C"),
+                "top": ("@include middle", "D"),
+                "other": ("@include unrelated",),
+                "unrelated": ("E",),
+            }
+        )
+        self.assertNotIn("middle", resolver.resolved)
+        self.assertNotIn("top", resolver.resolved)
+        # unaffected filter lists stay memoized
+        self.assertIs(resolver.resolved["other"], other)
+        self.assertEqual(resolver.resolve("top"), ("A", "X", "C", "D"))
+
+    def test_removed_definition_invalidates_dependents(self):
+        resolver = flmcore.DefinitionResolver()
+        resolver.update({"base": ("A",), "top": ("@include base",)})
+        self.assertEqual(resolver.resolve("top"), ("A",))
+        resolver.update({"top": ("@include base",)})
+        with self.assertRaises(flmcore.DefinitionReferenceError):
+            resolver.resolve("top")
+
+
+class BackupStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp(prefix="flm-test-")
+        self.plist_path = os.path.join(self.work_dir, "CustomFilter.plist")
+        self.backup_store = flmcore.BackupStore(
+            os.path.join(self.work_dir, "backup", "objects"),
+            os.path.join(self.work_dir, "backup", "history.json"),
+            max_generations=2,
+            max_age_days=365,
+            max_size=1 << 20,
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def add(self, content):
+        with open(self.plist_path, "wb") as f:
+            f.write(content)
+        return self.backup_store.add(self.plist_path)
+
+    def get_stored_digests(self):
+        return set(
+            object_file.split(".")[0]
+            for object_file in os.listdir(self.backup_store.objects_dir)
+        )
+
+    def test_identical_files_are_stored_once(self):
+        first_digest = self.add(b"first")
+        self.add(b"second")
+        self.assertEqual(self.add(b"first"), first_digest)
+        self.assertEqual(len(self.backup_store.read_history()), 3)
+        self.assertEqual(len(self.get_stored_digests()), 2)
+
+    def test_prune_keeps_shared_files(self):
+        first_digest = self.add(b"first")
+        second_digest = self.add(b"second")
+        third_digest = self.add(b"third")
+        self.add(b"first")
+        # history: first, third, second, first
+        self.backup_store.prune()
+
+        history = self.backup_store.read_history()
+        self.assertEqual(
+            [generation["digest"] for generation in history],
+            [first_digest, third_digest],
+        )
+        # the file of the pruned oldest generation is still referenced by the most
+        # recent generation, the file of the second generation is not referenced
+        self.assertEqual(self.get_stored_digests(), set([first_digest, third_digest]))
+        self.assertNotIn(second_digest, self.get_stored_digests())
+
+    def test_prune_keeps_most_recent_generation(self):
+        self.backup_store.max_size = 0
+        digest = self.add(b"first")
+        self.backup_store.prune()
+        self.assertEqual(len(self.backup_store.read_history()), 1)
+        self.assertEqual(self.get_stored_digests(), set([digest]))
+
+    def test_restore_adds_current_file(self):
+        self.add(b"first")
+        self.add(b"second")
+        with open(self.plist_path, "wb") as f:
+            f.write(b"third")
+        self.backup_store.restore(1, self.plist_path)
+        with open(self.plist_path, "rb") as f:
+            self.assertEqual(f.read(), b"first")
+        # the restore is reverted with the most recent generation
+        self.assertEqual(self.backup_store.get_previous_generation(self.plist_path), 0)
+        with open(self.backup_store.get_generation_path(0), "rb") as f:
+            self.assertEqual(f.read(), b"third")
+
+
+class DefinitionReaderTest(unittest.TestCase):
+    def read_lines(self, data, chunk_size, encoding=None):
+        reader = flmcore.DefinitionReader(
+            ChunkedStream(data, chunk_size), encoding=encoding
+        )
+        return list(reader)
+
+    def test_crlf_across_chunk_boundary(self):
+        data = b"A\r\nB\r\nC\r\n"
+        for chunk_size in range(1, len(data) + 1):
+            self.assertEqual(
+                self.read_lines(data, chunk_size), ["A\r\n", "B\r\n", "C\r\n"]
+            )
+
+    def test_carriage_return_line_breaks(self):
+        # a carriage return at the end of a chunk is not followed by a line feed
+        self.assertEqual(self.read_lines(b"A\rB\rC", 2), ["A\r", "B\r", "C"])
+
+    def test_byte_order_marks(self):
+        text = "Aring\r\nOslash\r\n"
+        for byte_order_mark, encoding in (
+            (codecs.BOM_UTF8, "utf-8"),
+            (codecs.BOM_UTF16_LE, "utf-16-le"),
+            (codecs.BOM_UTF16_BE, "utf-16-be"),
+            (codecs.BOM_UTF32_LE, "utf-32-le"),
+            (codecs.BOM_UTF32_BE, "utf-32-be"),
+        ):
+            data = byte_order_mark + text.encode(encoding)
+            for chunk_size in (1, 3, 5):
+                self.assertEqual(
+                    self.read_lines(data, chunk_size, "latin-1"),
+                    ["Aring\r\n", "Oslash\r\n"],
+                )
+
+    def test_default_encoding_without_byte_order_mark(self):
+        data = "Å\n".encode("latin-1")
+        self.assertEqual(self.read_lines(data, 1, "latin-1"), ["Å\n"])
+        self.assertEqual(self.read_lines("Å\n".encode("utf-8"), 1), ["Å\n"])
+
+    def test_read_definitions(self):
+        data = codecs.BOM_UTF16_LE + "# comment\r\nA\r\n\r\n/ comment\r\nB\r\n".encode(
+            "utf-16-le"
+        )
+        reader = flmcore.DefinitionReader(ChunkedStream(data, 3))
+        self.assertEqual(reader.read_definitions(), ["A", "B"])
+        self.assertEqual(reader.size, len(data))
+
+    def test_size_limit(self):
+        reader = flmcore.DefinitionReader(ChunkedStream(b"A\nB\nC\n", 2), max_size=4)
+        with self.assertRaises(flmcore.DefinitionSizeError):
+            list(reader)
+
+
+class DefinitionsManifestTest(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp(prefix="flm-test-")
+        self.manifest_path = os.path.join(self.work_dir, "cache", "manifest.json")
+        self.definition_path = os.path.join(self.work_dir, "letters.txt")
+        with open(self.definition_path, "w") as f:
+            f.write("A\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def test_unchanged_sources_are_reused(self):
+        stat = os.stat(self.definition_path)
+        manifest = flmcore.DefinitionsManifest(self.manifest_path)
+        manifest.load()
+        self.assertIsNone(manifest.get_filter_list("local:letters", stat))
+        manifest.add("local:letters", ["A"], "digest", stat)
+        manifest.add("remote:url", ["B"], "remote digest")
+        manifest.save()
+
+        manifest = flmcore.DefinitionsManifest(self.manifest_path)
+        manifest.load()
+        self.assertEqual(manifest.get_filter_list("local:letters", stat), ["A"])
+        self.assertIsNone(manifest.get_filter_list_by_digest("remote:url", "other"))
+        self.assertEqual(
+            manifest.get_filter_list_by_digest("remote:url", "remote digest"), ["B"]
+        )
+
+        os.utime(self.definition_path, (stat.st_atime, stat.st_mtime + 10))
+        manifest = flmcore.DefinitionsManifest(self.manifest_path)
+        manifest.load()
+        self.assertIsNone(
+            manifest.get_filter_list("local:letters", os.stat(self.definition_path))
+        )
+
+    def test_sources_not_in_the_update_are_removed(self):
+        manifest = flmcore.DefinitionsManifest(self.manifest_path)
+        manifest.add("remote:url", ["B"], "remote digest")
+        manifest.save()
+
+        manifest = flmcore.DefinitionsManifest(self.manifest_path)
+        manifest.load()
+        manifest.save()
+        manifest = flmcore.DefinitionsManifest(self.manifest_path)
+        manifest.load()
+        self.assertEqual(manifest.get_previous_filter_list("remote:url"), (None, None))
+
+
+class FakeWatcher(object):
+    def __init__(self, changes):
+        self.changes = list(changes)
+        self.timeouts = []
+
+    def read_changes(self, timeout=None):
+        self.timeouts.append(timeout)
+        if len(self.changes) == 0:
+            return set()
+        return set(self.changes.pop(0))
+
+
+class ReadDebouncedChangesTest(unittest.TestCase):
+    def test_burst_of_changes_is_merged(self):
+        watcher = FakeWatcher([["a.txt"], ["b.txt"], ["a.txt", "c.txt"]])
+        changed_paths = flmcore.read_debounced_changes(watcher, debounce=0.25)
+        self.assertEqual(changed_paths, set(["a.txt", "b.txt", "c.txt"]))
+        # waits for the first change, then for each further change
+        self.assertEqual(watcher.timeouts, [None, 0.25, 0.25, 0.25])
+
+    def test_later_changes_are_not_read(self):
+        watcher = FakeWatcher([["a.txt"], [], ["b.txt"]])
+        self.assertEqual(flmcore.read_debounced_changes(watcher), set(["a.txt"]))
+        self.assertEqual(flmcore.read_debounced_changes(watcher), set(["b.txt"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
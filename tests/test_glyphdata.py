@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# ==============================================================
+#
+#
+#   test_glyphdata.py
+#   Tests for the tools/glyphdata.py GlyphData index
+#   Copyright 2018 Christopher Simpkins
+#   Apache License 2.0
+#
+# ==============================================================
+
+# USAGE
+#
+#    $ python3 -m unittest discover tests
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "tools")
+)
+import glyphdata  # noqa: E402
+
+APPLICATION_GLYPHDATA = """<?xml version="1.0" encoding="UTF-8"?>
+<glyphData>
+\t<glyph unicode="0041" name="A" category="Letter" description="LATIN CAPITAL LETTER A" />
+\t<glyph unicode="00C5" name="Aring" category="Letter" description="LATIN CAPITAL LETTER A WITH RING ABOVE" production="uni00C5" />
+</glyphData>
+"""
+
+CUSTOM_GLYPHDATA = """<?xml version="1.0" encoding="UTF-8"?>
+<glyphData>
+\t<glyph unicode="00C5" name="Aring" category="Letter" description="CUSTOM A RING" production="Aring.custom" />
+\t<glyph unicode="E000" name="logo" category="Symbol" description="CUSTOM LOGO" production="uni00C5" />
+</glyphData>
+"""
+
+
+class CustomGlyphDataTest(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp(prefix="flm-test-")
+        self.paths = []
+        for filename, text in (
+            ("GlyphData.xml", APPLICATION_GLYPHDATA),
+            ("GlyphData-custom.xml", CUSTOM_GLYPHDATA),
+        ):
+            path = os.path.join(self.work_dir, filename)
+            with open(path, "w") as f:
+                f.write(text)
+            self.paths.append(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def load(self, cache_dir):
+        # application file first, as in get_default_glyphdata_paths
+        return glyphdata.load_glyphdata(self.paths, cache_dir=cache_dir)
+
+    def test_custom_record_overrides_name(self):
+        for cache_dir in (None, os.path.join(self.work_dir, "cache")):
+            glyph = self.load(cache_dir).find("name", "Aring")
+            self.assertEqual(glyph.description, "CUSTOM A RING")
+            self.assertEqual(glyph.production, "Aring.custom")
+
+    def test_custom_record_overrides_production_name(self):
+        glyph = self.load(None).find("production", "uni00C5")
+        self.assertEqual(glyph.name, "logo")
+
+    def test_application_records_are_kept(self):
+        data = self.load(None)
+        self.assertEqual(data.find("name", "A").description, "LATIN CAPITAL LETTER A")
+        self.assertIn("Aring.custom", data.production_set)
+
+
+if __name__ == "__main__":
+    unittest.main()
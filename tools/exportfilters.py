@@ -33,13 +33,38 @@
 # mapped to the base file name of the definition file and the glyph definitions
 # are listed with newline separators.  You can find all definition files on
 # the path ~/GlyphsFilters.
+#
+# Use the --profile option to write cProfile statistics for the export to a
+# file.  The option requires the profiling.py module in the same directory.
 
+import argparse
 import os
 import plistlib
 import sys
 
 
-def main():
+def main(argv):
+    parser = argparse.ArgumentParser(
+        prog="exportfilters.py",
+        description="Glyphs filter list to FLM definition file exporter",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="FILE",
+        help="write cProfile statistics to FILE and report the top functions by internal time",
+    )
+    args = parser.parse_args(argv)
+
+    if args.profile is not None:
+        # the export does not depend on the other tools modules without --profile
+        from profiling import profile_call
+
+        profile_call(args.profile, export_filters)
+    else:
+        export_filters()
+
+
+def export_filters():
     try:
         # default paths
         glyphs_plist_path = os.path.join(
@@ -94,4 +119,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    main(sys.argv[1:])
@@ -9,7 +9,7 @@
 #   Copyright 2018 Christopher Simpkins
 #   Apache License 2.0
 #
-#   Version 0.1.1
+#   Version 0.2.0
 #
 # ==============================================================
 
@@ -25,6 +25,11 @@
 #
 #    $ python3 glformatter.py [filepath 1] [filepath ...]
 #
+# Directory path arguments format all definition files in the top level of
+# the directory.  All files are formatted in a single run of the script:
+#
+#    $ python3 glformatter.py [directory path 1] [filepath 1] [...]
+#
 # The script reformats the text in the filter list definition file with the
 # following:
 #
@@ -35,131 +40,279 @@
 #      - production name (if not used for glyph name definition)
 #      - Unicode description
 #
-# The file write takes place on the original file path. The original file
-# is backed up on the path:
+# Formatting is idempotent.  A comment line that the script added in an earlier
+# run is not added again and consecutive blank lines are reduced to one.
+#
+# The file write takes place on the original file path and only when the
+# formatted text differs from the file contents.  The formatted text is written
+# to a temporary file that replaces the original file.  The original file is
+# backed up on the path:
 #
 #     [original file path].pre
+#
+# Use the --check option to report the files that are not formatted without
+# writing them (the script exits with status 1 when a file is not formatted)
+# and the --diff option to write the changes as a unified diff:
+#
+#    $ python3 glformatter.py --check --diff [filepath 1] [filepath ...]
+#
+# Fingerprints of formatted file contents are cached in the
+# ~/GlyphsFilters/.cache/format directory and files with a cached fingerprint
+# are not formatted again with the same GlyphData.xml data.  Use the --no-cache
+# option to format all files.
 
 
+import argparse
+import difflib
 import os
 import shutil
 import sys
-import xml.etree.ElementTree as ET
-
-COMMENT_DELIMITERS = ("#", "/")
+import tempfile
 
+from glyphdata import CACHE_DIR, ResultCache, load_glyphdata
+from profiling import add_profile_argument, profile_call
 
-class Glyph(object):
-    def __init__(self):
-        self.unicode = ""
-        self.name = ""
-        self.description = ""
-        self.production = ""
-        self.alt_names = []
+COMMENT_DELIMITERS = ("#", "/")
+# Increment when the formatted output changes so that cached fingerprints are not used
+FORMAT_VERSION = 2
+FORMAT_CACHE_DIR = os.path.join(CACHE_DIR, "format")
+FORMAT_CACHE_MAX_ENTRIES = 10000
 
 
 def main(argv):
-    glyphlist = []
-    unicode_set = set()
-    name_set = set()
-    production_set = set()
-    altname_set = set()
-
-    tree = ET.parse(
-        "/Applications/Glyphs.app/Contents/Frameworks/GlyphsCore.framework/Versions/A/Resources/GlyphData.xml"
+    parser = argparse.ArgumentParser(
+        prog="glformatter.py",
+        description="Glyph name filter list definition file formatter",
     )
-    root = tree.getroot()
-    for child in root:
-        glyph = Glyph()
-        if "unicode" in child.attrib:
-            glyph.unicode = child.attrib["unicode"]
-            unicode_set.add(glyph.unicode)
-        if "name" in child.attrib:
-            glyph.name = child.attrib["name"]
-            name_set.add(glyph.name)
-        if "description" in child.attrib:
-            glyph.description = child.attrib["description"]
-        if "production" in child.attrib:
-            glyph.production = child.attrib["production"]
-            production_set.add(glyph.production)
-        if "altNames" in child.attrib:
-            namestring = child.attrib["altNames"]
-            if len(namestring) > 0:
-                name_list = namestring.split(",")
-                for altname in name_list:
-                    save_name = altname.strip()
-                    glyph.alt_names.append(save_name)
-                    altname_set.add(save_name)
-
-        glyphlist.append(glyph)
-
-    for filepath in argv:
+    parser.add_argument(
+        "--glyphdata",
+        action="append",
+        metavar="PATH",
+        help="GlyphData XML file path (repeat for multiple files, default: Glyphs application and custom GlyphData files)",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="report the files that are not formatted and exit with status 1 if any, do not write files",
+    )
+    parser.add_argument(
+        "--diff",
+        action="store_true",
+        help="write the formatting changes as a unified diff to stdout, do not write files",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="format all definition files and do not use the fingerprint cache",
+    )
+    add_profile_argument(parser)
+    parser.add_argument("filepaths", nargs="*", help="definition file paths")
+    args = parser.parse_args(argv)
+
+    if args.profile is not None:
+        status = profile_call(args.profile, format_files, args)
+    else:
+        status = format_files(args)
+    sys.exit(status)
+
+
+def format_files(args):
+    """Formats the definition files in the parsed command line arguments and returns
+       the exit status"""
+    # the GlyphData columns are only loaded when a file is formatted
+    glyphdata = load_glyphdata(args.glyphdata)
+
+    filepaths = get_definition_filepaths(args.filepaths)
+    for filepath in filepaths:
         if not os.path.isfile(filepath):
             sys.stderr.write(
                 "[ERROR] " + filepath + " does not appear to be a valid filepath!"
             )
             sys.exit(1)
 
-        outfile_list = []
-
-        with open(filepath, "r") as f:
-            text = f.read()
-            text_line_list = text.splitlines()
-            for line in text_line_list:
-                if line[0] in COMMENT_DELIMITERS:
-                    outfile_list.append(line)
-                elif len(line) == 0:
-                    outfile_list.append("")
-                elif line is None:
-                    outfile_list.append("")
-                else:
-                    glyph_name = line
-                    if glyph_name in name_set:
-                        outfile_list.append(
-                            get_comment_string(glyphlist, name=glyph_name)
-                        )
-                        outfile_list.append(glyph_name + os.linesep)
-                    elif glyph_name in production_set:
-                        outfile_list.append(
-                            get_comment_string(glyphlist, production=glyph_name)
-                        )
-                        outfile_list.append(glyph_name + os.linesep)
-                    else:
-                        outfile_list.append(glyph_name + os.linesep)
+    if args.no_cache:
+        cache = None
+    else:
+        cache = ResultCache(
+            FORMAT_CACHE_DIR,
+            FORMAT_VERSION,
+            glyphdata.digest,
+            max_entries=FORMAT_CACHE_MAX_ENTRIES,
+        )
+
+    write = not (args.check or args.diff)
+    unformatted_count = 0
+    for filepath in filepaths:
+        formatted, text, formatted_text = format_file(filepath, glyphdata, cache, write)
+        if formatted:
+            continue
+        unformatted_count += 1
+        if args.diff:
+            sys.stdout.writelines(
+                difflib.unified_diff(
+                    text.splitlines(True),
+                    formatted_text.splitlines(True),
+                    fromfile=filepath,
+                    tofile=filepath,
+                )
+            )
+        if args.check:
+            sys.stderr.write("[ERROR] " + filepath + " is not formatted" + os.linesep)
+
+    if cache is not None:
+        cache.evict()
+
+    if args.check:
+        if unformatted_count > 0:
+            sys.stderr.write(
+                "[ERROR] "
+                + str(unformatted_count)
+                + " of "
+                + str(len(filepaths))
+                + " file(s) are not formatted"
+                + os.linesep
+            )
+            return 1
+        print("All files are formatted!")
+    return 0
+
+
+def get_definition_filepaths(paths):
+    """Returns a list of definition file paths with directory paths in the paths list
+       replaced by the definition files in the top level of the directory.  Dotfiles
+       and *.pre backup files are not included."""
+    filepaths = []
+    for path in paths:
+        if os.path.isdir(path):
+            for filename in sorted(os.listdir(path)):
+                filepath = os.path.join(path, filename)
+                if filename[0] == "." or filename.endswith(".pre"):
+                    pass
+                elif os.path.isfile(filepath):
+                    filepaths.append(filepath)
+        else:
+            filepaths.append(path)
+    return filepaths
+
+
+def format_file(filepath, glyphdata, cache=None, write=True):
+    """Formats the definition file on filepath and returns a (formatted, text,
+       formatted text) tuple.  formatted is True when the file was already formatted.
+       When write is True, a file that is not formatted is replaced with the formatted
+       text and the original file is backed up on the path [filepath].pre.  Files with
+       a fingerprint in the cache are not formatted and None is returned for the
+       texts."""
+    with open(filepath, "rb") as f:
+        file_bytes = f.read()
+    key = None
+    if cache is not None:
+        key = cache.get_key(file_bytes)
+        if cache.get(key) is not None:
+            return True, None, None
 
+    text = file_bytes.decode("utf-8")
+    formatted_text = "".join(format_lines(text.splitlines(), glyphdata))
+    if formatted_text == text:
+        if cache is not None:
+            # the cache stores the fingerprints of formatted file contents
+            cache.set(key, True)
+        return True, text, formatted_text
+    if write:
+        formatted_bytes = formatted_text.encode("utf-8")
         # backup file to originalpath with ".pre" suffix
-        backup_filepath = filepath + ".pre"
-        shutil.copyfile(filepath, backup_filepath)
+        shutil.copyfile(filepath, filepath + ".pre")
+        write_file_atomic(filepath, formatted_bytes)
+        if cache is not None:
+            cache.set(cache.get_key(formatted_bytes), True)
+    return False, text, formatted_text
 
-        # write out formatted file
-        out_text = "\n".join(outfile_list)
-        with open(filepath, "w") as f:
-            f.write(out_text)
+
+def format_lines(lines, glyphdata):
+    """Generates the formatted lines with line endings for the definition file lines.
+       A glyph name line is preceded by its GlyphData comment line and followed by a
+       blank line.  Copies of the GlyphData comment line directly above the glyph name
+       are replaced, consecutive blank lines are reduced to one, and trailing blank
+       lines are removed."""
+    name_set = glyphdata.name_set
+    production_set = glyphdata.production_set
+    comment_lines = []  # comment lines above the next glyph name
+    pending_blank_line = False
+    for line in lines:
+        if len(line) == 0:
+            for comment_line in comment_lines:
+                yield comment_line + "\n"
+            comment_lines = []
+            pending_blank_line = True
+            continue
+        if pending_blank_line:
+            yield "\n"
+            pending_blank_line = False
+        if line[0] in COMMENT_DELIMITERS:
+            comment_lines.append(line)
+            continue
+        glyph_name = line
+        comment_string = None
+        if glyph_name in name_set:
+            comment_string = get_comment_string(glyphdata, name=glyph_name)
+        elif glyph_name in production_set:
+            comment_string = get_comment_string(glyphdata, production=glyph_name)
+        if comment_string:
+            # the comment line of an earlier run is not added again
+            while len(comment_lines) > 0 and comment_lines[-1] == comment_string:
+                comment_lines.pop()
+            comment_lines.append(comment_string)
+        for comment_line in comment_lines:
+            yield comment_line + "\n"
+        comment_lines = []
+        yield glyph_name + "\n"
+        # glyph name definitions are separated by a blank line
+        pending_blank_line = True
+    for comment_line in comment_lines:
+        yield comment_line + "\n"
+
+
+def write_file_atomic(filepath, file_bytes):
+    """Writes file_bytes to a temporary file in the directory of filepath that replaces
+       the file on filepath, so that an interrupted write does not truncate the file"""
+    # the temporary file is a dotfile so that it is not read as a definition file
+    fd, temp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(filepath)),
+        prefix="." + os.path.basename(filepath) + ".",
+        suffix=".tmp",
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(file_bytes)
+        shutil.copymode(filepath, temp_path)
+        os.replace(temp_path, filepath)
+    except Exception:
+        os.remove(temp_path)
+        raise
 
 
-def get_comment_string(glyphlist, name=None, production=None):
+def get_comment_string(glyphdata, name=None, production=None):
     if name is not None:
-        for glyph in glyphlist:
-            if glyph.name == name:
-                comment_string = "# "
-                if len(glyph.unicode) > 0:
-                    comment_string += "U+" + glyph.unicode
-                if len(glyph.production) > 0:
-                    comment_string += " | " + glyph.production
-                if len(glyph.description) > 0:
-                    comment_string += " | " + glyph.description
-                return comment_string
+        glyph = glyphdata.find("name", name)
+        if glyph is not None:
+            comment_string = "# "
+            if len(glyph.unicode) > 0:
+                comment_string += "U+" + glyph.unicode
+            if len(glyph.production) > 0:
+                comment_string += " | " + glyph.production
+            if len(glyph.description) > 0:
+                comment_string += " | " + glyph.description
+            return comment_string
     elif production is not None:
-        for glyph in glyphlist:
-            if glyph.production == production:
-                comment_string = "# "
-                if len(glyph.unicode) > 0:
-                    comment_string += "U+" + glyph.unicode
-                if len(glyph.name) > 0:
-                    comment_string += " | " + glyph.name
-                if len(glyph.description) > 0:
-                    comment_string += " | " + glyph.description
-                return comment_string
+        glyph = glyphdata.find("production", production)
+        if glyph is not None:
+            comment_string = "# "
+            if len(glyph.unicode) > 0:
+                comment_string += "U+" + glyph.unicode
+            if len(glyph.name) > 0:
+                comment_string += " | " + glyph.name
+            if len(glyph.description) > 0:
+                comment_string += " | " + glyph.description
+            return comment_string
     else:
         return ""
 
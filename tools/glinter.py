@@ -25,6 +25,15 @@
 #
 #    $ python3 glinter.py [filepath 1] [filepath ...]
 #
+# Use the --jobs option to test definition files in parallel processes.  The
+# results are reported in the order of the filepath arguments:
+#
+#    $ python3 glinter.py --jobs 4 [filepath 1] [filepath ...]
+#
+# Test results are cached in the ~/GlyphsFilters/.cache/lint directory and
+# are replayed for definition files that have not changed since the last run
+# with the same GlyphData.xml data.  Use the --no-cache option to test all files.
+#
 # The script tests each glyph name listed in the definition file vs.
 # the Glyphs application GlyphData.xml file and Adobe OpenType
 # Feature File specification for development glyph names
@@ -44,22 +53,26 @@
 #    - glyph name does not contain a leading period (except .notdef and .null)
 #    - glyph name contains valid characters for development glyph names
 #
+# Lines that begin with the @ character are tested as @include, @exclude, and
+# @intersect directives with a filter list name or as @range, @script, and
+# @production GlyphData query directives instead of as glyph names.
+#
 # Adobe reference:
 #  https://github.com/adobe-type-tools/afdko/blob/develop/docs/OpenTypeFeatureFileSpecification.html
 
+import argparse
+import multiprocessing
 import os
 import re
 import sys
-import xml.etree.ElementTree as ET
 
+from glyphdata import CACHE_DIR, ResultCache, load_glyphdata
+from profiling import add_profile_argument, profile_call
 
-class Glyph(object):
-    def __init__(self):
-        self.unicode = ""
-        self.name = ""
-        self.description = ""
-        self.production = ""
-        self.alt_names = []
+# Increment when a rule or message changes so that cached results are not replayed
+RULES_VERSION = 3
+LINT_CACHE_DIR = os.path.join(CACHE_DIR, "lint")
+LINT_CACHE_MAX_SIZE = 16 * 1024 * 1024
 
 
 class Filter(object):
@@ -91,51 +104,51 @@ class Filter(object):
 
 
 def main(argv):
-    # parse GlyphData.xml file for Glyphs application supported glyph name values
-    glyphlist = []
-    unicode_set = set()
-    name_set = set()
-    production_set = set()
-    altname_set = set()
-
-    tree = ET.parse(
-        "/Applications/Glyphs.app/Contents/Frameworks/GlyphsCore.framework/Versions/A/Resources/GlyphData.xml"
+    parser = argparse.ArgumentParser(
+        prog="glinter.py",
+        description="Glyph name validity tests for filter list definition files",
+    )
+    parser.add_argument(
+        "--glyphdata",
+        action="append",
+        metavar="PATH",
+        help="GlyphData XML file path (repeat for multiple files, default: Glyphs application and custom GlyphData files)",
     )
-    root = tree.getroot()
-    for child in root:
-        glyph = Glyph()
-        if "unicode" in child.attrib:
-            glyph.unicode = child.attrib["unicode"]
-            unicode_set.add(glyph.unicode)
-        if "name" in child.attrib:
-            glyph.name = child.attrib["name"]
-            name_set.add(glyph.name)
-        if "description" in child.attrib:
-            glyph.description = child.attrib["description"]
-        if "production" in child.attrib:
-            glyph.production = child.attrib["production"]
-            production_set.add(glyph.production)
-        if "altNames" in child.attrib:
-            namestring = child.attrib["altNames"]
-            if len(namestring) > 0:
-                name_list = namestring.split(",")
-                for altname in name_list:
-                    save_name = altname.strip()
-                    glyph.alt_names.append(save_name)
-                    altname_set.add(save_name)
-
-        glyphlist.append(glyph)
-
-    # parse filter list definition files that were passed as command line args
-    filter_list = []
-
-    for filepath in argv:
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="number of processes used to test definition files (0 = number of CPU cores, default: 1)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="test all definition files and do not use the result cache",
+    )
+    add_profile_argument(parser)
+    parser.add_argument("filepaths", nargs="*", help="definition file paths")
+    args = parser.parse_args(argv)
+
+    if args.profile is not None:
+        profile_call(args.profile, lint, args)
+    else:
+        lint(args)
+
+
+def lint(args):
+    """Tests the definition files in the parsed command line arguments and exits"""
+    # load GlyphData.xml file for Glyphs application supported glyph name values
+    glyphdata = load_glyphdata(args.glyphdata)
+    linter = GlyphNameLinter(glyphdata)
+
+    # confirm filter list definition file paths that were passed as command line args
+    filepath_list = []
+
+    for filepath in args.filepaths:
         if os.path.isfile(filepath):
-            new_filter = Filter(filepath)
-            with open(filepath) as f:
-                text = f.read()
-                new_filter.define_list_with_newline_delimited_text(text)
-                filter_list.append(new_filter)
+            filepath_list.append(filepath)
         else:
             sys.stderr.write(
                 "[ERROR]: Unable to identify a file on the path '"
@@ -144,87 +157,31 @@ def main(argv):
                 + os.linesep
             )
 
-    if len(filter_list) == 0:
+    if len(filepath_list) == 0:
         sys.stderr.write(
             "[ERROR]: Unable to identify any definitions in the requested files!"
             + os.linesep
         )
         sys.exit(1)
 
+    if args.no_cache:
+        cache = None
+    else:
+        cache = ResultCache(
+            LINT_CACHE_DIR, RULES_VERSION, glyphdata.digest, max_size=LINT_CACHE_MAX_SIZE
+        )
+
     # BEGIN TESTS
     ANY_ERROR_DETECTED = False
-    for a_filter in filter_list:
-        FILTER_ERROR_DETECTED = False
-        for glyph_name in a_filter.list:
-            if glyph_name in name_set:
-                pass
-            elif glyph_name in production_set:
-                pass
-            elif glyph_name in altname_set:
-                ANY_ERROR_DETECTED = True
-                FILTER_ERROR_DETECTED = True
-                sys.stderr.write(
-                    "'"
-                    + glyph_name
-                    + "' in definition file '"
-                    + a_filter.name
-                    + "' appears to be an alternate name.  Consider replacement with one of the following names:"
-                    + os.linesep
-                )
-                for a_glyph in glyphlist:
-                    if glyph_name in a_glyph.alt_names:
-                        if len(a_glyph.name) > 0:
-                            sys.stderr.write(" --> " + a_glyph.name + os.linesep)
-                        if len(a_glyph.production) > 0:
-                            sys.stderr.write(" --> " + a_glyph.production + os.linesep)
-                        if len(a_glyph.unicode) == 4:
-                            uni_name = "uni" + a_glyph.unicode
-                            if not uni_name == a_glyph.production:
-                                sys.stderr.write(" --> " + uni_name + os.linesep)
-                        elif len(a_glyph.unicode) == 5:
-                            uni_name = "u" + a_glyph.unicode
-                            if not uni_name == a_glyph.production:
-                                sys.stderr.write(" --> " + uni_name + os.linesep)
-            else:
-                sys.stderr.write(
-                    "'"
-                    + glyph_name
-                    + "' does not appear to be a valid glyph name!"
-                    + os.linesep
-                )
-                ANY_ERROR_DETECTED = True
-                FILTER_ERROR_DETECTED = True
-
-            # BEGIN non-GlyphData.xml tests
-            if FILTER_ERROR_DETECTED is False:
-                # https://github.com/adobe-type-tools/afdko/blob/develop/docs/OpenTypeFeatureFileSpecification.html
-                # glyph name length
-                if len(glyph_name) > 63:
-                    sys.stderr.write(
-                        "'" + glyph_name + "' is too long! (> 63 characters)"
-                    )
-                    FILTER_ERROR_DETECTED = True
-                    ANY_ERROR_DETECTED = True
-                # glyph name starts with period outside of defined positions (including .null defined in GlyphData.xml)
-                if glyph_name[0] == "." and (glyph_name not in (".notdef", ".null")):
-                    sys.stderr.write(
-                        "'" + glyph_name + "' includes an invalid leading period!"
-                    )
-                    FILTER_ERROR_DETECTED = True
-                    ANY_ERROR_DETECTED = True
-
-                # glyph name contains valid characters
-                if not has_valid_characters(glyph_name):
-                    sys.stderr.write(
-                        "'" + glyph_name + "' contains invalid characters!" + os.linesep
-                    )
-                    FILTER_ERROR_DETECTED = True
-                    ANY_ERROR_DETECTED = True
-
-        if FILTER_ERROR_DETECTED is True:
-            sys.stderr.write("[ERROR] --> " + a_filter.name + os.linesep)
-        else:
-            print("[OK] " + a_filter.name)
+    for error_detected, output in lint_files(
+        filepath_list, linter, args.jobs, args.glyphdata, cache=cache
+    ):
+        write_output(output)
+        if error_detected is True:
+            ANY_ERROR_DETECTED = True
+
+    if cache is not None:
+        cache.evict()
 
     if ANY_ERROR_DETECTED is True:
         sys.exit(1)
@@ -233,6 +190,289 @@ def main(argv):
         sys.exit(0)
 
 
+def read_filter(filepath):
+    """Returns a Filter object that is defined with the definition file on filepath"""
+    new_filter = Filter(filepath)
+    with open(filepath) as f:
+        text = f.read()
+        new_filter.define_list_with_newline_delimited_text(text)
+    return new_filter
+
+
+def lint_filter(a_filter, linter):
+    """Tests the glyph names in a Filter object and returns an (error detected, output)
+       tuple.  The output is a list of (stream name, text) tuples in write order."""
+    output = []
+    FILTER_ERROR_DETECTED = False
+    for glyph_name in a_filter.list:
+        glyphdata_messages, spec_messages = linter.check(glyph_name)
+        if len(glyphdata_messages) > 0:
+            output.extend(format_messages(glyphdata_messages, a_filter.name))
+            FILTER_ERROR_DETECTED = True
+
+        # BEGIN non-GlyphData.xml tests
+        if FILTER_ERROR_DETECTED is False and len(spec_messages) > 0:
+            output.extend(format_messages(spec_messages, a_filter.name))
+            FILTER_ERROR_DETECTED = True
+
+    if FILTER_ERROR_DETECTED is True:
+        output.append(("stderr", "[ERROR] --> " + a_filter.name + os.linesep))
+    else:
+        output.append(("stdout", "[OK] " + a_filter.name + "\n"))
+    return FILTER_ERROR_DETECTED, output
+
+
+def lint_files(filepath_list, linter, jobs, glyphdata_paths, cache=None):
+    """Yields lint_filter results for the definition files in filepath_list in list
+       order.  Results in the cache are replayed for files that have not changed
+       and only the remaining files are tested."""
+    if cache is None:
+        for result in test_files(filepath_list, linter, jobs, glyphdata_paths):
+            yield result
+        return
+
+    keys = [get_cache_key(cache, filepath) for filepath in filepath_list]
+    cached_results = []
+    for key in keys:
+        # the results are stored as {"error": error detected, "output": output}
+        cached_result = cache.get(key)
+        if cached_result is not None:
+            cached_result = (
+                cached_result["error"],
+                [tuple(item) for item in cached_result["output"]],
+            )
+        cached_results.append(cached_result)
+    untested_filepath_list = [
+        filepath
+        for filepath, result in zip(filepath_list, cached_results)
+        if result is None
+    ]
+    test_results = test_files(untested_filepath_list, linter, jobs, glyphdata_paths)
+    for key, result in zip(keys, cached_results):
+        if result is None:
+            result = next(test_results)
+            cache.set(key, {"error": result[0], "output": result[1]})
+        yield result
+
+
+def get_cache_key(cache, filepath):
+    """Returns the cache key of the definition file path and contents"""
+    with open(filepath, "rb") as f:
+        return cache.get_key(filepath, f.read())
+
+
+def test_files(filepath_list, linter, jobs, glyphdata_paths):
+    """Yields lint_filter results for the definition files in filepath_list in list
+       order.  Files are tested across a pool of jobs processes when jobs > 1."""
+    if jobs == 0:
+        jobs = multiprocessing.cpu_count()
+    if jobs == 1 or len(filepath_list) <= 1:
+        for filepath in filepath_list:
+            yield lint_filter(read_filter(filepath), linter)
+        return
+
+    # worker processes inherit the loaded GlyphData indexes through fork where
+    # it is available and load them from the compiled index cache otherwise
+    global worker_linter
+    linter.load_indexes()
+    worker_linter = linter
+    try:
+        context = multiprocessing.get_context("fork")
+    except ValueError:
+        context = multiprocessing.get_context()
+    chunksize = max(1, len(filepath_list) // (jobs * 4))
+    pool = context.Pool(jobs, initializer=init_worker, initargs=(glyphdata_paths,))
+    try:
+        for result in pool.imap(lint_file_worker, filepath_list, chunksize):
+            yield result
+    finally:
+        pool.close()
+        pool.join()
+
+
+worker_linter = None
+
+
+def init_worker(glyphdata_paths):
+    global worker_linter
+    if worker_linter is None:
+        worker_linter = GlyphNameLinter(load_glyphdata(glyphdata_paths))
+
+
+def lint_file_worker(filepath):
+    return lint_filter(read_filter(filepath), worker_linter)
+
+
+def write_output(output):
+    for stream_name, text in output:
+        if stream_name == "stdout":
+            sys.stdout.write(text)
+        else:
+            sys.stderr.write(text)
+
+
+# Placeholder for the definition file path in error messages.  Messages are
+# tuples of strings that are joined with this placeholder replaced on write.
+FILTER_NAME = object()
+
+
+def format_messages(messages, filter_name):
+    """Returns a list of (stream name, text) output tuples for rule error messages"""
+    return [
+        (
+            "stderr",
+            "".join(filter_name if part is FILTER_NAME else part for part in message),
+        )
+        for message in messages
+    ]
+
+
+class GlyphNameLinter(object):
+    """GlyphNameLinter evaluates the glyph name rules once per unique glyph name and
+       stores the error messages for glyph names that are found in more than one
+       definition file"""
+
+    def __init__(self, glyphdata):
+        self.glyphdata = glyphdata
+        self.results = {}
+
+    def load_indexes(self):
+        """Builds the GlyphData lookup indexes that the rules use"""
+        self.glyphdata.name_set
+        self.glyphdata.production_set
+        self.glyphdata.altname_set
+
+    def check(self, glyph_name):
+        """Returns a (GlyphData.xml rule messages, spec rule messages) tuple of lists"""
+        if glyph_name not in self.results:
+            if glyph_name[0] == DIRECTIVE_PREFIX:
+                self.results[glyph_name] = (check_directive(glyph_name), [])
+                return self.results[glyph_name]
+            glyphdata_messages = []
+            for rule in GLYPHDATA_RULES:
+                glyphdata_messages.extend(rule(glyph_name, self.glyphdata))
+            spec_messages = []
+            for rule in SPEC_RULES:
+                spec_messages.extend(rule(glyph_name, self.glyphdata))
+            self.results[glyph_name] = (glyphdata_messages, spec_messages)
+        return self.results[glyph_name]
+
+
+def check_glyphdata(glyph_name, glyphdata):
+    """Tests for a GlyphData.xml nice name or production name.  Alternate names
+       include suggested nice name and production name replacements."""
+    if glyph_name in glyphdata.name_set:
+        return []
+    elif glyph_name in glyphdata.production_set:
+        return []
+    elif glyph_name in glyphdata.altname_set:
+        messages = [
+            (
+                "'" + glyph_name + "' in definition file '",
+                FILTER_NAME,
+                "' appears to be an alternate name.  Consider replacement with one of the following names:"
+                + os.linesep,
+            )
+        ]
+        for a_glyph in glyphdata.find_alt_name_owners(glyph_name):
+            if len(a_glyph.name) > 0:
+                messages.append((" --> " + a_glyph.name + os.linesep,))
+            if len(a_glyph.production) > 0:
+                messages.append((" --> " + a_glyph.production + os.linesep,))
+            if len(a_glyph.unicode) == 4:
+                uni_name = "uni" + a_glyph.unicode
+                if not uni_name == a_glyph.production:
+                    messages.append((" --> " + uni_name + os.linesep,))
+            elif len(a_glyph.unicode) == 5:
+                uni_name = "u" + a_glyph.unicode
+                if not uni_name == a_glyph.production:
+                    messages.append((" --> " + uni_name + os.linesep,))
+        return messages
+    else:
+        return [("'" + glyph_name + "' does not appear to be a valid glyph name!" + os.linesep,)]
+
+
+# https://github.com/adobe-type-tools/afdko/blob/develop/docs/OpenTypeFeatureFileSpecification.html
+def check_length(glyph_name, glyphdata):
+    """Tests for glyph name length <= 63 characters"""
+    if len(glyph_name) > 63:
+        return [("'" + glyph_name + "' is too long! (> 63 characters)",)]
+    return []
+
+
+def check_leading_period(glyph_name, glyphdata):
+    """Tests for a glyph name that starts with period outside of defined positions
+       (including .null defined in GlyphData.xml)"""
+    if glyph_name[0] == "." and (glyph_name not in (".notdef", ".null")):
+        return [("'" + glyph_name + "' includes an invalid leading period!",)]
+    return []
+
+
+def check_characters(glyph_name, glyphdata):
+    """Tests for glyph names that contain valid characters"""
+    if not has_valid_characters(glyph_name):
+        return [("'" + glyph_name + "' contains invalid characters!" + os.linesep,)]
+    return []
+
+
+DIRECTIVE_PREFIX = "@"
+LIST_DIRECTIVES = ("@include", "@exclude", "@intersect")
+QUERY_DIRECTIVES = ("@range", "@script", "@production")
+DIRECTIVES = LIST_DIRECTIVES + QUERY_DIRECTIVES
+CODE_POINT_RANGE_REGEX = re.compile(
+    r"^(?:[Uu]\+)?([0-9A-Fa-f]{1,6})(?:\s*\.\.\s*(?:[Uu]\+)?([0-9A-Fa-f]{1,6}))?$"
+)
+
+
+# Increment RULES_VERSION when the directives or messages that are accepted here change
+def check_directive(line):
+    """Tests for a directive with a filter list name or a query"""
+    parts = line.split(None, 1)
+    if parts[0] not in DIRECTIVES:
+        return [
+            (
+                "'" + line + "' in definition file '",
+                FILTER_NAME,
+                "' is not a valid directive!  Use one of " + ", ".join(DIRECTIVES) + os.linesep,
+            )
+        ]
+    elif len(parts) == 1:
+        return [
+            (
+                "'" + line + "' in definition file '",
+                FILTER_NAME,
+                "' does not define a "
+                + ("query!" if parts[0] in QUERY_DIRECTIVES else "filter list name!")
+                + os.linesep,
+            )
+        ]
+    elif parts[0] == "@range":
+        match = CODE_POINT_RANGE_REGEX.match(parts[1].strip())
+        if match is None or (
+            match.group(2) is not None
+            and int(match.group(1), 16) > int(match.group(2), 16)
+        ):
+            return [
+                (
+                    "'" + line + "' in definition file '",
+                    FILTER_NAME,
+                    "' does not define a valid code point range!  Use U+XXXX..U+YYYY"
+                    + os.linesep,
+                )
+            ]
+    return []
+
+
+# Rules that test glyph names against GlyphData.xml
+GLYPHDATA_RULES = (check_glyphdata,)
+# Rules that test glyph names against the Adobe OpenType Feature File specification.
+# These are only reported for glyph names in definition files that pass all
+# GlyphData.xml tests.
+SPEC_RULES = (check_length, check_leading_period, check_characters)
+
+VALID_CHARACTERS_REGEX = re.compile(r"^[A-Za-z0-9\._\*\+\-\:\^\|\~]{1,63}$")
+
+
 def has_valid_characters(glyph_name):
     """Tests for presence of valid characters in a glyph name as specified by the Adobe
        OpenType Feature File specification.  The test here includes characters
@@ -240,9 +480,7 @@ def has_valid_characters(glyph_name):
        definition
 
        https://github.com/adobe-type-tools/afdko/blob/develop/docs/OpenTypeFeatureFileSpecification.html"""
-    valid_characters = r"^[A-Za-z0-9\._\*\+\-\:\^\|\~]{1,63}$"
-    regex = re.compile(valid_characters)
-    return re.match(regex, glyph_name)
+    return VALID_CHARACTERS_REGEX.match(glyph_name)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# ==============================================================
+#
+#
+#   glyphdata.py
+#   GlyphData.xml parser and compiled index cache for the
+#     filter list management tools
+#   Copyright 2018 Christopher Simpkins
+#   Apache License 2.0
+#
+# ==============================================================
+
+# USAGE
+#
+# This module is imported by the glinter.py and glformatter.py scripts.  Save it
+# in the same directory as those scripts.
+#
+# The Glyphs application GlyphData.xml file and any custom GlyphData.xml or
+# GlyphData-*.xml files in the ~/Library/Application Support/Glyphs/Info
+# directory are parsed once and compiled to binary index files in the directory:
+#
+#     ~/GlyphsFilters/.cache
+#
+# The index stores the unicode, name, description, production, and altNames
+# values of every glyph record as separate column blocks.  Later runs
+# memory-map the index file and only decode the columns that are requested.
+# The index is keyed by the GlyphData.xml file path, modification time, and
+# content hash and is rebuilt automatically when the GlyphData.xml file changes.
+#
+# GlyphData.xml files are parsed incrementally and each glyph element is
+# discarded as soon as its attribute values are stored so that the full XML
+# document tree is never held in memory.
+#
+# The ResultCache class stores the results of the glinter.py and glformatter.py
+# scripts in sub-directories of the cache directory.
+
+import glob
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+import xml.etree.ElementTree as ET
+
+GLYPHDATA_PATH = "/Applications/Glyphs.app/Contents/Frameworks/GlyphsCore.framework/Versions/A/Resources/GlyphData.xml"
+CUSTOM_GLYPHDATA_DIR = os.path.join(
+    os.path.expanduser("~"), "Library", "Application Support", "Glyphs", "Info"
+)
+CACHE_DIR = os.path.join(os.path.expanduser("~"), "GlyphsFilters", ".cache")
+
+INDEX_MAGIC = b"FLMGDIDX"
+INDEX_VERSION = 1
+INDEX_PREAMBLE = struct.Struct("<8sI")  # magic, header length
+
+FIELDS = ("unicode", "name", "description", "production", "alt_names")
+FIELD_DELIMITER = "\x00"  # not permitted in XML attribute values
+
+
+class Glyph(object):
+    __slots__ = ("unicode", "name", "description", "production", "alt_names")
+
+    def __init__(self):
+        self.unicode = ""
+        self.name = ""
+        self.description = ""
+        self.production = ""
+        self.alt_names = []
+
+
+class GlyphData(object):
+    """GlyphData is a column oriented index of the glyph records that are defined in
+       a GlyphData.xml file.  Each column is a list of strings that is indexed by the
+       position of the glyph record in the XML file.  Alternate names are stored as
+       comma-delimited strings.  Columns may be defined with a callable that is used
+       to load the column on first access."""
+
+    def __init__(self, columns, digest):
+        self._columns = dict(columns)
+        self._indexes = {}
+        self.digest = digest
+
+    def column(self, field):
+        column = self._columns[field]
+        if callable(column):
+            column = column()
+            self._columns[field] = column
+        return column
+
+    def glyph(self, index):
+        """Returns a Glyph object for the glyph record at position index"""
+        glyph = Glyph()
+        glyph.unicode = self.column("unicode")[index]
+        glyph.name = self.column("name")[index]
+        glyph.description = self.column("description")[index]
+        glyph.production = self.column("production")[index]
+        alt_names = self.column("alt_names")[index]
+        if len(alt_names) > 0:
+            glyph.alt_names = alt_names.split(",")
+        return glyph
+
+    def __len__(self):
+        return len(self.column("name"))
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.glyph(index)
+
+    def _value_index(self, field):
+        """Returns a dictionary that maps the non-empty values in a column to the
+           position of the last glyph record that defines the value.  Custom GlyphData
+           files follow the Glyphs application file and override its records, as in
+           the Glyphs application."""
+        if field not in self._indexes:
+            value_index = {}
+            for position, value in enumerate(self.column(field)):
+                if len(value) > 0:
+                    value_index[value] = position
+            self._indexes[field] = value_index
+        return self._indexes[field]
+
+    def find(self, field, value):
+        """Returns the last Glyph with value in field or None if it is not defined"""
+        position = self._value_index(field).get(value)
+        if position is None:
+            return None
+        return self.glyph(position)
+
+    def _value_set(self, field):
+        # the index keys are a set-like view of the column values
+        return self._value_index(field).keys()
+
+    @property
+    def unicode_set(self):
+        return self._value_set("unicode")
+
+    @property
+    def name_set(self):
+        return self._value_set("name")
+
+    @property
+    def production_set(self):
+        return self._value_set("production")
+
+    @property
+    def altname_set(self):
+        return self._altname_index().keys()
+
+    def _altname_index(self):
+        """Returns a dictionary that maps alternate names to the positions of the
+           glyph records that define them"""
+        if "alt_names" not in self._indexes:
+            altname_index = {}
+            for position, alt_names in enumerate(self.column("alt_names")):
+                if len(alt_names) > 0:
+                    for alt_name in alt_names.split(","):
+                        positions = altname_index.setdefault(alt_name, [])
+                        if len(positions) == 0 or positions[-1] != position:
+                            positions.append(position)
+            self._indexes["alt_names"] = altname_index
+        return self._indexes["alt_names"]
+
+    def find_alt_name_owners(self, alt_name):
+        """Returns a list of the Glyph objects that define alt_name as an alternate name"""
+        return [self.glyph(position) for position in self._altname_index().get(alt_name, [])]
+
+    @classmethod
+    def concatenate(cls, glyphdata_list):
+        """Returns a GlyphData object with the glyph records of all GlyphData objects
+           in glyphdata_list in list order"""
+        if len(glyphdata_list) == 1:
+            return glyphdata_list[0]
+
+        def column_loader(field):
+            def load_column():
+                column = []
+                for glyphdata in glyphdata_list:
+                    column.extend(glyphdata.column(field))
+                return column
+
+            return load_column
+
+        columns = dict((field, column_loader(field)) for field in FIELDS)
+        digest = hashlib.sha1(
+            ":".join(glyphdata.digest for glyphdata in glyphdata_list).encode("utf-8")
+        ).hexdigest()
+        return cls(columns, digest)
+
+
+def get_default_glyphdata_paths():
+    """Returns the Glyphs application GlyphData.xml file path followed by the paths to
+       custom GlyphData.xml and GlyphData-*.xml files in the Glyphs Info directory"""
+    custom_paths = glob.glob(os.path.join(CUSTOM_GLYPHDATA_DIR, "GlyphData*.xml"))
+    return [GLYPHDATA_PATH] + sorted(custom_paths)
+
+
+def parse_glyphdata(path, digest=""):
+    """Parses a GlyphData.xml file and returns a GlyphData object.  The file is
+       parsed incrementally and each element is cleared after it is read."""
+    unicodes = []
+    names = []
+    descriptions = []
+    productions = []
+    alt_names = []
+    root = None
+    for event, element in ET.iterparse(path, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = element
+            continue
+        if element is root:
+            break
+        attrib = element.attrib
+        unicodes.append(attrib.get("unicode", ""))
+        names.append(attrib.get("name", ""))
+        descriptions.append(attrib.get("description", ""))
+        productions.append(attrib.get("production", ""))
+        namestring = attrib.get("altNames", "")
+        if len(namestring) > 0:
+            namestring = ",".join(altname.strip() for altname in namestring.split(","))
+        alt_names.append(namestring)
+        # release the element and drop the reference that the root element holds
+        element.clear()
+        root.clear()
+
+    columns = {
+        "unicode": unicodes,
+        "name": names,
+        "description": descriptions,
+        "production": productions,
+        "alt_names": alt_names,
+    }
+    return GlyphData(columns, digest)
+
+
+def load_glyphdata(paths=None, cache_dir=CACHE_DIR):
+    """Returns a GlyphData object with the glyph records in the GlyphData XML files
+       on paths.  The default Glyphs application and custom GlyphData files are used
+       when paths is None.  See load_glyphdata_file for cache details."""
+    if paths is None:
+        paths = get_default_glyphdata_paths()
+    return GlyphData.concatenate(
+        [load_glyphdata_file(path, cache_dir=cache_dir) for path in paths]
+    )
+
+
+def load_glyphdata_file(path, cache_dir=CACHE_DIR):
+    """Returns a GlyphData object for the GlyphData.xml file on path.  The compiled
+       index in cache_dir is used when it is current and is (re)built from the XML
+       file when it is not.  Caching is disabled when cache_dir is None."""
+    source_path = os.path.abspath(path)
+    source_stat = os.stat(source_path)
+    if cache_dir is None:
+        return parse_glyphdata(source_path, digest=file_digest(source_path))
+
+    index_path = get_index_path(source_path, cache_dir)
+    header, glyphdata = read_index(index_path)
+    if header is not None and header["source"] == source_path:
+        if (
+            header["mtime_ns"] == source_stat.st_mtime_ns
+            and header["size"] == source_stat.st_size
+        ):
+            return glyphdata
+
+    digest = file_digest(source_path)
+    if header is None or header["sha1"] != digest:
+        glyphdata = parse_glyphdata(source_path, digest=digest)
+    # the file was touched without a content change, only the
+    # header values are refreshed in this case
+    try:
+        write_index(index_path, glyphdata, source_path, source_stat)
+    except (IOError, OSError):
+        # caching is an optimization, an unwritable cache directory is not an error
+        return glyphdata
+    # release the parsed columns in favor of the memory-mapped index
+    # so that memory use does not grow with each loaded file
+    header, mapped_glyphdata = read_index(index_path)
+    if mapped_glyphdata is None:
+        return glyphdata
+    return mapped_glyphdata
+
+
+def get_index_path(source_path, cache_dir):
+    path_hash = hashlib.sha1(source_path.encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, "glyphdata-" + path_hash[:16] + ".idx")
+
+
+def file_digest(path):
+    sha1 = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def read_index(index_path):
+    """Memory-maps a compiled index file and returns a (header, GlyphData) tuple.
+       (None, None) is returned when the index is missing or invalid."""
+    try:
+        with open(index_path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (IOError, OSError, ValueError):
+        return None, None
+
+    try:
+        magic, header_length = INDEX_PREAMBLE.unpack_from(buffer, 0)
+        header_start = INDEX_PREAMBLE.size
+        header = json.loads(
+            buffer[header_start:header_start + header_length].decode("utf-8")
+        )
+    except (struct.error, ValueError):
+        buffer.close()
+        return None, None
+    if magic != INDEX_MAGIC or header.get("version") != INDEX_VERSION:
+        buffer.close()
+        return None, None
+
+    def column_loader(offset, length, count):
+        def load_column():
+            if count == 0:
+                return []
+            block = buffer[offset:offset + length].decode("utf-8")
+            return block.split(FIELD_DELIMITER)
+
+        return load_column
+
+    columns = {}
+    for field in FIELDS:
+        offset, length = header["columns"][field]
+        columns[field] = column_loader(offset, length, header["count"])
+    return header, GlyphData(columns, header["sha1"])
+
+
+def write_index(index_path, glyphdata, source_path, source_stat):
+    """Compiles a GlyphData object to the binary index file format"""
+    blocks = []
+    for field in FIELDS:
+        blocks.append(FIELD_DELIMITER.join(glyphdata.column(field)).encode("utf-8"))
+
+    header = {
+        "version": INDEX_VERSION,
+        "source": source_path,
+        "mtime_ns": source_stat.st_mtime_ns,
+        "size": source_stat.st_size,
+        "sha1": glyphdata.digest,
+        "count": len(glyphdata),
+        "columns": {},
+    }
+    # column offsets are stored in the header so the header length must be
+    # fixed before they are calculated; offsets are padded to a stable width
+    placeholder = dict((field, [0, 0]) for field in FIELDS)
+    header["columns"] = placeholder
+    header_length = len(json.dumps(header).encode("utf-8")) + 32 * len(FIELDS)
+    offset = INDEX_PREAMBLE.size + header_length
+    for field, block in zip(FIELDS, blocks):
+        header["columns"][field] = [offset, len(block)]
+        offset += len(block)
+    header_bytes = json.dumps(header).encode("utf-8").ljust(header_length)
+
+    index_dir = os.path.dirname(index_path)
+    if not os.path.isdir(index_dir):
+        os.makedirs(index_dir)
+    fd, temp_path = tempfile.mkstemp(dir=index_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(INDEX_PREAMBLE.pack(INDEX_MAGIC, header_length))
+            f.write(header_bytes)
+            for block in blocks:
+                f.write(block)
+        os.replace(temp_path, index_path)
+    except Exception:
+        os.remove(temp_path)
+        raise
+
+
+class ResultCache(object):
+    """ResultCache is a persistent store of the JSON results of the tools in cache_dir.
+       Results are keyed by the tool version, the GlyphData index hash, and the key
+       parts, e.g. a definition file path and its contents.  The least recently used
+       results are removed by the evict method when the cache exceeds max_size bytes
+       or holds more than max_entries results."""
+
+    def __init__(
+        self, cache_dir, version, glyphdata_digest, max_size=None, max_entries=None
+    ):
+        self.cache_dir = cache_dir
+        self.version = version
+        self.glyphdata_digest = glyphdata_digest
+        self.max_size = max_size
+        self.max_entries = max_entries
+
+    def get_key(self, *parts):
+        """Returns the key of the str or bytes key parts"""
+        sha1 = hashlib.sha1()
+        sha1.update((str(self.version) + ":" + self.glyphdata_digest).encode("utf-8"))
+        for part in parts:
+            if not isinstance(part, bytes):
+                part = part.encode("utf-8")
+            sha1.update(b":" + part)
+        return sha1.hexdigest()
+
+    def get_path(self, key):
+        return os.path.join(self.cache_dir, key + ".json")
+
+    def get(self, key):
+        """Returns the cached result for key or None"""
+        cache_path = self.get_path(key)
+        try:
+            with open(cache_path, "r") as f:
+                result = json.load(f)
+            # the modification time of an entry is the time of its last use
+            os.utime(cache_path, None)
+        except (IOError, OSError, ValueError):
+            return None
+        return result
+
+    def set(self, key, result):
+        """Stores the JSON serializable result for key.  The result is not stored when
+           the cache directory is not writable."""
+        try:
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(result, f)
+            os.replace(temp_path, self.get_path(key))
+        except (IOError, OSError):
+            pass
+
+    def evict(self):
+        """Removes the least recently used results until the cache is within max_size
+           bytes and max_entries results"""
+        try:
+            entries = []
+            for filename in os.listdir(self.cache_dir):
+                entry_path = os.path.join(self.cache_dir, filename)
+                entry_stat = os.stat(entry_path)
+                entries.append((entry_stat.st_mtime, entry_stat.st_size, entry_path))
+            entries.sort()
+            total_size = sum(entry[1] for entry in entries)
+            for entry_count, (mtime, size, entry_path) in zip(
+                range(len(entries), 0, -1), entries
+            ):
+                if (self.max_size is None or total_size <= self.max_size) and (
+                    self.max_entries is None or entry_count <= self.max_entries
+                ):
+                    break
+                os.remove(entry_path)
+                total_size -= size
+        except (IOError, OSError):
+            pass
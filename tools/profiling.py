@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# ==============================================================
+#
+#
+#   profiling.py
+#   cProfile support for the filter list management tools
+#   Copyright 2018 Christopher Simpkins
+#   Apache License 2.0
+#
+# ==============================================================
+
+# USAGE
+#
+# This module is imported by the glinter.py, glformatter.py, and exportfilters.py
+# scripts when they are executed with the --profile option.  Save it in the same
+# directory as those scripts:
+#
+#    $ python3 glinter.py --profile glinter.pstats [filepath 1] [filepath ...]
+#
+# The cProfile statistics are written to the --profile file path in the pstats
+# format and a summary of the functions with the highest internal time is
+# written to the standard error stream after the script ends.  Open the file
+# with the pstats module for other views:
+#
+#    $ python3 -m pstats glinter.pstats
+
+import cProfile
+import pstats
+import sys
+
+PROFILE_TOP_FUNCTIONS = 15
+
+
+def add_profile_argument(parser):
+    """Adds the --profile option to an argparse.ArgumentParser"""
+    parser.add_argument(
+        "--profile",
+        metavar="FILE",
+        help="write cProfile statistics to FILE and report the top "
+        + str(PROFILE_TOP_FUNCTIONS)
+        + " functions by internal time",
+    )
+
+
+def profile_call(profile_path, function, *args):
+    """Executes function(*args) with the cProfile profiler and returns its return
+       value.  The statistics are written to profile_path and summarized on stderr,
+       including when function exits with sys.exit()."""
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(function, *args)
+    finally:
+        profiler.dump_stats(profile_path)
+        write_profile_summary(profiler, profile_path)
+
+
+def write_profile_summary(profiler, profile_path, top=PROFILE_TOP_FUNCTIONS):
+    sys.stdout.flush()
+    sys.stderr.write("[profile] cProfile statistics written to " + profile_path + "\n")
+    stats = pstats.Stats(profiler, stream=sys.stderr)
+    stats.strip_dirs().sort_stats("tottime").print_stats(top)